@@ -0,0 +1,119 @@
+"""
+Google ID token verification over a shared, pooled HTTP transport.
+
+google_requests.Request() opens a new session for every login, so each one
+paid a TLS handshake and a download of Google's signing certificates. This
+module keeps one requests.Session (keep-alive connection pool) for the whole
+process and caches certificate responses for as long as their Cache-Control
+max-age allows, so a login normally verifies without any network round trip.
+"""
+import re
+import threading
+import time
+import requests
+from cachetools import TLRUCache
+from django.conf import settings
+from google.auth import exceptions
+from google.auth.transport import requests as google_requests
+from google.oauth2 import id_token
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+# Seconds to wait for Google; the library default is two minutes
+HTTP_TIMEOUT = 10
+# A token that fails against cached certificates at least this old triggers a
+# refetch, in case Google rotated its keys before our copy expired
+REFETCH_AFTER = 60
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+def max_age(headers):
+    """Seconds a response may be reused according to Cache-Control, or 0."""
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = _MAX_AGE.search(cache_control)
+    return int(match.group(1)) if match else 0
+
+
+class CachingRequest(google_requests.Request):
+    """
+    Transport for google-auth that reuses one pooled session and serves
+    repeat GETs (the certificate downloads) from memory until they expire.
+    """
+
+    def __init__(self, session=None):
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=settings.GOOGLE_HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        super().__init__(session)
+        # url -> (response, seconds to keep, fetched at)
+        self.cache = TLRUCache(maxsize=16, ttu=lambda url, entry, now: now + entry[1], timer=time.monotonic)
+        self.lock = threading.Lock()
+        self.fetches = 0
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=HTTP_TIMEOUT, **kwargs):
+        if method != 'GET' or body is not None or headers:
+            return super().__call__(url, method, body, headers, timeout, **kwargs)
+        with self.lock:
+            entry = self.cache.get(url)
+        if entry is not None:
+            return entry[0]
+        # One download per expiry, however many logins are waiting for it
+        with self.lock:
+            entry = self.cache.get(url)
+            if entry is not None:
+                return entry[0]
+            response = super().__call__(url, method, timeout=timeout, **kwargs)
+            self.fetches += 1
+            keep = max_age(response.headers) if response.status == 200 else 0
+            if keep:
+                response.data  # read the body now, the cached object outlives the connection
+                self.cache[url] = (response, keep, time.monotonic())
+            return response
+
+    def refetch(self, url, older_than=REFETCH_AFTER):
+        """Drop the cached `url` if it was fetched over `older_than` seconds ago; True if dropped."""
+        with self.lock:
+            entry = self.cache.get(url)
+            if entry is None or time.monotonic() - entry[2] < older_than:
+                return False
+            del self.cache[url]
+            return True
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """The process-wide CachingRequest, created on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = CachingRequest()
+        return _transport
+
+
+def verify_google_token(token, client_id):
+    """
+    Decoded claims of a Google ID token for `client_id`. Raises ValueError
+    (or a google.auth error) like id_token.verify_oauth2_token.
+    """
+    transport = get_transport()
+    try:
+        idinfo = id_token.verify_token(token, transport, audience=client_id, certs_url=settings.GOOGLE_CERTS_URL)
+    except ValueError:
+        if not transport.refetch(settings.GOOGLE_CERTS_URL):
+            raise
+        idinfo = id_token.verify_token(token, transport, audience=client_id, certs_url=settings.GOOGLE_CERTS_URL)
+    if idinfo['iss'] not in GOOGLE_ISSUERS:
+        raise exceptions.GoogleAuthError(f"Wrong issuer. 'iss' should be one of the following: {GOOGLE_ISSUERS}")
+    return idinfo
@@ -0,0 +1,104 @@
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import rsa
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from google.auth import crypt, jwt
+from google.auth.transport import requests as google_requests
+from rest_framework.test import APIRequestFactory
+from authentication import google_certs
+from authentication.views import GoogleLoginView
+
+CLIENT_ID = 'bench-client.apps.googleusercontent.com'
+KEY_ID = 'bench-key'
+
+
+class CertServer(ThreadingHTTPServer):
+    """Stands in for Google's certificate endpoint, with an optional round-trip delay."""
+    daemon_threads = True
+
+    def __init__(self, certs, latency):
+        self.body = json.dumps(certs).encode()
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        super().__init__(('127.0.0.1', 0), CertHandler)
+
+
+class CertHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like Google's endpoint
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+        time.sleep(self.server.latency)  # connection setup (TCP + TLS) on the real endpoint
+
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.server.body)))
+        self.send_header('Cache-Control', 'public, max-age=3600, must-revalidate, no-transform')
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Measure Google login latency against a local stand-in certificate server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Logins per case')
+        parser.add_argument('--latency', type=float, default=40, help='Simulated network round trip to Google, in ms')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        public_key, private_key = rsa.newkeys(2048)
+        signer = crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), KEY_ID)
+        server = CertServer({KEY_ID: public_key.save_pkcs1().decode()}, options['latency'] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        now = int(time.time())
+        token = jwt.encode(signer, {
+            'iss': 'https://accounts.google.com', 'aud': CLIENT_ID, 'sub': '1000001',
+            'email': 'bench-login@example.com', 'name': 'Bench Login', 'iat': now, 'exp': now + 3600,
+        }).decode()
+        factory = APIRequestFactory()
+        view = GoogleLoginView.as_view()
+        url = f'http://127.0.0.1:{server.server_port}/oauth2/v1/certs'
+
+        cases = (
+            ('new transport per login', google_requests.Request),
+            ('pooled + cached certs', lambda: transport),
+        )
+        self.stdout.write(f"{'case':<26} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'cert GETs':>10} {'connections':>12}")
+        with override_settings(GOOGLE_CERTS_URL=url), patch.dict(os.environ, {'GOOGLE_CLIENT_ID': CLIENT_ID}):
+            for label, make_transport in cases:
+                transport = google_certs.CachingRequest()
+                server.requests = server.connections = 0
+                timings = []
+                # The login's user writes are rolled back at the end
+                with transaction.atomic(), patch.object(google_certs, 'get_transport', make_transport):
+                    for _ in range(count):
+                        started = time.perf_counter()
+                        response = view(factory.post('/api/auth/google/', {'token': token}, format='json'))
+                        timings.append((time.perf_counter() - started) * 1000)
+                        if response.status_code != 200:
+                            raise RuntimeError(f"Login failed: {response.data}")
+                    transaction.set_rollback(True)
+                p95 = statistics.quantiles(timings, n=20)[-1]
+                self.stdout.write(
+                    f"{label:<26} {statistics.mean(timings):>8.2f} {statistics.median(timings):>8.2f} {p95:>8.2f} "
+                    f"{server.requests:>10} {server.connections:>12}"
+                )
+        server.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Ran {count} logins per case."))
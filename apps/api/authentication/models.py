@@ -51,7 +51,7 @@ class AllowedEmail(models.Model):
     """
     email = models.EmailField(unique=True)
     role = models.CharField(max_length=20, choices=User.ROLE_CHOICES, default='VOLUNTEER')
-    added_at = models.DateTimeField(auto_now_add=True)
+    added_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"{self.email} ({self.role})"
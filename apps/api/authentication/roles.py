@@ -0,0 +1,75 @@
+"""
+In-process cache of the AllowedEmail allow-list (email -> role).
+
+Each worker keeps the whole list in memory, tagged with the version stamp
+it was loaded at. The stamp lives in the shared 'default' cache and is bumped
+whenever an AllowedEmail is saved or deleted (see signals.py), so every worker
+reloads the list on its next check. Workers look at the stamp at most every
+ALLOWED_EMAILS_CHECK_SECONDS, so a login normally costs no query at all.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EMAILS_VERSION_KEY = 'auth:allowed-emails:version'
+
+_lock = threading.Lock()
+_roles = None
+_version = None
+_checked_at = 0.0
+
+
+def get_allowed_emails_version():
+    cache = caches['default']
+    version = cache.get(ALLOWED_EMAILS_VERSION_KEY)
+    if version is None:
+        cache.add(ALLOWED_EMAILS_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(ALLOWED_EMAILS_VERSION_KEY)
+    return version
+
+
+def bump_allowed_emails_version():
+    global _roles
+    caches['default'].set(ALLOWED_EMAILS_VERSION_KEY, time.time_ns(), timeout=None)
+    # This worker sees its own change right away
+    with _lock:
+        _roles = None
+
+
+def _load():
+    from .models import AllowedEmail
+    return dict(AllowedEmail.objects.values_list('email', 'role'))
+
+
+def allowed_roles():
+    """The allow-list as {email: role}, reloaded when its version changes."""
+    global _roles, _version, _checked_at
+    now = time.monotonic()
+    with _lock:
+        if _roles is not None and now - _checked_at < settings.ALLOWED_EMAILS_CHECK_SECONDS:
+            return _roles
+    try:
+        version = get_allowed_emails_version()
+    except DatabaseError as e:
+        # Cache table missing or DB hiccup: read the list directly
+        logger.warning(f"Allow-list cache unavailable: {e}")
+        return _load()
+    with _lock:
+        if _roles is not None and _version == version:
+            _checked_at = now
+            return _roles
+    roles = _load()
+    with _lock:
+        _roles, _version, _checked_at = roles, version, now
+    return roles
+
+
+def get_allowed_role(email):
+    """Role pre-assigned to `email`, or None if it isn't on the allow-list."""
+    return allowed_roles().get(email)
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import AllowedEmail
+from .roles import bump_allowed_emails_version
+
+
+@receiver(post_save, sender=AllowedEmail)
+@receiver(post_delete, sender=AllowedEmail)
+def invalidate_allowed_emails(sender, **kwargs):
+    # After commit, so no worker can reload the old list under the new stamp
+    transaction.on_commit(bump_allowed_emails_version)
@@ -1,3 +1,107 @@
-from django.test import TestCase
+import os
+from unittest.mock import patch
+import requests
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .google_certs import CachingRequest, max_age
+from .models import AllowedEmail, User
+from .roles import bump_allowed_emails_version
 
-# Create your tests here.
+
+class FakeSession(requests.Session):
+    """Answers every request with `cache_control`, counting them."""
+
+    def __init__(self, cache_control):
+        super().__init__()
+        self.cache_control = cache_control
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Cache-Control'] = self.cache_control
+        response._content = b'{"kid": "cert"}'
+        return response
+
+
+class GoogleCertCacheTests(SimpleTestCase):
+    def test_max_age_is_honoured(self):
+        self.assertEqual(max_age({'Cache-Control': 'public, max-age=19870, must-revalidate'}), 19870)
+        self.assertEqual(max_age({'Cache-Control': 'no-store, max-age=60'}), 0)
+        self.assertEqual(max_age({}), 0)
+
+    def test_certs_fetched_once_until_they_expire(self):
+        session = FakeSession('public, max-age=3600')
+        transport = CachingRequest(session)
+        for _ in range(3):
+            self.assertEqual(transport('https://certs.example/').data, b'{"kid": "cert"}')
+        self.assertEqual(session.calls, 1)
+
+        # A failed verification only refetches certificates that aren't fresh
+        self.assertFalse(transport.refetch('https://certs.example/'))
+        self.assertTrue(transport.refetch('https://certs.example/', older_than=0))
+        transport('https://certs.example/')
+        self.assertEqual(session.calls, 2)
+
+    def test_uncacheable_responses_are_not_kept(self):
+        session = FakeSession('no-cache')
+        transport = CachingRequest(session)
+        transport('https://certs.example/')
+        transport('https://certs.example/')
+        self.assertEqual(session.calls, 2)
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-test-default'},
+}
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=LOCMEM_CACHES)
+@patch.dict(os.environ, {'GOOGLE_CLIENT_ID': 'test-client'})
+class LoginRoleCacheTests(TestCase):
+    def setUp(self):
+        bump_allowed_emails_version()  # drop any allow-list another test left in this process
+        self.client = APIClient()
+        claims = {'sub': 'g-1', 'email': 'volunteer@example.com', 'name': 'Vol', 'picture': 'https://img.example/v.png'}
+        verify = patch('authentication.views.verify_google_token', return_value=claims)
+        verify.start()
+        self.addCleanup(verify.stop)
+
+    def login(self):
+        response = self.client.post(reverse('google_login'), {'token': 'id-token'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['user']
+
+    def test_unchanged_login_reads_one_row_and_writes_nothing(self):
+        self.login()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.login()['role'], 'USER')
+
+    def test_team_changes_reach_the_next_login(self):
+        self.login()
+        admin = User.objects.create_user(email='admin@example.com', role='ADMIN', is_staff=True)
+        self.client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('team-list'), {'email': 'volunteer@example.com', 'role': 'VOLUNTEER'})
+        self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(None)
+
+        # Reload of the allow-list, then one UPDATE of just the changed columns
+        with self.assertNumQueries(3) as queries:
+            user = self.login()
+        self.assertEqual((user['role'], user['is_staff']), ('VOLUNTEER', True))
+        update = queries.captured_queries[-1]['sql']
+        self.assertIn('"role"', update)
+        self.assertNotIn('"full_name"', update)
+
+        with self.assertNumQueries(1):
+            self.login()
+
+        self.client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('team-delete', args=[AllowedEmail.objects.get().pk]))
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.login()['role'], 'VOLUNTEER')  # existing roles are kept
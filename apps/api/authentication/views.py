@@ -3,9 +3,9 @@ from rest_framework.views import APIView
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from .google_certs import verify_google_token
 from .models import User
+from .roles import get_allowed_role
 from .serializers import UserSerializer
 import logging
 import os
@@ -28,13 +28,9 @@ class GoogleLoginView(APIView):
                 logger.error("GOOGLE_CLIENT_ID is missing in server environment.")
                 return Response({'error': 'Server configuration error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Verify the token
+            # Verify the token (certificates come from the process-wide cache)
             try:
-                idinfo = id_token.verify_oauth2_token(
-                    token, 
-                    google_requests.Request(), 
-                    client_id
-                )
+                idinfo = verify_google_token(token, client_id)
             except ValueError as e:
                 logger.error(f"Google Token Verification Failed: {e}")
                 return Response({'error': 'Invalid token'}, status=status.HTTP_401_UNAUTHORIZED)
@@ -46,44 +42,38 @@ class GoogleLoginView(APIView):
             picture = idinfo.get('picture', '')
 
             # Get or Create User
+            role = get_allowed_role(email)
             try:
                 user = User.objects.get(email=email)
-                # Update info if changed or missing
+                # Update info if changed or missing, writing only what changed
+                changed = []
                 if not user.google_id:
                     user.google_id = google_id
+                    changed.append('google_id')
                 if picture and user.avatar != picture:
                     user.avatar = picture
-                
+                    changed.append('avatar')
+
                 # Check for role update (if added to allowed list after creation)
-                from .models import AllowedEmail
-                try:
-                    allowed = AllowedEmail.objects.get(email=email)
-                    user.role = allowed.role
-                    user.is_staff = True  # Grant access to admin panel
-                except AllowedEmail.DoesNotExist:
-                    pass # Keep existing role
+                if role is not None:
+                    if user.role != role:
+                        user.role = role
+                        changed.append('role')
+                    if not user.is_staff:
+                        user.is_staff = True  # Grant access to admin panel
+                        changed.append('is_staff')
 
-                user.save()
+                if changed:
+                    user.save(update_fields=changed)
             except User.DoesNotExist:
-                # Check whitelist for new users
-                from .models import AllowedEmail
-                role = 'USER'
-                is_staff = False
-                
-                try:
-                    allowed = AllowedEmail.objects.get(email=email)
-                    role = allowed.role
-                    is_staff = True
-                except AllowedEmail.DoesNotExist:
-                    pass
-
+                # Whitelisted new users get their role and admin access
                 user = User.objects.create_user(
                     email=email,
                     full_name=name,
                     google_id=google_id,
                     avatar=picture,
-                    role=role,
-                    is_staff=is_staff
+                    role=role or 'USER',
+                    is_staff=role is not None
                 )
 
             # Generate JWT
@@ -0,0 +1,31 @@
+"""
+Keyset pagination for list endpoints.
+
+Pages are opt-in: a request without ?cursor= or ?page_size= still gets the
+plain JSON array the web app expects, unless API_PAGINATE_BY_DEFAULT is on.
+Paged responses use DRF's cursor format ({"next", "previous", "results"}),
+so page N costs the same as page 1 however large the table grows.
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    page_size_query_param = 'page_size'
+    ordering = ('-id',)
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if not (settings.API_PAGINATE_BY_DEFAULT or self.cursor_query_param in params or self.page_size_query_param in params):
+            return None
+        self.page_size = settings.API_PAGE_SIZE  # default when ?page_size= is absent
+        return super().paginate_queryset(queryset, request, view)
+
+
+def cursor_pagination(*ordering):
+    """Pagination class for a view, ordered by `ordering` (indexed, ending in a unique field)."""
+    return type('CursorPagination', (OptionalCursorPagination,), {'ordering': ordering})
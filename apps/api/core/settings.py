@@ -103,6 +103,45 @@ DATABASES = {
     )
 }
 
+# Cache
+# 'default' is shared by every worker (version stamps, cross-process state);
+# 'local' is a per-process memory cache for rendered payloads.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'astra_cache',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'astra-local',
+    },
+}
+
+# Public event catalog cache (see events/cache.py)
+EVENT_CATALOG_CACHE_TIMEOUT = int(os.environ.get('EVENT_CATALOG_CACHE_TIMEOUT', 300))
+EVENT_CATALOG_CACHE_CONTROL = os.environ.get('EVENT_CATALOG_CACHE_CONTROL', 'public, max-age=0, must-revalidate')
+
+# Ticket images (see events/utils.py): rendered when a seat is confirmed,
+# stored under QR_CACHE_DIR and served from TICKET_MEDIA_URL
+QR_MEMORY_CACHE_SIZE = int(os.environ.get('QR_MEMORY_CACHE_SIZE', 512))
+QR_CACHE_DIR = os.environ.get('QR_CACHE_DIR', str(BASE_DIR / 'media' / 'tickets'))
+TICKET_MEDIA_URL = '/media/tickets/'
+# Processes rendering QR images for bulk jobs (e.g. resends); 1 renders in-process
+TICKET_RENDER_WORKERS = int(os.environ.get('TICKET_RENDER_WORKERS', '2'))
+
+# Ticket tokens (see events/tickets.py)
+TICKET_SIGNING_KEY = os.environ.get('TICKET_SIGNING_KEY', SECRET_KEY)
+ACCEPT_LEGACY_TICKET_TOKENS = os.environ.get('ACCEPT_LEGACY_TICKET_TOKENS', 'True') == 'True'
+# PKCS#1 PEM RSA private key signing offline scanner bundles (escaped \n newlines are fine);
+# devices fetch the public half from /operations/events/scanner-key/. Unset: bundles are unsigned.
+# Generate one with: python -c "import rsa; print(rsa.newkeys(2048)[1].save_pkcs1().decode())"
+SCANNER_SIGNING_KEY = os.environ.get('SCANNER_SIGNING_KEY', '')
+# 'url' encodes https://astraietm.in/verify/<token>; 'compact' a 29-char alphanumeric code
+TICKET_QR_ENCODING = os.environ.get('TICKET_QR_ENCODING', 'url')
+
+# Minutes a pending payment may hold a seat before it goes to the waitlist
+SEAT_HOLD_MINUTES = int(os.environ.get('SEAT_HOLD_MINUTES', 15))
+
 AUTH_PASSWORD_VALIDATORS = [
     { 'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator' },
     { 'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator' },
@@ -188,6 +227,11 @@ REST_FRAMEWORK = {
     ),
 }
 
+# List endpoints page on request (?cursor= / ?page_size=); see core/pagination.py
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '50'))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '500'))
+API_PAGINATE_BY_DEFAULT = os.environ.get('API_PAGINATE_BY_DEFAULT', 'False') == 'True'
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -225,6 +269,29 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', 'apikey')  # 'apikey' for Se
 EMAIL_HOST_PASSWORD = os.environ.get('SENDGRID_API_KEY', os.environ.get('EMAIL_HOST_PASSWORD', ''))
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL2', 'ASTRA Events <contact@astraietm.in>')
 
+# Email outbox (ops/outbox.py): messages are queued in the database and sent
+# by `manage.py run_outbox`. Web processes also drain the outbox after each
+# commit unless OUTBOX_DRAIN_IN_PROCESS is off (e.g. when a worker runs).
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '50'))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '6'))
+OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('OUTBOX_RETRY_BASE_SECONDS', '30'))
+OUTBOX_RETRY_MAX_SECONDS = int(os.environ.get('OUTBOX_RETRY_MAX_SECONDS', '3600'))
+OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS', '300'))
+OUTBOX_DRAIN_IN_PROCESS = os.environ.get('OUTBOX_DRAIN_IN_PROCESS', 'True') == 'True'
+# SMTP connections a drain sends a batch over in parallel
+OUTBOX_SMTP_CONNECTIONS = int(os.environ.get('OUTBOX_SMTP_CONNECTIONS', '2'))
+# Send budget across all processes (ops/ratelimit.py); 0 disables a limit
+MAIL_RATE_PER_SECOND = float(os.environ.get('MAIL_RATE_PER_SECOND', '10'))
+MAIL_BURST = int(os.environ.get('MAIL_BURST', '0'))  # defaults to one second's worth
+MAIL_DAILY_BUDGET = int(os.environ.get('MAIL_DAILY_BUDGET', '0'))  # e.g. 100 on SendGrid's free tier
+
 # Razorpay Configuration
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID', '')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', '')
+
+# Google Sign-In: signing certificates are cached for their Cache-Control max-age
+# and fetched over one pooled session per process (authentication/google_certs.py)
+GOOGLE_CERTS_URL = os.environ.get('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+GOOGLE_HTTP_POOL_SIZE = int(os.environ.get('GOOGLE_HTTP_POOL_SIZE', '10'))
+# Each worker caches the team allow-list and checks its version stamp at most this often
+ALLOWED_EMAILS_CHECK_SECONDS = float(os.environ.get('ALLOWED_EMAILS_CHECK_SECONDS', '5'))
@@ -1,26 +1,56 @@
 from django.contrib import admin
-from django.http import HttpResponse
-import csv
-from .models import Registration, Event, Payment
+from django.urls import reverse
+from django.utils.html import format_html
+from .export import export_queryset, export_response
+from .printables import printables_response
+from .seats import confirm_seat
+from .models import Registration, Event, Payment, WaitlistEntry, ScanRecord
 
 class EventAdmin(admin.ModelAdmin):
     list_display = ('title', 'event_date', 'venue', 'category', 'is_registration_open', 'requires_payment', 'payment_amount')
     search_fields = ('title', 'venue')
     list_filter = ('is_registration_open', 'category', 'requires_payment')
+    actions = ['print_ticket_sheets', 'print_certificates']
+
+    def print_ticket_sheets(self, request, queryset):
+        # Drawn in the rendering pool and streamed, so big events don't time out
+        return printables_response('tickets', list(queryset.values_list('pk', flat=True)))
+
+    print_ticket_sheets.short_description = "Print ticket sheets (PDF) for confirmed seats"
+
+    def print_certificates(self, request, queryset):
+        return printables_response('certificates', list(queryset.values_list('pk', flat=True)))
+
+    print_certificates.short_description = "Print merit certificates (PDF) for attendees"
 
 class RegistrationAdmin(admin.ModelAdmin):
     list_display = ('get_user_email', 'get_user_name', 'get_phone_number', 'get_event_title', 'is_used', 'timestamp')
     list_filter = ('event__title', 'is_used', 'timestamp')
     search_fields = ('user__email', 'user__full_name', 'phone_number', 'user__phone_number', 'token', 'event__title')
-    actions = ['export_as_csv', 'resend_confirmation_email']
+    actions = ['export_as_csv', 'export_as_ndjson', 'export_tickets_as_zip', 'resend_confirmation_email', 'confirm_seats']
+    # Seat counters on Event follow seat_state, so it only changes through seats.py
+    readonly_fields = ('seat_state',)
 
-    def resend_confirmation_email(self, request, queryset):
-        from .emails import send_registration_email
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            # Tickets issued by staff get a confirmed seat, even past the limit
+            confirm_seat(obj)
+
+    def confirm_seats(self, request, queryset):
+        registrations = queryset.filter(seat_state__in=['NONE', 'HELD']).exclude(status='CANCELLED')
         count = 0
-        for registration in queryset:
-            if send_registration_email(registration):
-                count += 1
-        self.message_user(request, f"Sent {count} emails successfully.")
+        for registration in registrations:
+            confirm_seat(registration)
+            count += 1
+        self.message_user(request, f'Confirmed {count} seats.')
+    confirm_seats.short_description = "Confirm seats for selected registrations"
+
+    def resend_confirmation_email(self, request, queryset):
+        from .utils import resend_registration_emails
+        batch, count = resend_registration_emails(queryset.select_related('user', 'event'))
+        progress = reverse('admin:ops_outboxmessage_changelist') + f'?batch={batch}'
+        self.message_user(request, format_html('Queued {} emails. <a href="{}">Follow progress</a>.', count, progress))
     resend_confirmation_email.short_description = "Resend QR Email"
 
     def get_user_email(self, obj):
@@ -41,30 +71,21 @@ class RegistrationAdmin(admin.ModelAdmin):
     get_event_title.short_description = 'Event'
 
     def export_as_csv(self, request, queryset):
-        meta = self.model._meta
-        # Custom CSV export to handle ForeignKeys nicely
-        field_names = ['User Email', 'User Name', 'Phone Number', 'Event', 'Token', 'Is Used', 'Timestamp']
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename={}.csv'.format('registrations')
-        writer = csv.writer(response)
-
-        writer.writerow(field_names)
-        for obj in queryset:
-            writer.writerow([
-                obj.user.email,
-                obj.user.full_name,
-                obj.phone_number or getattr(obj.user, 'phone_number', '-'),
-                obj.event.title,
-                obj.token,
-                obj.is_used,
-                obj.timestamp
-            ])
-
-        return response
+        # Streamed straight from the database so big events don't time out
+        return export_response(export_queryset(queryset=queryset), 'csv')
 
     export_as_csv.short_description = "Export Selected to CSV"
 
+    def export_as_ndjson(self, request, queryset):
+        return export_response(export_queryset(queryset=queryset), 'ndjson')
+
+    export_as_ndjson.short_description = "Export Selected to NDJSON"
+
+    def export_tickets_as_zip(self, request, queryset):
+        return export_response(export_queryset(queryset=queryset), 'zip', 'tickets')
+
+    export_tickets_as_zip.short_description = "Export Selected Tickets (QR images) to ZIP"
+
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('razorpay_order_id', 'get_user_email', 'get_event_title', 'amount', 'status', 'created_at')
     list_filter = ('status', 'created_at')
@@ -79,6 +100,20 @@ class PaymentAdmin(admin.ModelAdmin):
         return obj.registration.event.title
     get_event_title.short_description = 'Event'
 
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'event', 'sequence', 'status', 'created_at', 'promoted_at')
+    list_filter = ('status', 'event__title')
+    search_fields = ('user__email', 'event__title')
+    list_select_related = ('user', 'event')
+
+class ScanRecordAdmin(admin.ModelAdmin):
+    list_display = ('token', 'event', 'device_id', 'result', 'scanned_at', 'created_at')
+    list_filter = ('result', 'event__title', 'device_id')
+    search_fields = ('token', 'scan_id', 'device_id')
+    list_select_related = ('event',)
+
 admin.site.register(Event, EventAdmin)
 admin.site.register(Registration, RegistrationAdmin)
 admin.site.register(Payment, PaymentAdmin)
+admin.site.register(WaitlistEntry, WaitlistEntryAdmin)
+admin.site.register(ScanRecord, ScanRecordAdmin)
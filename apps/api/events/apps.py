@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import emails  # noqa: F401  registers the outbox email builders
@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'events:catalog:version'
+
+# Per thread, like database connections: counts commits that bumped the version
+_commits = threading.local()
+
+
+def get_catalog_version():
+    """
+    Current catalog version stamp. Lives in the shared 'default' cache so a
+    bump in one worker invalidates the payloads held by every other worker.
+    """
+    cache = caches['default']
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    # A fresh timestamp (rather than incr) can never collide with a stale
+    # payload, even if the stamp was evicted and recreated in between.
+    try:
+        caches['default'].set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+    except DatabaseError as e:
+        # Cache table missing or DB hiccup: cached payloads expire on their own
+        logger.warning(f"Catalog version bump failed: {e}")
+
+
+def bump_catalog_version_on_commit():
+    """
+    Bump the catalog version once the current transaction commits. However
+    many catalog changes a transaction makes, the shared stamp is written once.
+    """
+    generation = getattr(_commits, 'generation', 0)
+
+    def bump():
+        # The first callback of a commit bumps and moves the generation on, so
+        # the rest of that commit's callbacks skip. A rolled-back transaction
+        # drops its callbacks and leaves the generation alone.
+        if getattr(_commits, 'generation', 0) == generation:
+            _commits.generation = generation + 1
+            bump_catalog_version()
+
+    transaction.on_commit(bump)
+
+
+def get_catalog_payload(name, build):
+    """
+    Return (body, etag) for a catalog payload, building it with build() only
+    when the current version has no cached copy in this process.
+    """
+    try:
+        version = get_catalog_version()
+    except DatabaseError as e:
+        # Cache table missing or DB hiccup: serve uncached rather than fail
+        logger.warning(f"Catalog cache unavailable: {e}")
+        version = None
+
+    key = f'events:catalog:{version}:{name}'
+    local = caches['local']
+    entry = local.get(key) if version is not None else None
+    if entry is None:
+        body = JSONRenderer().render(build())
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()
+        entry = (body, etag)
+        if version is not None:
+            local.set(key, entry, settings.EVENT_CATALOG_CACHE_TIMEOUT)
+    return entry
+
+
+class CachedCatalogMixin:
+    """
+    Serve GET requests from the versioned catalog cache with a strong ETag,
+    answering matching If-None-Match requests with 304 Not Modified.
+    """
+
+    def get(self, request, *args, **kwargs):
+        body, etag = get_catalog_payload(
+            request.get_full_path(),
+            lambda: super(CachedCatalogMixin, self).get(request, *args, **kwargs).data,
+        )
+
+        # If-None-Match uses weak comparison, so W/ prefixes added by proxies still match
+        etags = [e.removeprefix('W/') for e in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))]
+        if '*' in etags or etag in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = settings.EVENT_CATALOG_CACHE_CONTROL
+        return response
@@ -0,0 +1,149 @@
+"""
+Streaming registration exports (CSV, NDJSON, or a ZIP of ticket images).
+
+Rows are read with one joined query through a server-side iterator and
+written out as they arrive, so memory stays flat however big the event is.
+Ticket images for the ZIP come from the rendering pool (events/rendering.py).
+"""
+import csv
+import io
+import itertools
+import json
+import zipfile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from .models import Registration
+
+CHUNK_SIZE = 2000
+
+# (column, lookup) pairs; lookups are fetched with one .values() query
+EXPORT_FIELDS = [
+    ('registration_id', 'id'),
+    ('user_email', 'user__email'),
+    ('user_name', 'user__full_name'),
+    ('phone_number', 'phone_number'),
+    ('college', 'college'),
+    ('department', 'department'),
+    ('year_of_study', 'year_of_study'),
+    ('event_id', 'event_id'),
+    ('event', 'event__title'),
+    ('team_name', 'team_name'),
+    ('team_members', 'team_members'),
+    ('status', 'status'),
+    ('seat_state', 'seat_state'),
+    ('is_used', 'is_used'),
+    ('token', 'token'),
+    ('timestamp', 'timestamp'),
+    ('payment_status', 'payment__status'),
+    ('payment_amount', 'payment__amount'),
+    ('razorpay_order_id', 'payment__razorpay_order_id'),
+    ('razorpay_payment_id', 'payment__razorpay_payment_id'),
+]
+COLUMNS = [column for column, _ in EXPORT_FIELDS]
+
+# Registration-level details fall back to the user's profile, as in the admin
+FALLBACKS = {
+    'phone_number': 'user__phone_number',
+    'college': 'user__college',
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'zip': 'application/zip',
+}
+
+
+def export_queryset(event_id=None, status=None, queryset=None):
+    queryset = Registration.objects.all() if queryset is None else queryset
+    if event_id is not None:
+        queryset = queryset.filter(event_id=event_id)
+    if status is not None:
+        queryset = queryset.filter(status=status)
+    return queryset.order_by('event_id', 'id')
+
+
+def export_rows(queryset):
+    """Yield one dict per registration, in COLUMNS order."""
+    lookups = [lookup for _, lookup in EXPORT_FIELDS] + list(FALLBACKS.values())
+    for row in queryset.values(*lookups).iterator(chunk_size=CHUNK_SIZE):
+        for lookup, fallback in FALLBACKS.items():
+            row[lookup] = row[lookup] or row[fallback] or ''
+        yield {column: row[lookup] for column, lookup in EXPORT_FIELDS}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(['' if row[column] is None else row[column] for column in COLUMNS])
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+class ZipStream:
+    """Unseekable file for zipfile; take() hands back what was written so far."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def stream_zip(rows):
+    """
+    tickets/<event_id>/<registration_id>.png for every row, then the rows as
+    registrations.csv. Images are rendered in the pool a window at a time.
+    """
+    from .rendering import WINDOW_SIZE, render_tickets
+    out = ZipStream()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(COLUMNS)
+    rows = iter(rows)
+    with zipfile.ZipFile(out, 'w') as archive:
+        while window := list(itertools.islice(rows, WINDOW_SIZE)):
+            images = render_tickets([row['token'] for row in window])
+            for row, (_, image) in zip(window, images):
+                writer.writerow(['' if row[column] is None else row[column] for column in COLUMNS])
+                # PNGs are already compressed
+                archive.writestr(f"tickets/{row['event_id']}/{row['registration_id']}.png", image, zipfile.ZIP_STORED)
+                yield out.take()
+        archive.writestr('registrations.csv', manifest.getvalue(), zipfile.ZIP_DEFLATED)
+    yield out.take()
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+    'zip': stream_zip,
+}
+
+
+def export_response(queryset, fmt='csv', filename='registrations'):
+    """StreamingHttpResponse exporting the registrations in `queryset`."""
+    stream = STREAMS[fmt]
+    response = StreamingHttpResponse(stream(export_rows(queryset)), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    response['Cache-Control'] = 'no-store'
+    return response
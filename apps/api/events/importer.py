@@ -0,0 +1,190 @@
+"""
+Bulk registration import for on-spot and offline sign-ups.
+
+A whole sheet is applied in a fixed number of queries: users are upserted in
+bulk, each event's capacity is checked and claimed once under a row lock,
+registrations are inserted with one bulk_create and ticket emails are queued
+in the outbox with one more insert. Ticket images are stored after commit
+by the rendering pool. Every input row gets a line in the report.
+"""
+import csv
+import io
+import secrets
+from collections import Counter
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from .cache import bump_catalog_version_on_commit
+from .models import Event, Registration
+from .rendering import prerender_on_commit
+from .tickets import assign_ticket_tokens
+from .utils import send_registration_emails
+
+User = get_user_model()
+
+MAX_ROWS = 5000
+USER_FIELDS = ('full_name', 'phone_number', 'college')
+REGISTRATION_FIELDS = ('team_name', 'team_members', 'phone_number', 'college', 'department', 'year_of_study')
+
+
+def parse_csv(file):
+    """Rows of an uploaded CSV file (header row required) as dicts."""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig')
+    return [{k.strip(): (v or '').strip() for k, v in row.items() if k} for row in csv.DictReader(text)]
+
+
+def import_registrations(rows, event_id=None, send_emails=True, dry_run=False):
+    """
+    Register every row ({'email', 'event'?, 'full_name', ...}) and return a
+    report: {'created', 'skipped', 'failed', 'rows': [...]}. `event_id` is
+    used for rows without an 'event' column. With dry_run nothing is saved.
+    """
+    report = [{'row': i + 1, 'email': None, 'event': None, 'result': None, 'message': ''} for i in range(len(rows))]
+    pending = []  # (report line, cleaned row)
+    seen = set()
+
+    for line, row in zip(report, rows):
+        email = User.objects.normalize_email(str(row.get('email') or '').strip())
+        event = row.get('event') or event_id
+        line['email'], line['event'] = email, event
+        try:
+            validate_email(email)
+            event = int(event)
+        except (ValidationError, TypeError, ValueError):
+            _fail(line, "A valid email and event ID are required.")
+            continue
+        line['event'] = event
+        if (email.lower(), event) in seen:
+            _skip(line, "Duplicate row in this import.")
+            continue
+        seen.add((email.lower(), event))
+        pending.append((line, {key: str(row.get(key) or '').strip() for key in set(USER_FIELDS + REGISTRATION_FIELDS)}))
+
+    with transaction.atomic():
+        events = Event.objects.select_for_update().in_bulk({line['event'] for line, _ in pending})
+        pending = [(line, row) for line, row in pending if line['event'] in events or _fail(line, "Event not found.")]
+
+        users = _upsert_users([(line['email'], row) for line, row in pending])
+        for line, row in pending:
+            row['user'] = users[line['email'].lower()]
+
+        taken = set(
+            Registration.objects.filter(
+                user__in=[row['user'] for _, row in pending],
+                event_id__in=events,
+            ).values_list('user_id', 'event_id')
+        )
+        pending = [
+            (line, row) for line, row in pending
+            if (row['user'].pk, line['event']) not in taken or _skip(line, "Already registered for this event.")
+        ]
+
+        # Claim each event's seats with a single update
+        admitted = []
+        wanted = Counter(line['event'] for line, _ in pending)
+        free = {pk: max(event.registration_limit - event.seats_confirmed - event.seats_held, 0) for pk, event in events.items()}
+        for line, row in pending:
+            if free[line['event']] > 0:
+                free[line['event']] -= 1
+                admitted.append((line, row))
+            else:
+                _fail(line, "Event is fully booked.")
+        claimed = Counter(line['event'] for line, _ in admitted)
+        for pk, count in claimed.items():
+            Event.objects.filter(pk=pk).update(seats_confirmed=F('seats_confirmed') + count)
+
+        registrations = Registration.objects.bulk_create([
+            Registration(
+                user=row['user'],
+                event=events[line['event']],
+                token=secrets.token_urlsafe(32),  # placeholder until the pk is known
+                seat_state='CONFIRMED',
+                **{name: row[name] for name in REGISTRATION_FIELDS},
+            )
+            for line, row in admitted
+        ])
+        if registrations:
+            assign_ticket_tokens(registrations)
+        for (line, _), registration in zip(admitted, registrations):
+            line.update(result='created', registration_id=registration.pk, token=registration.token)
+
+        if dry_run:
+            transaction.set_rollback(True)
+        elif registrations:
+            bump_catalog_version_on_commit()
+            prerender_on_commit(registration.token for registration in registrations)
+            if send_emails:
+                send_registration_emails(registrations)
+
+    if dry_run:
+        for line in report:
+            line.pop('registration_id', None)
+            line.pop('token', None)
+    results = Counter(line['result'] for line in report)
+    return {
+        'created': results['created'],
+        'skipped': results['skipped'],
+        'failed': results['failed'],
+        'full_events': [pk for pk in wanted if wanted[pk] > claimed[pk]],
+        'dry_run': dry_run,
+        'rows': report,
+    }
+
+
+def _upsert_users(entries):
+    """
+    Map lower-cased email -> User for every (email, details) entry, creating
+    missing users in one insert and filling blank profile fields in one update.
+    Emails match case-insensitively, and new users get the lower-cased
+    address (the form Google sign-in uses), so a sheet row never duplicates
+    an existing account.
+    """
+    by_email = {}
+    for email, row in entries:
+        by_email.setdefault(email.lower(), (email, row))
+
+    existing = _users_by_email(by_email)
+    missing = [key for key in by_email if key not in existing]
+    if missing:
+        unusable = make_password(None)
+        User.objects.bulk_create([
+            User(email=key, password=unusable, **{name: by_email[key][1][name] for name in USER_FIELDS})
+            for key in missing
+        ], ignore_conflicts=True)
+        # Re-read rather than trust returned pks; a concurrent sign-up may have won
+        existing.update(_users_by_email(missing))
+
+    changed = []
+    for key, (_, row) in by_email.items():
+        user = existing[key]
+        fields = [name for name in USER_FIELDS if row[name] and not getattr(user, name)]
+        for name in fields:
+            setattr(user, name, row[name])
+        if fields:
+            changed.append(user)
+    if changed:
+        User.objects.bulk_update(changed, USER_FIELDS)
+    return existing
+
+
+def _users_by_email(keys):
+    """{lower-cased email: User} for the users whose email matches one of `keys` in any case."""
+    users = User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=list(keys)).order_by('pk')
+    found = {}
+    for user in users:
+        found.setdefault(user.email_lower, user)
+    return found
+
+
+def _fail(line, message):
+    line.update(result='failed', message=message)
+    return False
+
+
+def _skip(line, message):
+    line.update(result='skipped', message=message)
+    return False
@@ -0,0 +1,40 @@
+import base64
+import io
+import re
+import time
+from django.core.management.base import BaseCommand
+from events.tickets import make_ticket_token
+from events.utils import build_qr, rasterize_qr
+
+def legacy_render(qr):
+    """The previous path: qrcode's PIL drawer, RGB PNG, data URI, decoded again."""
+    img = qr.make_image(fill_color="#000000", back_color="white").convert('RGB')
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    data_uri = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+    return base64.b64decode(re.sub('^data:image/.+;base64,', '', data_uri))
+
+class Command(BaseCommand):
+    help = 'Compare the direct QR rasterizer with the previous PIL drawer path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help='Tickets rendered per case')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        tokens = [make_ticket_token(100000 + i, 990 + i % 10) for i in range(count)]
+
+        started = time.perf_counter()
+        codes = [build_qr(token) for token in tokens]
+        matrix_time = time.perf_counter() - started
+
+        self.stdout.write(f"{'case':<18} {'total s':>8} {'ms/ticket':>10} {'tickets/s':>10} {'png bytes':>10}")
+        self.stdout.write(f"{'encode matrix':<18} {matrix_time:>8.2f} {matrix_time * 1000 / count:>10.3f} {count / matrix_time:>10.0f} {'-':>10}")
+        for label, render in (('legacy drawer', legacy_render), ('direct 1-bit', rasterize_qr)):
+            started = time.perf_counter()
+            size = sum(len(render(qr)) for qr in codes)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:<18} {elapsed:>8.2f} {elapsed * 1000 / count:>10.3f} {count / elapsed:>10.0f} {size // count:>10}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rendered {count} tickets per case (encoding excluded from the render rows)."))
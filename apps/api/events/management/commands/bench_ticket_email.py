@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from authentication.models import User
+from events.models import Event, Registration
+from events.tickets import make_ticket_token
+from events.ticket_email import clear_cache, render_ticket_email
+
+class Command(BaseCommand):
+    help = 'Measure ticket email renders per second, with and without the per-event layout cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=5000, help='Emails rendered per case')
+        parser.add_argument('--events', type=int, default=5, help='Distinct events the tickets are spread over')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        # Unsaved instances: this measures rendering only, never the database
+        now = timezone.now()
+        events = [
+            Event(pk=900 + i, title=f"Benchmark Event {i}", venue="Main Auditorium", event_date=now + timedelta(days=i))
+            for i in range(options['events'])
+        ]
+        registrations = [
+            Registration(
+                pk=100000 + i,
+                event=events[i % len(events)],
+                user=User(email=f"attendee{i}@example.com", full_name=f"Attendee <{i}>"),
+                team_name=f"Team {i}" if i % 3 == 0 else '',
+                token=make_ticket_token(100000 + i, events[i % len(events)].pk),
+            )
+            for i in range(count)
+        ]
+
+        self.stdout.write(f"{'case':<22} {'renders/s':>10} {'us/render':>10}")
+        for label, cold in (('full layout render', True), ('cached event layout', False)):
+            clear_cache()
+            started = time.perf_counter()
+            for registration in registrations:
+                if cold:
+                    clear_cache()
+                render_ticket_email(registration)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label:<22} {count / elapsed:>10.0f} {elapsed * 1e6 / count:>10.1f}")
+        self.stdout.write(self.style.SUCCESS(f"Rendered {count} ticket emails per case."))
@@ -0,0 +1,33 @@
+import secrets
+import time
+from django.core.management.base import BaseCommand
+from events.tickets import make_ticket_token, ticket_qr_payload
+from events.utils import build_qr, render_qr_png
+
+class Command(BaseCommand):
+    help = 'Compare ticket QR payload encodings: generation time, PNG size and symbol size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='Tickets rendered per encoding')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        # Realistic ids: six-digit registrations across a handful of events
+        tokens = [make_ticket_token(100000 + i, 990 + i % 10) for i in range(count)]
+        cases = [
+            ('legacy url', [secrets.token_urlsafe(32) for _ in range(count)], 'url'),
+            ('signed url', tokens, 'url'),
+            ('compact', tokens, 'compact'),
+        ]
+
+        self.stdout.write(f"{'encoding':<12} {'chars':>6} {'version':>8} {'modules':>8} {'png bytes':>10} {'ms/ticket':>10}")
+        for label, case_tokens, encoding in cases:
+            qr = build_qr(case_tokens[0], encoding)
+            started = time.perf_counter()
+            size = sum(len(render_qr_png(token, encoding=encoding)) for token in case_tokens)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:<12} {len(ticket_qr_payload(case_tokens[0], encoding)):>6} {qr.version:>8} "
+                f"{qr.modules_count:>8} {size // count:>10} {elapsed * 1000 / count:>10.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rendered {count} tickets per encoding."))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from events.models import Registration
+from events.tickets import LEGACY_TOKEN_RE, make_ticket_token
+
+class Command(BaseCommand):
+    help = (
+        'Replace legacy random ticket tokens with signed ones. The old value is kept in legacy_token, so '
+        'QR codes already sent keep working until ACCEPT_LEGACY_TICKET_TOKENS is turned off; '
+        'use --resend to email the new tickets before that'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, help='Only reissue tickets for this event ID')
+        parser.add_argument('--resend', action='store_true', help='Email the new ticket to each attendee')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many tickets would change')
+
+    def handle(self, *args, **options):
+        queryset = Registration.objects.exclude(token__contains='.').select_related('user', 'event')
+        if options['event']:
+            queryset = queryset.filter(event_id=options['event'])
+        legacy = [r for r in queryset if LEGACY_TOKEN_RE.match(r.token)]
+
+        if options['dry_run']:
+            self.stdout.write(f"{len(legacy)} legacy tickets would be reissued.")
+            return
+
+        now = timezone.now()
+        for registration in legacy:
+            registration.legacy_token = registration.token
+            registration.token = make_ticket_token(registration.pk, registration.event_id)
+            # bulk_update skips auto_now; delta scanner bundles go by updated_at
+            registration.updated_at = now
+        Registration.objects.bulk_update(legacy, ['token', 'legacy_token', 'updated_at'], batch_size=500)
+
+        if options['resend']:
+            from events.utils import send_registration_email
+            for registration in legacy:
+                send_registration_email(registration)
+
+        self.stdout.write(self.style.SUCCESS(f"Reissued {len(legacy)} tickets."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from events.seats import release_expired_holds
+
+class Command(BaseCommand):
+    help = 'Release seats held by abandoned payments and promote the waitlist'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, action='append', dest='events', help='Limit to this event ID (repeatable)')
+
+    def handle(self, *args, **options):
+        released = release_expired_holds(event_ids=options['events'])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired seat holds."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from events.models import Event
+from events.printables import KINDS, PrintJob, attendees, printable_items
+
+class Command(BaseCommand):
+    help = 'Render ticket sheets or merit certificates for every attendee of an event into one PDF or ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event', type=int, nargs='+', help='Event ID(s)')
+        parser.add_argument('--kind', choices=sorted(KINDS), default='tickets',
+                            help='Ticket sheets for confirmed seats, or certificates for attendees')
+        parser.add_argument('--format', choices=['pdf', 'zip'], default='pdf', help='One multi-page PDF, or a ZIP of PNG pages')
+        parser.add_argument('--output', help='Output file (default <kind>.<format>)')
+        parser.add_argument('--workers', type=int, default=None, help='Render processes (default TICKET_RENDER_WORKERS)')
+
+    def handle(self, *args, **options):
+        missing = set(options['event']) - set(Event.objects.filter(pk__in=options['event']).values_list('pk', flat=True))
+        if missing:
+            raise CommandError(f"Unknown event ID(s): {', '.join(map(str, sorted(missing)))}")
+
+        kind, fmt = options['kind'], options['format']
+        output = options['output'] or f'{kind}.{fmt}'
+        job = PrintJob(kind, printable_items(attendees(kind, options['event'])), fmt, options['workers'])
+        with open(output, 'wb') as f:
+            for data in job:
+                f.write(data)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {job.count} {kind} on {job.pages} pages to {output} in {job.elapsed:.1f}s "
+            f"({job.pages_per_second:.1f} pages/s, {job.count / job.elapsed if job.elapsed else 0:.1f} {kind}/s)."
+        ))
@@ -0,0 +1,48 @@
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from events.models import Registration
+from events.rendering import WINDOW_SIZE, prerender
+from events.utils import _qr_cache_path
+
+class Command(BaseCommand):
+    help = 'Store the PNG/SVG images of existing tickets, and optionally remove images of deleted registrations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, help='Only render tickets for this event ID')
+        parser.add_argument('--workers', type=int, default=None, help='Render processes (default TICKET_RENDER_WORKERS)')
+        parser.add_argument('--prune', action='store_true', help='Also delete stored images that belong to no registration')
+
+    def handle(self, *args, **options):
+        queryset = Registration.objects.exclude(token='')
+        if options['event']:
+            queryset = queryset.filter(event_id=options['event'])
+
+        started = time.perf_counter()
+        rendered = 0
+        window = []
+        for token in queryset.values_list('token', flat=True).iterator(chunk_size=WINDOW_SIZE):
+            window.append(token)
+            if len(window) == WINDOW_SIZE:
+                rendered += prerender(window, workers=options['workers'])
+                window = []
+        rendered += prerender(window, workers=options['workers'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} tickets in {elapsed:.1f}s."))
+
+        if options['prune']:
+            self.stdout.write(self.style.SUCCESS(f"Removed {self.prune()} orphaned images."))
+
+    def prune(self):
+        # Names of every current ticket; anything else in the store is orphaned
+        keep = {
+            _qr_cache_path(token, 'png').stem
+            for token in Registration.objects.values_list('token', flat=True).iterator(chunk_size=WINDOW_SIZE)
+        }
+        removed = 0
+        for path in Path(settings.QR_CACHE_DIR).glob('*/*.*'):
+            if path.suffix in ('.png', '.svg') and path.stem not in keep:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
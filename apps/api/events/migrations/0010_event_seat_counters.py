@@ -0,0 +1,49 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:07
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_seats(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Registration = apps.get_model('events', 'Registration')
+
+    paid = Q(event__requires_payment=True)
+    confirmed = Q(status__in=['REGISTERED', 'ATTENDED']) | Q(payment__status='SUCCESS')
+    Registration.objects.exclude(status='CANCELLED').filter(~paid | confirmed).update(seat_state='CONFIRMED')
+    Registration.objects.filter(paid, status='PENDING').filter(
+        Q(payment__isnull=True) | Q(payment__status='PENDING')
+    ).update(seat_state='HELD')
+
+    counts = Event.objects.annotate(
+        confirmed=Count('registrations', filter=Q(registrations__seat_state='CONFIRMED')),
+        held=Count('registrations', filter=Q(registrations__seat_state='HELD')),
+    )
+    for event in counts:
+        Event.objects.filter(pk=event.pk).update(seats_confirmed=event.confirmed, seats_held=event.held)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_registration_college_registration_department_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='seats_confirmed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='seats_held',
+            field=models.PositiveIntegerField(default=0, help_text='Seats held by pending payments'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='seat_state',
+            field=models.CharField(choices=[('NONE', 'No Seat'), ('HELD', 'Held'), ('CONFIRMED', 'Confirmed')], default='NONE', max_length=20),
+        ),
+        migrations.RunPython(backfill_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_event_seat_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='waitlist_head',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='waitlist_tail',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField(help_text="Ticket number in the event's waitlist")),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting'), ('PROMOTED', 'Promoted'), ('LEFT', 'Left')], default='WAITING', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True)),
+                ('team_name', models.CharField(blank=True, max_length=255)),
+                ('team_members', models.TextField(blank=True)),
+                ('phone_number', models.CharField(blank=True, max_length=20)),
+                ('college', models.CharField(blank=True, max_length=255)),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('year_of_study', models.CharField(blank=True, max_length=50)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='events.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'status', 'sequence'], name='events_wait_event_i_3ee06f_idx')],
+                'unique_together': {('user', 'event')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scan_id', models.CharField(help_text='Client-generated ID, makes uploads idempotent', max_length=64, unique=True)),
+                ('device_id', models.CharField(max_length=64)),
+                ('token', models.CharField(max_length=64)),
+                ('scanned_at', models.DateTimeField()),
+                ('result', models.CharField(choices=[('ACCEPTED', 'Accepted'), ('CONFLICT', 'Conflict'), ('INVALID', 'Invalid')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_records', to='events.event')),
+                ('registration', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='scan_records', to='events.registration')),
+            ],
+        ),
+    ]
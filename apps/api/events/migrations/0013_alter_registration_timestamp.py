@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_scanrecord'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registration',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_alter_registration_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='legacy_token',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -2,6 +2,15 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 import secrets
+from .tickets import make_ticket_token
+
+class EventQuerySet(models.QuerySet):
+    def with_registration_count(self):
+        """
+        Annotate each event with its registration count in the same query,
+        so list endpoints don't issue one COUNT per event.
+        """
+        return self.annotate(registration_count=models.Count('registrations'))
 
 class Event(models.Model):
     title = models.CharField(max_length=255)
@@ -18,6 +27,15 @@ class Event(models.Model):
     registration_end = models.DateTimeField(default=timezone.now)
     registration_limit = models.PositiveIntegerField(default=100)
     is_registration_open = models.BooleanField(default=True)
+
+    # Seat counters, maintained atomically by events.seats
+    seats_confirmed = models.PositiveIntegerField(default=0)
+    seats_held = models.PositiveIntegerField(default=0, help_text="Seats held by pending payments")
+
+    # Waitlist ticket counters: tail is the last number handed out, head the
+    # last number promoted, so a user's place in line is sequence - head.
+    waitlist_tail = models.PositiveIntegerField(default=0)
+    waitlist_head = models.PositiveIntegerField(default=0)
     
     # Team Logic
     is_team_event = models.BooleanField(default=False)
@@ -35,6 +53,8 @@ class Event(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = EventQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
@@ -45,12 +65,20 @@ class Registration(models.Model):
         ('ATTENDED', 'Attended'),
         ('CANCELLED', 'Cancelled'),
     )
+    SEAT_STATE_CHOICES = (
+        ('NONE', 'No Seat'),
+        ('HELD', 'Held'),
+        ('CONFIRMED', 'Confirmed'),
+    )
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='registrations')
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='registrations')
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     token = models.CharField(max_length=64, unique=True, blank=True, db_index=True)
+    # Random token the ticket had before reissue_ticket_tokens signed it; still
+    # accepted while ACCEPT_LEGACY_TICKET_TOKENS is on
+    legacy_token = models.CharField(max_length=64, blank=True, default='', db_index=True)
     
     # Team Data
     team_name = models.CharField(max_length=255, blank=True)
@@ -67,15 +95,21 @@ class Registration(models.Model):
     # Status fields
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     is_used = models.BooleanField(default=False) # Deprecated but kept for backward compat
+    seat_state = models.CharField(max_length=20, choices=SEAT_STATE_CHOICES, default='NONE')
 
     def save(self, *args, **kwargs):
-        if not self.token:
-            while True:
-                token = secrets.token_urlsafe(32)
-                if not Registration.objects.filter(token=token).exists():
-                    self.token = token
-                    break
+        if self.token or self.pk is not None:
+            if not self.token:
+                self.token = make_ticket_token(self.pk, self.event_id)
+            super().save(*args, **kwargs)
+            return
+
+        # The signed token needs the primary key, so insert with a random
+        # placeholder (unique without probing) and swap it in afterwards.
+        self.token = secrets.token_urlsafe(32)
         super().save(*args, **kwargs)
+        self.token = make_ticket_token(self.pk, self.event_id)
+        Registration.objects.filter(pk=self.pk).update(token=self.token)
 
     class Meta:
         unique_together = ('user', 'event') # Prevent double registration
@@ -83,6 +117,65 @@ class Registration(models.Model):
     def __str__(self):
         return f"{self.user.email} - {self.event.title} ({self.status})"
 
+class WaitlistEntry(models.Model):
+    STATUS_CHOICES = (
+        ('WAITING', 'Waiting'),
+        ('PROMOTED', 'Promoted'),
+        ('LEFT', 'Left'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='waitlist_entries')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist_entries')
+    sequence = models.PositiveIntegerField(help_text="Ticket number in the event's waitlist")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='WAITING')
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+
+    # Registration details to use on promotion
+    team_name = models.CharField(max_length=255, blank=True)
+    team_members = models.TextField(blank=True)
+    phone_number = models.CharField(max_length=20, blank=True)
+    college = models.CharField(max_length=255, blank=True)
+    department = models.CharField(max_length=100, blank=True)
+    year_of_study = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        unique_together = ('user', 'event')
+        indexes = [models.Index(fields=['event', 'status', 'sequence'])]
+
+    @property
+    def position(self):
+        """
+        Place in line (1 = next). Counts entries that left after joining,
+        so it is an upper bound; only ever decreases.
+        """
+        if self.status != 'WAITING':
+            return None
+        return max(1, self.sequence - self.event.waitlist_head)
+
+    def __str__(self):
+        return f"{self.user.email} - {self.event.title} (#{self.sequence}, {self.status})"
+
+class ScanRecord(models.Model):
+    """A check-in scan uploaded by an offline scanner device"""
+    RESULT_CHOICES = (
+        ('ACCEPTED', 'Accepted'),
+        ('CONFLICT', 'Conflict'),
+        ('INVALID', 'Invalid'),
+    )
+
+    scan_id = models.CharField(max_length=64, unique=True, help_text="Client-generated ID, makes uploads idempotent")
+    device_id = models.CharField(max_length=64)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='scan_records')
+    registration = models.ForeignKey(Registration, on_delete=models.CASCADE, null=True, blank=True, related_name='scan_records')
+    token = models.CharField(max_length=64)
+    scanned_at = models.DateTimeField()
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.device_id} {self.token[:8]}... ({self.result})"
+
 class Payment(models.Model):
     PAYMENT_STATUS_CHOICES = (
         ('PENDING', 'Pending'),
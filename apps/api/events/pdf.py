@@ -0,0 +1,68 @@
+"""
+Minimal streaming PDF writer for pages that are one full-page image each.
+
+Every object is returned as bytes as soon as it is written, and only byte
+offsets are kept for the cross-reference table. The page tree is written
+last, so a document of any length can be streamed without holding its pages.
+"""
+
+COLOR_SPACES = {'L': '/DeviceGray', 'RGB': '/DeviceRGB'}
+
+
+class PdfStream:
+    CATALOG, PAGES = 1, 2
+
+    def __init__(self, dpi):
+        self.dpi = dpi
+        self.position = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 3
+
+    def _object(self, number, body, stream=None):
+        self.offsets[number] = self.position
+        if stream is None:
+            data = b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        else:
+            data = b'%d 0 obj\n%s\nstream\n%s\nendstream\nendobj\n' % (number, body, stream)
+        self.position += len(data)
+        return data
+
+    def _allocate(self, count):
+        first = self.next_id
+        self.next_id += count
+        return range(first, first + count)
+
+    def start(self):
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.position = len(header)
+        return header + self._object(self.CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES)
+
+    def page(self, mode, width, height, data):
+        """One page showing a Flate-compressed `mode` image of width x height pixels."""
+        image_id, content_id, page_id = self._allocate(3)
+        self.page_ids.append(page_id)
+        points_w, points_h = width * 72 / self.dpi, height * 72 / self.dpi
+        content = b'q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q' % (points_w, points_h)
+        return b''.join([
+            self._object(image_id, (
+                '<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s '
+                '/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>' % (width, height, COLOR_SPACES[mode], len(data))
+            ).encode(), data),
+            self._object(content_id, b'<< /Length %d >>' % len(content), content),
+            self._object(page_id, (
+                '<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] '
+                '/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>'
+                % (self.PAGES, points_w, points_h, image_id, content_id)
+            ).encode()),
+        ])
+
+    def finish(self):
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self.page_ids)
+        data = self._object(self.PAGES, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>'.encode())
+        xref_at = self.position
+        count = self.next_id
+        rows = [b'0000000000 65535 f \n'] + [b'%010d 00000 n \n' % self.offsets[number] for number in range(1, count)]
+        return data + b'xref\n0 %d\n' % count + b''.join(rows) + (
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (count, self.CATALOG, xref_at)
+        )
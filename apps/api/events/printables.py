@@ -0,0 +1,208 @@
+"""
+Printable ticket sheets and merit certificates for a whole event.
+
+Pages are drawn in the rendering pool (see map_in_pool() in
+events/rendering.py) and streamed into one multi-page PDF, or a ZIP of PNG
+pages, as they come back. Attendees are read through a server-side iterator,
+so neither the rows nor the pages are held all at once.
+"""
+import functools
+import io
+import itertools
+import time
+import zipfile
+import zlib
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont
+from .export import ZipStream
+from .models import Registration
+from .pdf import PdfStream
+
+DPI = 150
+# A4 at DPI
+PORTRAIT = (1240, 1754)
+LANDSCAPE = (1754, 1240)
+
+# Ticket sheets: COLUMNS x ROWS cut-out tickets per page
+COLUMNS, ROWS = 2, 4
+
+FORMATS = {
+    'pdf': 'application/pdf',
+    'zip': 'application/zip',
+}
+
+ROW_FIELDS = ('id', 'token', 'team_name', 'user__full_name', 'user__email',
+              'event__title', 'event__event_date', 'event__venue')
+
+
+def attendees(kind, event_ids):
+    """Registrations that get a printable of `kind`, in print order."""
+    queryset = Registration.objects.filter(event_id__in=event_ids).exclude(status='CANCELLED')
+    if kind == 'certificates':
+        queryset = queryset.filter(status='ATTENDED')
+    else:
+        queryset = queryset.filter(seat_state='CONFIRMED')
+    return queryset.order_by('event_id', 'user__full_name', 'id')
+
+
+def printable_items(queryset):
+    """Yield the plain dicts page renderers need, one per registration."""
+    for row in queryset.values(*ROW_FIELDS).iterator(chunk_size=2000):
+        yield {
+            'id': row['id'],
+            'token': row['token'],
+            'name': row['user__full_name'] or row['user__email'],
+            'team_name': row['team_name'],
+            'event': row['event__title'],
+            'date': timezone.localtime(row['event__event_date']).strftime('%d %B %Y'),
+            'venue': row['event__venue'],
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size):
+    try:
+        return ImageFont.load_default(size)
+    except (AttributeError, TypeError, ImportError):
+        # Pillow without FreeType only has the small bitmap font
+        return ImageFont.load_default()
+
+
+def _centered(draw, y, text, size, width, fill=0):
+    font = _font(size)
+    draw.text((width // 2, y), text, font=font, fill=fill, anchor='mt')
+
+
+def _fit(draw, text, size, max_width):
+    """`text` shortened with an ellipsis until it fits max_width at `size`."""
+    font = _font(size)
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + '…', font=font) > max_width:
+        text = text[:-1]
+    return text + '…'
+
+
+def draw_ticket_sheet(items):
+    """One portrait page of up to COLUMNS x ROWS tickets with cut lines."""
+    from .utils import get_qr_image
+    page = Image.new('L', PORTRAIT, 255)
+    draw = ImageDraw.Draw(page)
+    cell_w, cell_h = PORTRAIT[0] // COLUMNS, PORTRAIT[1] // ROWS
+    qr_size = 260
+    text_w = cell_w - qr_size - 70
+    for index, item in enumerate(items):
+        x, y = (index % COLUMNS) * cell_w, (index // COLUMNS) * cell_h
+        draw.rectangle([x + 10, y + 10, x + cell_w - 10, y + cell_h - 10], outline=160, width=2)
+        qr = Image.open(io.BytesIO(get_qr_image(item['token']))).convert('L')
+        page.paste(qr.resize((qr_size, qr_size), Image.NEAREST), (x + 30, y + (cell_h - qr_size) // 2))
+        left, top = x + qr_size + 40, y + 50
+        draw.text((left, top), _fit(draw, item['event'], 30, text_w), font=_font(30), fill=0)
+        draw.text((left, top + 60), _fit(draw, item['name'], 26, text_w), font=_font(26), fill=0)
+        if item['team_name']:
+            draw.text((left, top + 100), _fit(draw, item['team_name'], 22, text_w), font=_font(22), fill=80)
+        draw.text((left, top + 160), item['date'], font=_font(22), fill=80)
+        draw.text((left, top + 195), _fit(draw, item['venue'], 22, text_w), font=_font(22), fill=80)
+        draw.text((left, y + cell_h - 70), f"#{item['id']}", font=_font(20), fill=120)
+    return page
+
+
+def draw_certificate(items):
+    """One landscape merit certificate per page; `items` holds a single attendee."""
+    item, = items
+    page = Image.new('L', LANDSCAPE, 255)
+    draw = ImageDraw.Draw(page)
+    width, height = LANDSCAPE
+    draw.rectangle([50, 50, width - 50, height - 50], outline=0, width=8)
+    draw.rectangle([80, 80, width - 80, height - 80], outline=120, width=2)
+    _centered(draw, 200, 'Certificate of Merit', 96, width)
+    _centered(draw, 380, 'This certificate is proudly presented to', 36, width, fill=80)
+    _centered(draw, 470, _fit(draw, item['name'], 80, width - 300), 80, width)
+    draw.line([width // 2 - 450, 580, width // 2 + 450, 580], fill=0, width=3)
+    _centered(draw, 640, 'for outstanding participation in', 36, width, fill=80)
+    _centered(draw, 720, _fit(draw, item['event'], 60, width - 300), 60, width)
+    if item['team_name']:
+        _centered(draw, 810, f"Team {_fit(draw, item['team_name'], 36, width - 400)}", 36, width, fill=80)
+    _centered(draw, 900, f"{item['date']} · {_fit(draw, item['venue'], 32, width - 500)}", 32, width, fill=80)
+    draw.text((120, height - 150), f"No. {item['id']}", font=_font(24), fill=120)
+    return page
+
+
+# kind: (drawer, items per page)
+KINDS = {
+    'tickets': (draw_ticket_sheet, COLUMNS * ROWS),
+    'certificates': (draw_certificate, 1),
+}
+
+
+def encode_page(page, fmt):
+    """Page data for the output: a (mode, w, h, deflated pixels) tuple for PDF, PNG bytes for ZIP."""
+    if fmt == 'pdf':
+        return page.mode, page.width, page.height, zlib.compress(page.tobytes(), 6)
+    out = io.BytesIO()
+    page.save(out, format='PNG', optimize=False)
+    return out.getvalue()
+
+
+class PrintJob:
+    """Streams the pages of one kind of printable and counts its throughput."""
+
+    def __init__(self, kind, items, fmt='pdf', workers=None):
+        self.kind, self.fmt, self.workers = kind, fmt, workers
+        self.items = iter(items)
+        self.pages = 0
+        self.count = 0
+        self.elapsed = 0.0
+
+    def _batches(self):
+        per_page = KINDS[self.kind][1]
+        while batch := list(itertools.islice(self.items, per_page)):
+            self.count += len(batch)
+            yield batch
+
+    def _pages(self):
+        from . import render_worker
+        from .rendering import map_in_pool
+        args = ((self.kind, batch, self.fmt) for batch in self._batches())
+        yield from map_in_pool(render_worker.render_page, args, self.workers)
+
+    def _pdf(self):
+        document = PdfStream(DPI)
+        yield document.start()
+        for page in self._pages():
+            self.pages += 1
+            yield document.page(*page)
+        yield document.finish()
+
+    def _zip(self):
+        out = ZipStream()
+        with zipfile.ZipFile(out, 'w') as archive:
+            for page in self._pages():
+                self.pages += 1
+                # PNGs are already compressed
+                archive.writestr(f'{self.kind}/{self.pages:05d}.png', page, zipfile.ZIP_STORED)
+                yield out.take()
+        yield out.take()
+
+    def __iter__(self):
+        started = time.perf_counter()
+        try:
+            yield from self._pdf() if self.fmt == 'pdf' else self._zip()
+        finally:
+            self.elapsed = time.perf_counter() - started
+            print(f"[PRINT] {self.count} {self.kind} on {self.pages} pages in {self.elapsed:.1f}s "
+                  f"({self.pages_per_second:.1f} pages/s)", flush=True)
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.elapsed if self.elapsed else 0.0
+
+
+def printables_response(kind, event_ids, fmt='pdf'):
+    """StreamingHttpResponse with the `kind` printables of every attendee of `event_ids`."""
+    job = PrintJob(kind, printable_items(attendees(kind, event_ids)), fmt)
+    response = StreamingHttpResponse(iter(job), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename={kind}.{fmt}'
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,34 @@
+"""
+Entry points for ticket rendering worker processes (see events/rendering.py).
+
+Workers are spawned, so this module must import without Django being set
+up: models and anything importing them are imported inside the functions.
+"""
+
+
+def init(overrides):
+    """Set up Django in a fresh worker, with the parent's relevant settings."""
+    import django
+    from django.conf import settings
+    django.setup()
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+
+
+def render_chunk(tokens, fmt='png'):
+    """QR image bytes for each token, rendered into the shared QR cache."""
+    from .utils import get_qr_image
+    return [get_qr_image(token, fmt) for token in tokens]
+
+
+def store_chunk(tokens):
+    """Store every format of each ticket's image; returns how many files were written."""
+    from .utils import store_ticket_images
+    return sum(store_ticket_images(token) for token in tokens)
+
+
+def render_page(kind, items, fmt):
+    """One printable page (see events/printables.py), encoded for the `fmt` output."""
+    from .printables import KINDS, encode_page
+    draw, _ = KINDS[kind]
+    return encode_page(draw(items), fmt)
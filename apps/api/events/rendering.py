@@ -0,0 +1,183 @@
+"""
+Ticket image rendering for bulk jobs.
+
+QR rendering is pure CPU, so bulk exports, resends and imports hand their
+tokens to a pool of TICKET_RENDER_WORKERS processes instead of rendering on
+the request thread. Confirming a seat stores the ticket's images through
+prerender_on_commit() as well. Workers are spawned rather than forked, because callers
+may be threads of a web process. The pool is started on first use and kept
+for the life of the process. Images already in the QR cache never go to a
+worker, and workers write what they render to the shared disk cache.
+Printable sheets and certificates are drawn in the same pool (map_in_pool).
+"""
+import multiprocessing
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.db import transaction
+from . import render_worker
+from .utils import peek_qr_image, ticket_images_stored
+
+# Tokens per task sent to a worker, and per window of render_tickets()
+CHUNK_SIZE = 50
+WINDOW_SIZE = 1000
+# Up to this many tickets are rendered on the committing thread (~10ms each)
+INLINE_MAX = 5
+
+# Settings a worker needs to render the same images as this process
+WORKER_SETTINGS = ('QR_CACHE_DIR', 'TICKET_QR_ENCODING', 'TICKET_SIGNING_KEY')
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    global _pool, _pool_key
+    overrides = {name: getattr(settings, name) for name in WORKER_SETTINGS}
+    key = (workers, tuple(sorted(overrides.items())))
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=render_worker.init,
+                initargs=(overrides,),
+            )
+            _pool_key = key
+        return _pool
+
+
+def _discard(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def shutdown():
+    """Stop the worker pool; the next bulk job starts a new one."""
+    pool = _pool
+    if pool is not None:
+        _discard(pool)
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _render(tokens, fmt, workers):
+    """Image bytes for `tokens` (in order), which are not cached yet."""
+    workers = workers or settings.TICKET_RENDER_WORKERS
+    if workers <= 1 or len(tokens) <= CHUNK_SIZE:
+        return render_worker.render_chunk(tokens, fmt)
+    pool = _get_pool(workers)
+    chunks = [tokens[i:i + CHUNK_SIZE] for i in range(0, len(tokens), CHUNK_SIZE)]
+    try:
+        return [data for chunk in pool.map(render_worker.render_chunk, chunks, [fmt] * len(chunks)) for data in chunk]
+    except BrokenProcessPool as e:
+        print(f"[RENDER] Worker pool broke, rendering in-process: {e}", file=sys.stderr, flush=True)
+        _discard(pool)
+        return render_worker.render_chunk(tokens, fmt)
+
+
+def map_in_pool(fn, args, workers=None):
+    """
+    Yield fn(*a) for each tuple in `args`, in order, computed in the worker
+    pool. At most two tasks per worker are in flight, so a long iterator of
+    arguments (and their results) is never held all at once. `fn` must live
+    in render_worker.
+    """
+    workers = workers or settings.TICKET_RENDER_WORKERS
+    pool = _get_pool(workers) if workers > 1 else None
+    pending = deque()
+    for a in args:
+        if pool is not None:
+            try:
+                pending.append((a, pool, pool.submit(fn, *a)))
+            except BrokenProcessPool as e:
+                pool = _broken(pool, e)
+        if pool is None:
+            pending.append((a, None, None))
+        while pending and (pool is None or len(pending) >= workers * 2):
+            yield _result(pending.popleft(), fn)
+    while pending:
+        yield _result(pending.popleft(), fn)
+
+
+def _broken(pool, error):
+    if _pool is pool:
+        print(f"[RENDER] Worker pool broke, rendering in-process: {error}", file=sys.stderr, flush=True)
+        _discard(pool)
+    return None
+
+
+def _result(task, fn):
+    a, pool, future = task
+    if future is not None:
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            # Tasks still in flight fail the same way and are redone here
+            _broken(pool, e)
+    return fn(*a)
+
+
+def render_tickets(tokens, fmt='png', workers=None):
+    """
+    Yield (token, image bytes) for every token, in order. Tokens are taken
+    WINDOW_SIZE at a time, so a long iterator is streamed rather than held.
+    """
+    tokens = iter(tokens)
+    while True:
+        window = [token for _, token in zip(range(WINDOW_SIZE), tokens)]
+        if not window:
+            return
+        images = {token: peek_qr_image(token, fmt) for token in window}
+        missing = [token for token, data in images.items() if data is None]
+        if missing:
+            images.update(zip(missing, _render(missing, fmt, workers)))
+        for token in window:
+            yield token, images[token]
+
+
+def prerender(tokens, workers=None):
+    """
+    Store the PNG and SVG images of tickets that don't have them yet.
+    Returns how many tickets were rendered.
+    """
+    missing = [token for token in dict.fromkeys(tokens) if not ticket_images_stored(token)]
+    if not missing:
+        return 0
+    workers = workers or settings.TICKET_RENDER_WORKERS
+    try:
+        if workers <= 1 or len(missing) <= CHUNK_SIZE:
+            render_worker.store_chunk(missing)
+        else:
+            pool = _get_pool(workers)
+            chunks = [missing[i:i + CHUNK_SIZE] for i in range(0, len(missing), CHUNK_SIZE)]
+            try:
+                sum(pool.map(render_worker.store_chunk, chunks))
+            except BrokenProcessPool as e:
+                print(f"[RENDER] Worker pool broke, rendering in-process: {e}", file=sys.stderr, flush=True)
+                _discard(pool)
+                render_worker.store_chunk(missing)
+    except Exception as e:
+        print(f"[RENDER] Pre-render stopped: {e}", file=sys.stderr, flush=True)
+        return 0
+    print(f"[RENDER] Pre-rendered {len(missing)} tickets", flush=True)
+    return len(missing)
+
+
+def prerender_on_commit(tokens):
+    """
+    Store ticket images once the current transaction commits: a few right
+    away on the committing thread, more in a background thread.
+    """
+    tokens = list(tokens)
+    if len(tokens) <= INLINE_MAX:
+        transaction.on_commit(lambda: prerender(tokens, workers=1))
+    else:
+        transaction.on_commit(lambda: threading.Thread(target=prerender, args=(tokens,), daemon=True).start())
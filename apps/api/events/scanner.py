@@ -0,0 +1,205 @@
+"""
+Offline check-in for event-day scanner devices.
+
+A device downloads a manifest of hashed ticket tokens for one event,
+validates QR codes locally by binary search, queues its scans and uploads
+them later. With SCANNER_SIGNING_KEY set, manifests carry an RSA signature
+that devices check against the public key from the scanner-key endpoint,
+so they never hold a server secret. Uploads are idempotent (keyed by the client's scan_id) and are
+applied with one bulk UPDATE per batch.
+"""
+import base64
+import functools
+import hashlib
+import json
+import rsa
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from .models import Registration, ScanRecord
+from .tickets import canonical_token, compact_code, is_legacy_token, plausible_tokens, reissued_tokens
+
+# Hex characters of sha256(token) kept per ticket; 96 bits is plenty for one event
+DIGEST_LENGTH = 24
+SIGNATURE_ALGORITHM = 'RSASSA-PKCS1-v1_5-SHA256'
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()[:DIGEST_LENGTH]
+
+
+def _canonical(manifest):
+    return json.dumps(manifest, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_key(pem):
+    private_key = rsa.PrivateKey.load_pkcs1(pem.replace('\\n', '\n').encode())
+    public_key = rsa.PublicKey(private_key.n, private_key.e)
+    public_pem = public_key.save_pkcs1().decode()
+    key_id = hashlib.sha256(public_key.save_pkcs1('DER')).hexdigest()[:16]
+    return private_key, public_pem, key_id
+
+
+def signing_key():
+    """(private key, public key PEM, key id) from SCANNER_SIGNING_KEY, or None when unset."""
+    return _load_key(settings.SCANNER_SIGNING_KEY) if settings.SCANNER_SIGNING_KEY else None
+
+
+def public_key_info():
+    """What a device needs to check bundle signatures, or None when bundles are unsigned."""
+    key = signing_key()
+    if key is None:
+        return None
+    _, public_pem, key_id = key
+    return {'key_id': key_id, 'algorithm': SIGNATURE_ALGORITHM, 'public_key': public_pem}
+
+
+def sign_manifest(manifest):
+    """Add 'key_id' and 'signature' to `manifest` if a signing key is configured."""
+    key = signing_key()
+    if key is None:
+        return manifest
+    private_key, _, key_id = key
+    manifest['key_id'] = key_id
+    signature = rsa.sign(_canonical(manifest).encode(), private_key, 'SHA-256')
+    manifest['signature'] = base64.b64encode(signature).decode()
+    return manifest
+
+
+def verify_manifest(bundle, public_pem):
+    """
+    True if a signed bundle is untampered, checked with the public key only
+    (the same check a scanner device runs).
+    """
+    manifest = {k: v for k, v in bundle.items() if k != 'signature'}
+    try:
+        signature = base64.b64decode(bundle['signature'])
+        rsa.verify(_canonical(manifest).encode(), signature, rsa.PublicKey.load_pkcs1(public_pem.encode()))
+    except (KeyError, ValueError, rsa.VerificationError):
+        return False
+    return True
+
+
+def build_bundle(event, since=None):
+    """
+    Manifest of the event's tickets as sorted digests of every form a QR
+    code can take (signed token, compact code, pre-reissue token). With `since`,
+    only tickets changed after that cursor are listed, plus the ones that
+    stopped being valid ('revoked').
+    """
+    cursor = timezone.now()
+    rows = Registration.objects.filter(event=event)
+    if since is not None:
+        rows = rows.filter(updated_at__gt=since)
+
+    valid, attended, revoked = [], [], []
+    fields = ('token', 'legacy_token', 'status', 'is_used', 'seat_state')
+    for token, legacy_token, status, is_used, seat_state in rows.values_list(*fields).iterator(chunk_size=2000):
+        if seat_state != 'CONFIRMED':
+            listed = revoked
+        elif status == 'ATTENDED' or is_used:
+            listed = attended
+        else:
+            listed = valid
+        listed.append(token_digest(token))
+        # A compact QR code carries no token; the device hashes the code itself
+        code = compact_code(token)
+        if code is not None:
+            listed.append(token_digest(code))
+        # QR codes sent before the ticket was reissued
+        if legacy_token and is_legacy_token(legacy_token):
+            listed.append(token_digest(legacy_token))
+
+    manifest = {
+        'event': event.pk,
+        'cursor': cursor.isoformat(),
+        'full': since is None,
+        'digest': f'sha256:{DIGEST_LENGTH}',
+        'valid': sorted(valid),
+        'attended': sorted(attended),
+        'revoked': sorted(revoked) if since is not None else [],
+    }
+    return sign_manifest(manifest)
+
+
+def apply_scans(event, device_id, scans):
+    """
+    Apply a batch of queued scans ({'scan_id', 'token', 'scanned_at'}).
+    The earliest scan of a ticket wins; later ones (from any device, or
+    after an online check-in) come back as conflicts. Re-uploaded scans
+    return their original result.
+    """
+    now = timezone.now()
+    # Compact QR codes and reissued tickets are recorded under the signed token they stand for
+    scans = [{**scan, 'token': canonical_token(scan['token'])} for scan in scans]
+    reissued = reissued_tokens(scan['token'] for scan in scans)
+    scans = [{**scan, 'token': reissued.get(scan['token'], scan['token'])} for scan in scans]
+    with transaction.atomic():
+        replayed = {
+            record.scan_id: record
+            for record in ScanRecord.objects.filter(scan_id__in=[scan['scan_id'] for scan in scans])
+        }
+        fresh = sorted(
+            (scan for scan in scans if scan['scan_id'] not in replayed),
+            key=lambda scan: scan['scanned_at'],
+        )
+
+        # Lock the tickets so concurrent uploads can't both accept one
+        rows = {
+            row['token']: row
+            for row in Registration.objects.select_for_update()
+            .filter(event=event, token__in=set(plausible_tokens(scan['token'] for scan in fresh)))
+            .values('id', 'token', 'status', 'is_used', 'seat_state')
+        }
+        first_entries = {
+            record['registration_id']: record
+            for record in ScanRecord.objects.filter(
+                registration_id__in=[row['id'] for row in rows.values()], result='ACCEPTED'
+            ).values('registration_id', 'device_id', 'scanned_at')
+        }
+
+        records, results, admitted = [], {}, set()
+        for scan in fresh:
+            if scan['scan_id'] in results:
+                continue  # same scan twice in one upload
+            row = rows.get(scan['token'])
+            if row is None or row['seat_state'] != 'CONFIRMED':
+                result = 'INVALID'
+            elif row['status'] == 'ATTENDED' or row['is_used'] or row['id'] in admitted:
+                result = 'CONFLICT'
+            else:
+                result = 'ACCEPTED'
+                admitted.add(row['id'])
+                first_entries[row['id']] = {'device_id': device_id, 'scanned_at': scan['scanned_at']}
+
+            registration_id = row['id'] if row else None
+            records.append(ScanRecord(
+                scan_id=scan['scan_id'],
+                device_id=device_id,
+                event=event,
+                registration_id=registration_id,
+                token=scan['token'],
+                scanned_at=scan['scanned_at'],
+                result=result,
+            ))
+            results[scan['scan_id']] = _scan_result(scan['scan_id'], scan['token'], result, first_entries.get(registration_id))
+
+        if admitted:
+            Registration.objects.filter(pk__in=admitted).update(status='ATTENDED', is_used=True, updated_at=now)
+        ScanRecord.objects.bulk_create(records, ignore_conflicts=True)
+
+    for scan_id, record in replayed.items():
+        results[scan_id] = _scan_result(scan_id, record.token, record.result, None, replayed=True)
+    return [results[scan['scan_id']] for scan in scans]
+
+
+def _scan_result(scan_id, token, result, first_entry, replayed=False):
+    return {
+        'scan_id': scan_id,
+        'token': token,
+        'result': result,
+        'replayed': replayed,
+        'first_entry': first_entry if result == 'CONFLICT' else None,
+    }
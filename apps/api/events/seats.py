@@ -0,0 +1,110 @@
+"""
+Seat accounting for events.
+
+Every transition is a single conditional UPDATE, so the database row lock
+decides races instead of a read-then-write COUNT in the view. Confirmed seats
+and seats held by pending payments are tracked separately on Event, and each
+Registration records which kind of seat (if any) it currently occupies.
+Whenever a seat is given back, the event's waitlist is promoted.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .cache import bump_catalog_version_on_commit
+from .models import Event, Registration
+from .rendering import prerender_on_commit
+from .waitlist import promote_waitlist
+
+SEAT_FIELDS = {
+    'HELD': 'seats_held',
+    'CONFIRMED': 'seats_confirmed',
+}
+
+
+def reserve_seat(event, hold=False):
+    """
+    Claim a seat if one is free. Returns True when the seat was claimed.
+    Call inside the same transaction that creates the registration so a
+    failed insert gives the seat back.
+    """
+    field = 'seats_held' if hold else 'seats_confirmed'
+    claimed = Event.objects.filter(
+        pk=event.pk,
+        registration_limit__gt=F('seats_confirmed') + F('seats_held'),
+    ).update(**{field: F(field) + 1})
+    if claimed:
+        bump_catalog_version_on_commit()
+    return bool(claimed)
+
+
+def confirm_seat(registration):
+    """Turn a payment hold into a confirmed seat once payment succeeds."""
+    with transaction.atomic():
+        if Registration.objects.filter(pk=registration.pk, seat_state='HELD').update(seat_state='CONFIRMED', updated_at=timezone.now()):
+            Event.objects.filter(pk=registration.event_id, seats_held__gt=0).update(
+                seats_held=F('seats_held') - 1,
+                seats_confirmed=F('seats_confirmed') + 1,
+            )
+        elif Registration.objects.filter(pk=registration.pk, seat_state='NONE').update(seat_state='CONFIRMED', updated_at=timezone.now()):
+            # The hold was already released but the payment went through,
+            # so the attendee gets a seat even if that overfills the event.
+            Event.objects.filter(pk=registration.event_id).update(seats_confirmed=F('seats_confirmed') + 1)
+        else:
+            return
+        bump_catalog_version_on_commit()
+        prerender_on_commit([registration.token])
+    registration.seat_state = 'CONFIRMED'
+
+
+def release_seat(registration):
+    """Give back whatever seat the registration occupies (no-op if none)."""
+    state = registration.seat_state
+    field = SEAT_FIELDS.get(state)
+    if not field:
+        return False
+    with transaction.atomic():
+        if not Registration.objects.filter(pk=registration.pk, seat_state=state).update(seat_state='NONE', updated_at=timezone.now()):
+            return False
+        _decrement(registration.event_id, field)
+    registration.seat_state = 'NONE'
+    return True
+
+
+def release_deleted_seat(registration):
+    """Seat bookkeeping for a registration row that has just been deleted."""
+    field = SEAT_FIELDS.get(registration.seat_state)
+    if field:
+        _decrement(registration.event_id, field)
+
+
+def release_expired_holds(event_ids=None):
+    """
+    Release payment holds older than SEAT_HOLD_MINUTES (abandoned checkouts),
+    one bulk update per event. Returns the number of seats released.
+    """
+    cutoff = timezone.now() - timedelta(minutes=settings.SEAT_HOLD_MINUTES)
+    stale = Registration.objects.filter(seat_state='HELD', updated_at__lt=cutoff).exclude(payment__status='SUCCESS')
+    if event_ids is not None:
+        stale = stale.filter(event_id__in=event_ids)
+
+    by_event = defaultdict(list)
+    for pk, event_id in stale.values_list('pk', 'event_id'):
+        by_event[event_id].append(pk)
+
+    released = 0
+    for event_id, pks in by_event.items():
+        with transaction.atomic():
+            count = Registration.objects.filter(pk__in=pks, seat_state='HELD').update(seat_state='NONE', updated_at=timezone.now())
+            if count:
+                _decrement(event_id, 'seats_held', count)
+        released += count
+    return released
+
+
+def _decrement(event_id, field, count=1):
+    Event.objects.filter(pk=event_id, **{f'{field}__gte': count}).update(**{field: F(field) - count})
+    bump_catalog_version_on_commit()
+    transaction.on_commit(lambda: promote_waitlist(event_id))
@@ -1,15 +1,22 @@
+from django.db.models import Count
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Registration, Event, Payment
-from .utils import generate_qr_code
+from .models import Registration, Event, Payment, WaitlistEntry
+from .utils import generate_qr_code, ticket_image_url
 
 class EventSerializer(serializers.ModelSerializer):
     class Meta:
         model = Event
         fields = '__all__'
+        read_only_fields = ['seats_confirmed', 'seats_held', 'waitlist_tail', 'waitlist_head']
 
     registration_count = serializers.SerializerMethodField()
 
     def get_registration_count(self, obj):
+        # Prefer the value annotated by Event.objects.with_registration_count()
+        count = getattr(obj, 'registration_count', None)
+        if count is not None:
+            return count
         return obj.registrations.count()
 
     def validate(self, data):
@@ -29,9 +36,28 @@ class PaymentSerializer(serializers.ModelSerializer):
         fields = ['id', 'razorpay_order_id', 'razorpay_payment_id', 'razorpay_signature', 'amount', 'currency', 'status', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class RegistrationListSerializer(serializers.ListSerializer):
+    """
+    Serializes each event once per response: the registration counts of all
+    events on the page come from one grouped query, and the nested event
+    payload is shared by every registration for that event.
+    """
+
+    def to_representation(self, data):
+        registrations = list(data.all() if hasattr(data, 'all') else data)
+        event_ids = {registration.event_id for registration in registrations}
+        self.context['event_counts'] = dict(
+            Registration.objects.filter(event_id__in=event_ids)
+            .values_list('event_id')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        self.context['event_payloads'] = {}
+        return super().to_representation(registrations)
+
 class RegistrationSerializer(serializers.ModelSerializer):
     qr_code = serializers.SerializerMethodField()
-    event_details = EventSerializer(source='event', read_only=True)
+    event_details = serializers.SerializerMethodField()
     user_email = serializers.EmailField(source='user.email', read_only=True)
     user_name = serializers.CharField(source='user.full_name', read_only=True)
     user_phone = serializers.CharField(source='user.phone_number', read_only=True)
@@ -42,8 +68,48 @@ class RegistrationSerializer(serializers.ModelSerializer):
         model = Registration
         fields = ['id', 'user', 'user_email', 'user_name', 'user_phone', 'phone_number', 'college', 'department', 'year_of_study', 'user_college', 'event', 'event_details', 'timestamp', 'updated_at', 'token', 'qr_code', 'status', 'is_used', 'team_name', 'team_members', 'payment_details']
         read_only_fields = ['id', 'user', 'timestamp', 'updated_at', 'token', 'qr_code', 'is_used', 'status', 'user_phone']
+        list_serializer_class = RegistrationListSerializer
+
+    def get_event_details(self, obj):
+        payloads = self.context.get('event_payloads')
+        if payloads is None:
+            return EventSerializer(obj.event, context=self.context).data
+        if obj.event_id not in payloads:
+            event = obj.event
+            if obj.event_id in self.context['event_counts']:
+                event.registration_count = self.context['event_counts'][obj.event_id]
+            payloads[obj.event_id] = EventSerializer(event, context=self.context).data
+        return payloads[obj.event_id]
 
     def get_qr_code(self, obj):
-        if obj.token:
+        """
+        In lists, a link to the stored ticket image, or to the QR endpoint
+        that renders it if it isn't stored yet; the inline base64 PNG is only
+        rendered there when asked for with ?include=qr_code. Single
+        registrations keep the inline PNG, which clients offer as a download.
+        """
+        if not obj.token:
+            return None
+        request = self.context.get('request')
+        in_list = isinstance(self.parent, serializers.ListSerializer)
+        if request is None or not in_list or 'qr_code' in request.query_params.get('include', '').split(','):
             return generate_qr_code(obj.token, color="#000000")
-        return None
+        url = ticket_image_url(obj.token) or reverse('registration-qr', args=[obj.token, 'png'])
+        return request.build_absolute_uri(url)
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    position = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'event', 'sequence', 'position', 'status', 'created_at', 'promoted_at']
+        read_only_fields = fields
+
+class ScanSerializer(serializers.Serializer):
+    scan_id = serializers.CharField(max_length=64)
+    token = serializers.CharField(max_length=64)
+    scanned_at = serializers.DateTimeField()
+
+class ScanBatchSerializer(serializers.Serializer):
+    device_id = serializers.CharField(max_length=64)
+    scans = ScanSerializer(many=True, allow_empty=False, max_length=1000)
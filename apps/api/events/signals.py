@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+from .cache import bump_catalog_version_on_commit
+from .models import Event, Registration
+from .seats import release_deleted_seat
+from .utils import delete_ticket_images
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_catalog_on_event_change(sender, **kwargs):
+    bump_catalog_version_on_commit()
+
+
+@receiver(post_save, sender=Registration)
+def invalidate_catalog_on_registration_save(sender, created, **kwargs):
+    # The catalog only exposes registration_count, so status updates
+    # (check-in, payment confirmation) leave the cached payload valid.
+    if created:
+        bump_catalog_version_on_commit()
+
+
+@receiver(post_delete, sender=Registration)
+def invalidate_catalog_on_registration_delete(sender, instance, **kwargs):
+    release_deleted_seat(instance)
+    bump_catalog_version_on_commit()
+
+
+@receiver(post_delete, sender=Registration)
+def delete_ticket_images_on_registration_delete(sender, instance, **kwargs):
+    token = instance.token
+    transaction.on_commit(lambda: delete_ticket_images(token))
@@ -0,0 +1,1029 @@
+import io
+import logging
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.cache import caches
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from authentication.models import User
+from .models import Event, Registration, WaitlistEntry
+
+
+def make_event(**kwargs):
+    now = timezone.now()
+    defaults = {
+        'title': 'Test Event',
+        'venue': 'Lab',
+        'category': 'CTF',
+        'registration_start': now - timedelta(days=1),
+        'registration_end': now + timedelta(days=1),
+        'registration_limit': 30,
+    }
+    defaults.update(kwargs)
+    return Event.objects.create(**defaults)
+
+
+# Keep the version stamp in memory so query counts only reflect the view itself
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-default'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-local'},
+}
+
+TEST_SETTINGS = {
+    'SECURE_SSL_REDIRECT': False,
+    'CACHES': LOCMEM_CACHES,
+    'OUTBOX_DRAIN_IN_PROCESS': False,
+}
+
+
+class TempQRCacheMixin:
+    """Store rendered ticket images in a throwaway directory, not media/tickets."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.qr_cache_dir = tempfile.mkdtemp(prefix='qr-test-')
+        cls._qr_cache_override = override_settings(QR_CACHE_DIR=cls.qr_cache_dir)
+        cls._qr_cache_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._qr_cache_override.disable()
+        shutil.rmtree(cls.qr_cache_dir, ignore_errors=True)
+
+
+@override_settings(**TEST_SETTINGS)
+class EventsTestCase(TempQRCacheMixin, TestCase):
+    """TestCase with the settings every events test runs under."""
+
+
+@override_settings(**TEST_SETTINGS)
+class EventsTransactionTestCase(TempQRCacheMixin, TransactionTestCase):
+    """EventsTestCase for tests that need real commits."""
+
+
+class EventCatalogQueryTests(EventsTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+        self.client = APIClient()
+        self.events = [make_event(title=f"Event {i}") for i in range(5)]
+        for i, event in enumerate(self.events):
+            for j in range(i):
+                user = User.objects.create_user(email=f"u{i}-{j}@example.com")
+                Registration.objects.create(user=user, event=event, status='REGISTERED')
+
+    def test_event_list_uses_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('event-list'))
+        self.assertEqual(response.status_code, 200)
+        counts = {item['id']: item['registration_count'] for item in response.json()}
+        for i, event in enumerate(self.events):
+            self.assertEqual(counts[event.id], i)
+
+    def test_event_detail_uses_single_query(self):
+        event = self.events[3]
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('event-detail', args=[event.id]))
+        self.assertEqual(response.json()['registration_count'], 3)
+
+    def test_admin_event_list_uses_single_query(self):
+        admin = User.objects.create_superuser(email="admin@example.com", password="pw")
+        self.client.force_authenticate(admin)
+        with self.assertNumQueries(1):
+            response = self.client.get('/operations/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 5)
+
+    def test_serializer_falls_back_without_annotation(self):
+        from .serializers import EventSerializer
+        event = Event.objects.get(pk=self.events[2].pk)
+        self.assertEqual(EventSerializer(event).data['registration_count'], 2)
+
+
+class RegistrationListQueryTests(EventsTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.events = [make_event(title=f"Event {i}") for i in range(2)]
+        self.paid = make_event(title="Paid", requires_payment=True)
+        self.user = User.objects.create_user(email="lister@example.com")
+
+    def make_user(self):
+        return User.objects.create_user(email=f"row{User.objects.count()}@example.com")
+
+    def add_paid(self, user):
+        from .models import Payment
+        registration = Registration.objects.create(user=user, event=self.paid)
+        Payment.objects.create(registration=registration, razorpay_order_id=f"order_{registration.pk}", amount=100, status='SUCCESS')
+
+    def add_registrations(self, count):
+        for i in range(count):
+            Registration.objects.create(user=self.make_user(), event=self.events[i % 2])
+        self.add_paid(self.make_user())
+
+    def test_admin_list_query_count_is_flat(self):
+        admin = User.objects.create_superuser(email="admin@example.com", password="pw")
+        self.client.force_authenticate(admin)
+        for rows in (3, 30):
+            self.add_registrations(rows)
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse('admin-registrations'))
+        self.assertEqual(len(response.data), Registration.objects.count())
+        by_event = {row['event']: row['event_details']['registration_count'] for row in response.data}
+        self.assertEqual(by_event[self.events[0].pk], self.events[0].registrations.count())
+        self.assertEqual(by_event[self.paid.pk], 2)
+        self.assertEqual(sum(1 for row in response.data if row['payment_details']), 2)
+
+    def test_my_registrations_query_count_is_flat(self):
+        self.client.force_authenticate(self.user)
+        for event in self.events:
+            Registration.objects.create(user=self.user, event=event)
+        self.add_paid(self.user)
+        self.add_registrations(5)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('my-registrations'))
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]['event_details']['title'], "Paid")
+
+
+class CursorPaginationTests(EventsTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email="admin@example.com", password="pw"))
+        event = make_event()
+        for i in range(5):
+            Registration.objects.create(user=User.objects.create_user(email=f"page{i}@example.com"), event=event)
+
+    def test_unpaged_requests_still_get_arrays(self):
+        self.assertEqual(len(self.client.get(reverse('admin-registrations')).data), 5)
+
+    def test_cursor_walks_every_row_once(self):
+        seen, url = [], reverse('admin-registrations') + '?page_size=2'
+        while url:
+            page = self.client.get(url).data
+            self.assertLessEqual(len(page['results']), 2)
+            seen += [row['id'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(seen, list(Registration.objects.order_by('-timestamp', '-id').values_list('id', flat=True)))
+
+    def test_page_size_is_capped(self):
+        with override_settings(API_MAX_PAGE_SIZE=3):
+            self.assertEqual(len(self.client.get(reverse('audit-logs') + '?page_size=100').data['results']), 0)
+            self.assertEqual(len(self.client.get(reverse('admin-registrations') + '?page_size=100').data['results']), 3)
+
+
+class RegistrationExportTests(EventsTestCase):
+    def setUp(self):
+        from .models import Payment
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email="admin@example.com", password="pw"))
+        self.event, other = make_event(), make_event(title="Other")
+        for i in range(4):
+            user = User.objects.create_user(email=f"export{i}@example.com", phone_number=f"98000000{i}")
+            registration = Registration.objects.create(
+                user=user, event=self.event if i < 3 else other, team_name=f"Team {i}",
+                status='ATTENDED' if i == 0 else 'REGISTERED',
+            )
+        Payment.objects.create(registration=registration, razorpay_order_id="order_x", amount=100, status='SUCCESS')
+
+    def test_csv_streams_with_one_query(self):
+        import csv
+        response = self.client.get(reverse('registration-export'), {'event': self.event.pk})
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            body = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['team_name'], "Team 0")
+        self.assertEqual(rows[0]['phone_number'], "980000000")
+
+    def test_ndjson_filters_by_status(self):
+        import json
+        response = self.client.get(reverse('registration-export'), {'fmt': 'ndjson', 'status': 'REGISTERED'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual([row['payment_status'] for row in rows if row['payment_status']], ['SUCCESS'])
+        self.assertEqual(self.client.get(reverse('registration-export'), {'status': 'NOPE'}).status_code, 400)
+
+    def test_zip_has_ticket_images_and_manifest(self):
+        import zipfile
+        with tempfile.TemporaryDirectory() as tmp, override_settings(QR_CACHE_DIR=tmp):
+            response = self.client.get(reverse('registration-export'), {'fmt': 'zip', 'event': self.event.pk})
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        names = archive.namelist()
+        ids = Registration.objects.filter(event=self.event).order_by('id').values_list('id', flat=True)
+        self.assertEqual(names, [f"tickets/{self.event.pk}/{pk}.png" for pk in ids] + ['registrations.csv'])
+        self.assertTrue(archive.read(names[0]).startswith(b'\x89PNG'))
+        self.assertEqual(len(archive.read('registrations.csv').decode().splitlines()), 4)
+
+
+class RegistrationImportTests(EventsTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email="admin@example.com", password="pw"))
+        self.event = make_event(registration_limit=3)
+        self.existing = User.objects.create_user(email="known@example.com")
+
+    def test_import_report_and_capacity(self):
+        from .tickets import parse_ticket_token
+        Registration.objects.create(user=self.existing, event=self.event)
+        Event.objects.filter(pk=self.event.pk).update(seats_confirmed=1)
+        rows = [
+            {'email': 'walkin1@example.com', 'full_name': 'Walk In', 'team_name': 'Red'},
+            {'email': 'known@example.com'},
+            {'email': 'walkin1@example.com'},
+            {'email': 'not-an-email'},
+            {'email': 'walkin2@example.com', 'college': 'IETM'},
+            {'email': 'walkin3@example.com'},
+            {'email': 'walkin4@example.com', 'event': 999999},
+        ]
+        with patch('events.importer.send_registration_emails') as send, patch('events.importer.prerender_on_commit') as prerender, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('registration-import'), {'event': self.event.pk, 'rows': rows}, format='json')
+        report = response.data
+        self.assertEqual([line['result'] for line in report['rows']],
+                         ['created', 'skipped', 'skipped', 'failed', 'created', 'failed', 'failed'])
+        self.assertEqual(report['rows'][5]['message'], "Event is fully booked.")
+        self.assertEqual(report['full_events'], [self.event.pk])
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_confirmed, 3)
+        created = Registration.objects.get(user__email='walkin1@example.com')
+        self.assertEqual((created.team_name, created.user.full_name), ('Red', 'Walk In'))
+        self.assertEqual(parse_ticket_token(created.token), (created.pk, self.event.pk))
+        self.assertEqual(len(send.call_args.args[0]), 2)
+        self.assertEqual(len(list(prerender.call_args.args[0])), 2)
+
+    def test_emails_match_existing_accounts_in_any_case(self):
+        google_user = User.objects.create_user(email="alice@gmail.com")
+        rows = [{'email': 'Alice@gmail.com'}, {'email': 'NEW.Walkin@Example.com'}]
+        with patch('events.importer.send_registration_emails'), self.captureOnCommitCallbacks(execute=True):
+            report = self.client.post(reverse('registration-import'), {'event': self.event.pk, 'rows': rows}, format='json').data
+        self.assertEqual([line['result'] for line in report['rows']], ['created', 'created'])
+        self.assertEqual(User.objects.filter(email__iexact="alice@gmail.com").count(), 1)
+        self.assertTrue(Registration.objects.filter(user=google_user, event=self.event).exists())
+        # New accounts get the address Google sign-in will present
+        self.assertTrue(User.objects.filter(email="new.walkin@example.com").exists())
+
+    def test_csv_upload_dry_run_writes_nothing(self):
+        upload = io.BytesIO(b"email,full_name\na@example.com,A\nb@example.com,B\n")
+        upload.name = 'walkins.csv'
+        response = self.client.post(reverse('registration-import'), {'file': upload, 'event': self.event.pk, 'dry_run': 'true'})
+        self.assertEqual(response.data['created'], 2)
+        self.assertFalse(Registration.objects.exists())
+        self.assertFalse(User.objects.filter(email='a@example.com').exists())
+
+
+class EventCatalogCacheTests(EventsTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event = make_event()
+
+    def test_repeat_request_served_from_cache(self):
+        first = self.client.get(reverse('event-list'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('event-list'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('must-revalidate', second['Cache-Control'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(reverse('event-detail', args=[self.event.id]))['ETag']
+        response = self.client.get(reverse('event-detail', args=[self.event.id]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        weak = self.client.get(reverse('event-detail', args=[self.event.id]), HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(weak.status_code, 304)
+
+    def test_registration_invalidates_catalog(self):
+        etag = self.client.get(reverse('event-list'))['ETag']
+        user = User.objects.create_user(email="fan@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            registration = Registration.objects.create(user=user, event=self.event)
+
+        response = self.client.get(reverse('event-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['registration_count'], 1)
+
+        etag = response['ETag']
+        registration.status = 'ATTENDED'
+        registration.save()
+        self.assertEqual(self.client.get(reverse('event-list'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registration.delete()
+        self.assertEqual(self.client.get(reverse('event-list')).json()[0]['registration_count'], 0)
+
+    def test_registration_bumps_version_once(self):
+        self.client.force_authenticate(User.objects.create_user(email="fan@example.com"))
+        with patch('events.cache.bump_catalog_version') as bump, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('register'), {'event': self.event.id})
+        self.assertEqual(response.status_code, 201)
+        bump.assert_called_once()
+
+    def test_event_edit_invalidates_catalog(self):
+        self.client.get(reverse('event-detail', args=[self.event.id]))
+        self.event.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.save()
+        response = self.client.get(reverse('event-detail', args=[self.event.id]))
+        self.assertEqual(response.json()['title'], 'Renamed')
+
+    def test_missing_event_is_not_cached(self):
+        self.assertEqual(self.client.get(reverse('event-detail', args=[999])).status_code, 404)
+
+
+class SeatReservationTests(EventsTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(registration_limit=2)
+        self.users = [User.objects.create_user(email=f"seat{i}@example.com") for i in range(3)]
+
+    def register(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('register'), {'event': self.event.id})
+
+    def test_limit_enforced_by_counter(self):
+        with patch('events.views.send_registration_email'):
+            self.assertEqual(self.register(self.users[0]).status_code, 201)
+            self.assertEqual(self.register(self.users[1]).status_code, 201)
+            response = self.register(self.users[2])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], "Event is fully booked.")
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.seats_confirmed, self.event.seats_held), (2, 0))
+
+    def test_hold_confirm_and_release(self):
+        from .seats import reserve_seat, confirm_seat, release_seat
+        self.assertTrue(reserve_seat(self.event, hold=True))
+        held = Registration.objects.create(user=self.users[0], event=self.event, seat_state='HELD')
+        self.assertTrue(reserve_seat(self.event, hold=True))
+        other = Registration.objects.create(user=self.users[1], event=self.event, seat_state='HELD')
+        self.assertFalse(reserve_seat(self.event))
+
+        confirm_seat(held)
+        self.assertTrue(release_seat(other))
+        self.assertFalse(release_seat(other))
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.seats_confirmed, self.event.seats_held), (1, 0))
+
+        held.delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_confirmed, 0)
+
+
+class SeatReservationConcurrencyTests(EventsTransactionTestCase):
+    ATTEMPTS = 300
+    SEATS = 30
+
+    def test_parallel_registrations_never_oversell(self):
+        event = make_event(registration_limit=self.SEATS)
+        users = [User.objects.create_user(email=f"rush{i}@example.com") for i in range(self.ATTEMPTS)]
+
+        def attempt(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                for _ in range(500):
+                    try:
+                        return client.post(reverse('register'), {'event': event.id}).status_code
+                    except OperationalError:
+                        # SQLite locks whole tables under contention; Postgres doesn't
+                        time.sleep(random.uniform(0.001, 0.02))
+            finally:
+                connection.close()
+
+        logging.disable(logging.CRITICAL)  # lock retries would flood the output
+        try:
+            with patch('events.views.send_registration_email'), ThreadPoolExecutor(max_workers=32) as pool:
+                results = list(pool.map(attempt, users))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        event.refresh_from_db()
+        self.assertNotIn(None, results)
+        self.assertLessEqual(results.count(201), self.SEATS)
+        self.assertEqual(event.registrations.count(), self.SEATS)
+        self.assertEqual(event.seats_confirmed, self.SEATS)
+
+
+class WaitlistTests(EventsTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(registration_limit=2)
+        self.users = [User.objects.create_user(email=f"wait{i}@example.com") for i in range(6)]
+        patcher = patch('events.waitlist.send_registration_email')
+        self.sent = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fill(self):
+        from .seats import reserve_seat
+        regs = []
+        for user in self.users[:2]:
+            reserve_seat(self.event)
+            regs.append(Registration.objects.create(user=user, event=self.event, seat_state='CONFIRMED'))
+        return regs
+
+    def join(self, user):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('event-waitlist', args=[self.event.id]))
+
+    def test_positions_are_ticket_numbers(self):
+        self.fill()
+        self.assertEqual(self.join(self.users[2]).data['position'], 1)
+        self.assertEqual(self.join(self.users[3]).data['position'], 2)
+        response = self.join(self.users[3])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['position'], 2)
+
+    def test_cancellations_promote_in_one_batch(self):
+        regs = self.fill()
+        for user in self.users[2:5]:
+            self.join(user)
+
+        self.client.force_authenticate(self.users[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('registration-cancel', args=[regs[0].id]))
+        self.client.force_authenticate(self.users[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('registration-cancel', args=[regs[1].id]))
+
+        promoted = Registration.objects.filter(event=self.event, seat_state='CONFIRMED')
+        self.assertEqual({r.user_id for r in promoted}, {self.users[2].id, self.users[3].id})
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_confirmed, 2)
+        self.assertEqual(self.sent.call_count, 2)
+
+        self.client.force_authenticate(self.users[4])
+        self.assertEqual(self.client.get(reverse('event-waitlist', args=[self.event.id])).data['position'], 1)
+
+    def test_cancelled_user_can_be_promoted_from_waitlist(self):
+        from .seats import reserve_seat
+        regs = self.fill()
+        self.client.force_authenticate(self.users[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('registration-cancel', args=[regs[0].id]))
+        reserve_seat(self.event)
+        Registration.objects.create(user=self.users[2], event=self.event, seat_state='CONFIRMED')
+        self.assertEqual(self.join(self.users[0]).status_code, 201)
+
+        self.client.force_authenticate(self.users[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('registration-cancel', args=[regs[1].id]))
+
+        regs[0].refresh_from_db()
+        self.assertEqual(regs[0].seat_state, 'CONFIRMED')
+        self.assertNotEqual(regs[0].status, 'CANCELLED')
+        self.assertEqual(WaitlistEntry.objects.get(user=self.users[0]).status, 'PROMOTED')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_confirmed, 2)
+
+    def test_promotion_is_batched(self):
+        from .waitlist import promote_waitlist
+        for user in self.users[:5]:
+            self.join(user)
+        WaitlistEntry.objects.update(status='WAITING')
+        Registration.objects.all().delete()
+        Event.objects.filter(pk=self.event.pk).update(seats_confirmed=0, seats_held=0, registration_limit=4)
+        # savepoint, lock, select, earlier registrations, bulk insert, token bulk update, counters, entries, release
+        with self.assertNumQueries(9):
+            registrations = promote_waitlist(self.event.pk)
+        self.assertEqual(len(registrations), 4)
+
+    def test_paid_event_promotion_holds_seat(self):
+        from .seats import release_seat
+        Event.objects.filter(pk=self.event.pk).update(requires_payment=True)
+        self.event.refresh_from_db()
+        regs = self.fill()
+        self.join(self.users[2])
+        with patch('events.waitlist.send_waitlist_promotion_email') as notify, self.captureOnCommitCallbacks(execute=True):
+            release_seat(regs[0])
+        promoted = Registration.objects.get(user=self.users[2], event=self.event)
+        self.assertEqual(promoted.seat_state, 'HELD')
+        self.assertEqual(notify.call_count, 1)
+
+    def test_expired_holds_go_to_waitlist(self):
+        from .seats import reserve_seat, release_expired_holds
+        Event.objects.filter(pk=self.event.pk).update(registration_limit=1)
+        reserve_seat(self.event, hold=True)
+        stale = Registration.objects.create(user=self.users[0], event=self.event, seat_state='HELD')
+        Registration.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.join(self.users[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(release_expired_holds(), 1)
+        self.assertTrue(Registration.objects.filter(user=self.users[1], seat_state='CONFIRMED').exists())
+
+
+class RegistrationQRTests(EventsTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(QR_CACHE_DIR=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="qr@example.com")
+        self.registration = Registration.objects.create(user=self.user, event=make_event(), status='REGISTERED')
+
+    def test_png_and_svg_endpoints(self):
+        token = self.registration.token
+        response = self.client.get(reverse('registration-qr', args=[token, 'png']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+
+        # Served from cache without touching the database
+        with self.assertNumQueries(0):
+            again = self.client.get(reverse('registration-qr', args=[token, 'png']))
+        self.assertEqual(again.content, response.content)
+
+        svg = self.client.get(reverse('registration-qr', args=[token, 'svg']))
+        self.assertEqual(svg['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'<svg', svg.content)
+
+    def test_unknown_token_is_404(self):
+        self.assertEqual(self.client.get(reverse('registration-qr', args=['not-a-ticket', 'png'])).status_code, 404)
+
+    def test_list_serializer_links_qr_unless_included(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('my-registrations'))
+        self.assertTrue(response.data[0]['qr_code'].endswith(f"/registrations/{self.registration.token}/qr.png"))
+
+        response = self.client.get(reverse('my-registrations'), {'include': 'qr_code'})
+        self.assertTrue(response.data[0]['qr_code'].startswith('data:image/png;base64,'))
+
+        # The web app offers a single ticket's qr_code as a same-origin download
+        response = self.client.post(reverse('register'), {'event': make_event(title="Download").pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['qr_code'].startswith('data:image/png;base64,'))
+
+    def test_confirmed_ticket_is_stored_and_served_statically(self):
+        from .utils import _qr_cache_path
+        user = User.objects.create_user(email="stored@example.com")
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('register'), {'event': make_event(title="Stored").pk})
+        registration = Registration.objects.get(user=user)
+        self.assertTrue(all(_qr_cache_path(registration.token, fmt).exists() for fmt in ('png', 'svg')))
+
+        url = self.client.get(reverse('my-registrations')).data[0]['qr_code']
+        self.assertIn('/media/tickets/', url)
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'image/png'))
+        self.assertIn('immutable', response['Cache-Control'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registration.delete()
+        self.assertFalse(_qr_cache_path(registration.token, 'png').exists())
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_backfill_and_prune_command(self):
+        from pathlib import Path
+        from django.conf import settings
+        from django.core.management import call_command
+        from .utils import _qr_cache_path
+        orphan = Path(settings.QR_CACHE_DIR) / 'ab' / f"{'ab' * 32}.png"
+        orphan.parent.mkdir(parents=True)
+        orphan.write_bytes(b'stale')
+
+        call_command('render_ticket_images', '--prune', stdout=io.StringIO())
+        self.assertTrue(_qr_cache_path(self.registration.token, 'svg').exists())
+        self.assertFalse(orphan.exists())
+
+    def test_direct_rasterizer_matches_qrcode_drawer(self):
+        from PIL import Image
+        from .utils import build_qr, qr_png_bytes, render_qr_png
+        qr = build_qr(self.registration.token)
+        drawn = qr.make_image(fill_color="black", back_color="white").convert('L')
+        fast = Image.open(io.BytesIO(render_qr_png(self.registration.token)))
+        self.assertEqual((fast.mode, fast.size), ('P', drawn.size))
+        self.assertEqual(fast.convert('L').tobytes(), drawn.tobytes())
+
+        branded = Image.open(io.BytesIO(qr_png_bytes(self.registration.token, color="#6366F1")))
+        self.assertEqual(branded.getpalette()[:6], [255, 255, 255, 0x63, 0x66, 0xF1])
+
+
+class VerifyTokenTests(EventsTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="door@example.com", full_name="Door Guest")
+        self.event = make_event(title="Shadow Login")
+        self.registration = Registration.objects.create(
+            user=self.user, event=self.event, status='REGISTERED', seat_state='CONFIRMED'
+        )
+
+    def test_first_scan_wins_in_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('verify', args=[self.registration.token]))
+        self.assertTrue(response.data['valid'])
+        registrant = response.data['registrant']
+        self.assertEqual(registrant['user_details']['full_name'], "Door Guest")
+        self.assertEqual(registrant['event_details']['title'], "Shadow Login")
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.status, 'ATTENDED')
+        self.assertTrue(self.registration.is_used)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('verify', args=[self.registration.token]))
+        self.assertFalse(response.data['valid'])
+
+    def test_losing_concurrent_scan_is_rejected(self):
+        from django.db.models.query import QuerySet
+        original_first = QuerySet.first
+
+        def first_then_other_scanner_wins(qs):
+            row = original_first(qs)
+            # Another gate flips the ticket between our read and our update
+            Registration.objects.filter(pk=self.registration.pk).update(status='ATTENDED', is_used=True)
+            return row
+
+        with patch.object(QuerySet, 'first', first_then_other_scanner_wins):
+            response = self.client.get(reverse('verify', args=[self.registration.token]))
+        self.assertFalse(response.data['valid'])
+        self.assertEqual(response.data['message'], "QR Code has already been used.")
+
+    def test_unknown_token_is_404(self):
+        self.assertEqual(self.client.get(reverse('verify', args=['nope'])).status_code, 404)
+
+    def test_cancelled_ticket_is_refused(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('registration-cancel', args=[self.registration.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(None)
+
+        response = self.client.get(reverse('verify', args=[self.registration.token]))
+        self.assertFalse(response.data['valid'])
+        self.assertEqual(response.data['registrant']['status'], 'CANCELLED')
+        response = self.client.post(reverse('verify-batch'), {'tokens': [self.registration.token]}, format='json')
+        self.assertEqual(response.data['admitted'], 0)
+        self.registration.refresh_from_db()
+        self.assertFalse(self.registration.is_used)
+
+    def test_admin_issued_ticket_is_admitted(self):
+        guest = User.objects.create_user(email="walkin@example.com")
+        self.client.force_login(User.objects.create_superuser(email="staff@example.com", password="pw"))
+        response = self.client.post(reverse('admin:events_registration_add'), {
+            'user': guest.pk, 'event': self.event.pk, 'status': 'REGISTERED', 'team_members': '[]',
+        })
+        self.assertEqual(response.status_code, 302)
+        registration = Registration.objects.get(user=guest)
+        self.assertEqual(registration.seat_state, 'CONFIRMED')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_confirmed, 1)
+
+        self.client.logout()
+        self.assertTrue(self.client.get(reverse('verify', args=[registration.token])).data['valid'])
+
+
+class OfflineScannerTests(EventsTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email="gate@example.com", password="pw"))
+        self.event = make_event()
+        self.regs = [
+            Registration.objects.create(user=User.objects.create_user(email=f"scan{i}@example.com"),
+                                        event=self.event, seat_state='CONFIRMED')
+            for i in range(3)
+        ]
+
+    def bundle_url(self):
+        return f'/operations/events/{self.event.id}/scanner-bundle/'
+
+    def sync(self, device, scans):
+        return self.client.post(f'/operations/events/{self.event.id}/scanner-sync/',
+                                {'device_id': device, 'scans': scans}, format='json')
+
+    def scan(self, scan_id, reg, minutes=0):
+        return {'scan_id': scan_id, 'token': reg.token,
+                'scanned_at': (timezone.now() + timedelta(minutes=minutes)).isoformat()}
+
+    def test_bundle_is_sorted_signed_digest_list(self):
+        import rsa
+        from .scanner import token_digest, verify_manifest
+        from .tickets import compact_code
+        self.assertNotIn('signature', self.client.get(self.bundle_url()).json())
+
+        _, private_key = rsa.newkeys(512)
+        with override_settings(SCANNER_SIGNING_KEY=private_key.save_pkcs1().decode()):
+            key = self.client.get('/operations/events/scanner-key/').json()
+            bundle = self.client.get(self.bundle_url()).json()
+        self.assertTrue(bundle['full'])
+        self.assertEqual(bundle['valid'], sorted(
+            token_digest(code) for r in self.regs for code in (r.token, compact_code(r.token))
+        ))
+        # Devices only need the public key
+        self.assertEqual(bundle['key_id'], key['key_id'])
+        self.assertNotIn('PRIVATE', key['public_key'])
+        self.assertTrue(verify_manifest(bundle, key['public_key']))
+        bundle['valid'].append('0' * 24)
+        self.assertFalse(verify_manifest(bundle, key['public_key']))
+
+    def test_delta_bundle_lists_changes_only(self):
+        from .scanner import token_digest
+        from .tickets import compact_code
+        cursor = self.client.get(self.bundle_url()).json()['cursor']
+        self.client.get(reverse('verify', args=[self.regs[0].token]))
+        delta = self.client.get(self.bundle_url(), {'since': cursor}).json()
+        self.assertFalse(delta['full'])
+        self.assertEqual(delta['valid'], [])
+        token = self.regs[0].token
+        self.assertEqual(delta['attended'], sorted([token_digest(token), token_digest(compact_code(token))]))
+
+    def test_compact_code_checks_in_offline(self):
+        from .scanner import token_digest
+        from .tickets import ticket_qr_payload
+        code = ticket_qr_payload(self.regs[0].token, 'compact')
+        # The device finds the scanned code itself in the bundle...
+        self.assertIn(token_digest(code), self.client.get(self.bundle_url()).json()['valid'])
+        # ...and the queued scan is applied to the ticket it stands for
+        scan = {**self.scan('c1', self.regs[0]), 'token': code}
+        self.assertEqual(self.sync('gate-a', [scan]).json()['accepted'], 1)
+        self.regs[0].refresh_from_db()
+        self.assertEqual(self.regs[0].status, 'ATTENDED')
+
+    def test_sync_is_idempotent_and_reports_double_entry(self):
+        first = self.sync('gate-a', [self.scan('a1', self.regs[0]), self.scan('a2', self.regs[1])]).json()
+        self.assertEqual(first['accepted'], 2)
+
+        second = self.sync('gate-b', [self.scan('b1', self.regs[0], minutes=5), self.scan('b2', self.regs[2])]).json()
+        self.assertEqual(second['accepted'], 1)
+        [conflict] = second['conflicts']
+        self.assertEqual(conflict['scan_id'], 'b1')
+        self.assertEqual(conflict['first_entry']['device_id'], 'gate-a')
+
+        replay = self.sync('gate-a', [self.scan('a1', self.regs[0])]).json()
+        self.assertEqual(replay['accepted'], 0)
+        self.assertEqual(replay['results'][0]['result'], 'ACCEPTED')
+        self.assertTrue(replay['results'][0]['replayed'])
+        self.assertEqual(Registration.objects.filter(event=self.event, status='ATTENDED').count(), 3)
+
+    def test_sync_batch_query_count_is_constant(self):
+        scans = [self.scan(f"s{i}", reg) for i, reg in enumerate(self.regs)]
+        scans.append({'scan_id': 'junk', 'token': 'forged', 'scanned_at': timezone.now().isoformat()})
+        # event, savepoint, replays, tickets, first entries, bulk update, bulk insert, release
+        with self.assertNumQueries(8):
+            results = self.sync('gate-a', scans).json()['results']
+        self.assertEqual([r['result'] for r in results], ['ACCEPTED'] * 3 + ['INVALID'])
+
+
+class VerifyTokenBatchTests(EventsTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event()
+        self.regs = [
+            Registration.objects.create(
+                user=User.objects.create_user(email=f"team{i}@example.com"), event=self.event, seat_state='CONFIRMED'
+            )
+            for i in range(4)
+        ]
+
+    def test_batch_marks_team_attended_in_constant_queries(self):
+        self.client.get(reverse('verify', args=[self.regs[0].token]))
+        tokens = [r.token for r in self.regs] + ['forged', self.regs[1].token]
+        # savepoint, locked lookup, bulk update, release
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse('verify-batch'), {'tokens': tokens}, format='json')
+
+        results = response.data['results']
+        self.assertEqual([r['valid'] for r in results], [False, True, True, True, False, False])
+        self.assertEqual(results[0]['message'], "QR Code has already been used.")
+        self.assertIsNone(results[4]['registrant'])
+        self.assertEqual(response.data['admitted'], 3)
+        self.assertEqual(Registration.objects.filter(status='ATTENDED', is_used=True).count(), 4)
+
+    def test_rejects_bad_payload(self):
+        self.assertEqual(self.client.post(reverse('verify-batch'), {'tokens': 'abc'}, format='json').status_code, 400)
+        too_many = {'tokens': ['x'] * 501}
+        self.assertEqual(self.client.post(reverse('verify-batch'), too_many, format='json').status_code, 400)
+
+
+class TicketTokenTests(EventsTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event()
+        self.user = User.objects.create_user(email="ticket@example.com")
+
+    def test_new_registrations_get_signed_tokens(self):
+        from .tickets import parse_ticket_token
+        registration = Registration.objects.create(user=self.user, event=self.event)
+        self.assertEqual(parse_ticket_token(registration.token), (registration.pk, self.event.pk))
+        registration.refresh_from_db()
+        self.assertEqual(parse_ticket_token(registration.token), (registration.pk, self.event.pk))
+
+    def test_forged_tokens_rejected_without_query(self):
+        registration = Registration.objects.create(user=self.user, event=self.event, seat_state='CONFIRMED')
+        rid, eid, mac = registration.token.split('.')
+        forged = f"{rid}.{eid}.{'A' * len(mac)}"
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('verify', args=[forged])).status_code, 404)
+            self.assertEqual(self.client.get(reverse('verify', args=['garbage'])).status_code, 404)
+        self.assertTrue(self.client.get(reverse('verify', args=[registration.token])).data['valid'])
+
+    def test_legacy_tokens_still_accepted(self):
+        import secrets
+        legacy = secrets.token_urlsafe(32)
+        Registration.objects.create(user=self.user, event=self.event, token=legacy, seat_state='CONFIRMED')
+        self.assertTrue(self.client.get(reverse('verify', args=[legacy])).data['valid'])
+        with override_settings(ACCEPT_LEGACY_TICKET_TOKENS=False), self.assertNumQueries(0):
+            self.client.get(reverse('verify', args=[legacy]))
+
+    def test_reissue_command(self):
+        import secrets
+        from django.core.management import call_command
+        from .tickets import parse_ticket_token
+        legacy = secrets.token_urlsafe(32)
+        registration = Registration.objects.create(user=self.user, event=self.event, token=legacy, seat_state='CONFIRMED')
+        issued_at = registration.updated_at
+        call_command('reissue_ticket_tokens', stdout=io.StringIO())
+        registration.refresh_from_db()
+        self.assertIsNotNone(parse_ticket_token(registration.token))
+        # Delta scanner bundles pick up the new token
+        self.assertGreater(registration.updated_at, issued_at)
+
+        # QR codes already sent keep working until legacy tokens are switched off
+        response = self.client.post(reverse('verify-batch'), {'tokens': [legacy]}, format='json')
+        self.assertTrue(response.data['results'][0]['valid'])
+        self.assertFalse(self.client.get(reverse('verify', args=[legacy])).data['valid'])  # already used
+        with override_settings(ACCEPT_LEGACY_TICKET_TOKENS=False):
+            self.assertEqual(self.client.get(reverse('verify', args=[legacy])).status_code, 404)
+
+    def test_compact_codes_verify_and_shrink_the_qr(self):
+        from .tickets import make_compact_code, ticket_qr_payload
+        from .utils import build_qr
+        registration = Registration.objects.create(user=self.user, event=self.event, seat_state='CONFIRMED')
+        code = ticket_qr_payload(registration.token, 'compact')
+        self.assertEqual(code, make_compact_code(registration.pk, self.event.pk))
+        self.assertLess(build_qr(registration.token, 'compact').version, build_qr(registration.token, 'url').version)
+
+        tampered = code[:-1] + ('A' if code[-1] != 'A' else 'B')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('verify', args=[tampered])).status_code, 404)
+        response = self.client.post(reverse('verify-batch'), {'tokens': [code]}, format='json')
+        self.assertTrue(response.data['results'][0]['valid'])
+
+
+class TicketEmailTests(EventsTestCase):
+    def setUp(self):
+        from .ticket_email import clear_cache
+        clear_cache()
+        self.event = make_event(title="Capture <The> Flag", venue="Hall A")
+        user = User.objects.create_user(email="mail@example.com", full_name="Ada <script>")
+        self.registration = Registration.objects.create(user=user, event=self.event, team_name="R&D")
+
+    def test_parts_are_escaped_and_text_is_not_html(self):
+        from .ticket_email import render_ticket_email
+        subject, text, html = render_ticket_email(self.registration)
+        self.assertEqual(subject, "🎟️ Your Ticket for Capture <The> Flag - ASTRA IETM")
+        self.assertIn("Ada &lt;script&gt;", html)
+        self.assertIn("Capture &lt;The&gt; Flag", html)
+        self.assertIn("R&amp;D", html)
+        self.assertIn(self.registration.token[:16], html)
+        self.assertIn("Hi Ada <script>,", text)
+        self.assertIn("Team Name: R&D", text)
+        self.assertNotIn("<", text.replace("<script>", "").replace("<The>", ""))
+
+        self.registration.team_name = ''
+        self.assertNotIn("Team Name", render_ticket_email(self.registration)[1])
+
+    def test_event_layout_rendered_once_until_the_event_changes(self):
+        from .ticket_email import _layout, render_ticket_email
+        other = Registration.objects.create(user=User.objects.create_user(email="two@example.com"), event=self.event, team_name="Blue")
+        with patch('events.ticket_email._layout', wraps=_layout) as layout:
+            render_ticket_email(self.registration)
+            html = render_ticket_email(other)[2]
+            self.assertEqual(layout.call_count, 2)  # HTML and text, once
+            self.assertIn("two@example.com", html)
+
+            self.event.venue = "Hall B"
+            self.assertIn("Hall B", render_ticket_email(other)[2])
+            self.assertEqual(layout.call_count, 4)
+
+    def test_built_email_has_both_parts_and_inline_qr(self):
+        from .utils import build_registration_email
+        email = build_registration_email(self.registration)
+        self.assertIn("Hall A", email.body)
+        self.assertEqual(email.alternatives[0][1], 'text/html')
+        parts = {part.get('Content-ID') for part in email.message().walk()}
+        self.assertIn('<qr_ticket>', parts)
+
+
+class BulkResendTests(EventsTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(QR_CACHE_DIR=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        event = make_event()
+        self.registrations = [
+            Registration.objects.create(user=User.objects.create_user(email=f"resend{i}@example.com"), event=event)
+            for i in range(4)
+        ]
+
+    def test_admin_resend_queues_one_batch_and_returns(self):
+        from ops.models import OutboxMessage
+        from ops.outbox import PRIORITY_DEFAULT
+        admin_user = User.objects.create_superuser(email="admin@example.com", password="pw")
+        self.client.force_login(admin_user)
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(8):
+            response = self.client.post(reverse('admin:events_registration_changelist'), {
+                'action': 'resend_confirmation_email',
+                '_selected_action': [r.pk for r in self.registrations],
+            }, follow=False)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(callbacks), 2)  # outbox kick and QR pre-render, nothing sent yet
+
+        messages = OutboxMessage.objects.all()
+        self.assertEqual(len({m.batch for m in messages}), 1)
+        self.assertEqual({m.priority for m in messages}, {PRIORITY_DEFAULT})
+        self.assertEqual(sorted(m.object_id for m in messages), sorted(r.pk for r in self.registrations))
+
+    def test_prerender_fills_qr_cache_in_worker_processes(self):
+        from . import rendering
+        from .utils import peek_qr_image
+        self.addCleanup(rendering.shutdown)
+        tokens = [r.token for r in self.registrations]
+        with patch('events.rendering.CHUNK_SIZE', 1):
+            self.assertEqual(rendering.prerender(tokens, workers=2), 4)
+        self.assertIsNotNone(rendering._pool)
+        self.assertTrue(all(peek_qr_image(token, 'png').startswith(b'\x89PNG') for token in tokens))
+        self.assertEqual(rendering.prerender(tokens, workers=2), 0)
+
+class PrintableTests(EventsTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(QR_CACHE_DIR=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.event = make_event(title='Hawkins Lab')
+        self.registrations = [
+            Registration.objects.create(
+                user=User.objects.create_user(email=f"print{i}@example.com", full_name=f"Attendee {i}"),
+                event=self.event, seat_state='CONFIRMED', status='ATTENDED' if i < 3 else 'REGISTERED',
+            )
+            for i in range(10)
+        ]
+
+    def test_admin_prints_ticket_sheets_as_one_pdf(self):
+        admin_user = User.objects.create_superuser(email="admin@example.com", password="pw")
+        self.client.force_login(admin_user)
+        response = self.client.post(reverse('admin:events_event_changelist'), {
+            'action': 'print_ticket_sheets',
+            '_selected_action': [self.event.pk],
+        })
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        document = b''.join(response.streaming_content)
+        self.assertTrue(document.startswith(b'%PDF-1.4'))
+        self.assertTrue(document.endswith(b'%%EOF\n'))
+        # 10 tickets, 8 per sheet
+        self.assertIn(b'/Count 2 >>', document)
+        xref_at = int(document.rsplit(b'startxref\n', 1)[1].split()[0])
+        self.assertTrue(document[xref_at:].startswith(b'xref\n'))
+
+    def test_certificates_command_writes_zip_in_worker_processes(self):
+        import zipfile
+        from django.core.management import call_command
+        from PIL import Image
+        from . import rendering
+        self.addCleanup(rendering.shutdown)
+        output = tempfile.NamedTemporaryFile(suffix='.zip')
+        self.addCleanup(output.close)
+        stdout = io.StringIO()
+        call_command('render_printables', self.event.pk, '--kind', 'certificates', '--format', 'zip',
+                     '--output', output.name, '--workers', '2', stdout=stdout)
+        self.assertIn('3 certificates on 3 pages', stdout.getvalue())
+        self.assertIn('pages/s', stdout.getvalue())
+        with zipfile.ZipFile(output.name) as archive:
+            self.assertEqual(archive.namelist(), [f'certificates/0000{i}.png' for i in (1, 2, 3)])
+            page = Image.open(io.BytesIO(archive.read('certificates/00001.png')))
+            self.assertEqual(page.size, (1754, 1240))
+
+    def test_printed_date_is_local(self):
+        from datetime import datetime, timezone as dt_timezone
+        from .printables import attendees, printable_items
+        # 20:00 UTC is already the next day in Asia/Kolkata
+        self.event.event_date = datetime(2026, 3, 14, 20, 0, tzinfo=dt_timezone.utc)
+        self.event.save()
+        item = next(printable_items(attendees('tickets', [self.event.pk])))
+        self.assertEqual(item['date'], '15 March 2026')
@@ -0,0 +1,102 @@
+"""
+Ticket email renderer.
+
+The HTML and text layouts are compiled once per process. For each event they
+are rendered once more with the per-registrant fields left as markers, and the
+result is cached split at those markers. A ticket email is then a join of the
+cached pieces with the registrant's (escaped) name, team and token, with no
+template engine or tag stripping on the per-message path.
+"""
+import re
+import threading
+from cachetools import LRUCache
+from django.template.loader import get_template
+from django.utils.dateformat import format as date_format
+from django.utils.html import escape
+from django.utils.timezone import localtime
+
+HTML_TEMPLATE = 'events/emails/ticket.html'
+TEXT_TEMPLATE = 'events/emails/ticket.txt'
+QR_CID = 'qr_ticket'
+EVENT_URL = 'https://astraietm.in/events/{}'
+
+# Per-registrant fields, rendered as markers into the per-event layout
+FIELDS = ('name', 'team_name', 'token')
+_MARKER = '\x1f{}\x1f'
+_MARKER_RE = re.compile('\x1f(%s)\x1f' % '|'.join(FIELDS))
+
+_layouts = {}
+_parts = LRUCache(maxsize=256)
+_lock = threading.Lock()
+
+
+def _layout(name):
+    # The cached template loader only keeps compiled templates when DEBUG is off
+    layout = _layouts.get(name)
+    if layout is None:
+        layout = _layouts[name] = get_template(name)
+    return layout
+
+
+def _split(rendered):
+    """['text', 'field', 'text', 'field', ..., 'text'] from a rendered layout."""
+    return tuple(_MARKER_RE.split(rendered))
+
+
+def event_parts(event, with_team):
+    """
+    The subject and the HTML and text layouts of `event`, pre-rendered and
+    split at the per-registrant fields. Keyed on the event fields the layout
+    shows, so an edited event gets fresh parts.
+    """
+    key = (event.pk, event.title, event.event_date, event.venue, with_team)
+    with _lock:
+        parts = _parts.get(key)
+    if parts is not None:
+        return parts
+
+    when = localtime(event.event_date)
+    context = {
+        'title': event.title,
+        'date': date_format(when, 'l, F j, Y'),
+        'time': date_format(when, 'g:i A'),
+        'venue': event.venue,
+        'event_url': EVENT_URL.format(event.pk),
+        'qr_cid': QR_CID,
+        **{field: _MARKER.format(field) for field in FIELDS},
+    }
+    if not with_team:
+        context['team_name'] = ''
+    parts = (
+        f"🎟️ Your Ticket for {event.title} - ASTRA IETM",
+        _split(_layout(HTML_TEMPLATE).render(context)),
+        _split(_layout(TEXT_TEMPLATE).render(context)),
+    )
+    with _lock:
+        _parts[key] = parts
+    return parts
+
+
+def _fill(parts, values):
+    pieces = list(parts)
+    for i in range(1, len(pieces), 2):
+        pieces[i] = values[pieces[i]]
+    return ''.join(pieces)
+
+
+def render_ticket_email(registration):
+    """Return (subject, text, html) for a registration's ticket email."""
+    user = registration.user
+    values = {
+        'name': user.full_name or user.email,
+        'team_name': registration.team_name,
+        'token': registration.token[:16],
+    }
+    subject, html, text = event_parts(registration.event, bool(registration.team_name))
+    return subject, _fill(text, values), _fill(html, {field: escape(value) for field, value in values.items()})
+
+
+def clear_cache():
+    """Forget the pre-rendered event parts (the compiled layouts are kept)."""
+    with _lock:
+        _parts.clear()
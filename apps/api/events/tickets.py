@@ -0,0 +1,160 @@
+"""
+Self-authenticating ticket tokens.
+
+A ticket token is "<registration id>.<event id>.<mac>" (ids in base 36, mac a
+truncated HMAC-SHA256 in urlsafe base64). Forged or mangled tokens are
+rejected without touching the database, and genuine ones are looked up by
+primary key. Tokens are derived from the registration id, so they are unique
+without probing the table.
+
+Tickets issued before this format (43-char secrets.token_urlsafe strings,
+no dots) are still accepted while ACCEPT_LEGACY_TICKET_TOKENS is on. The
+reissue_ticket_tokens command moves existing registrations over and keeps
+the old value in legacy_token, so QR codes already sent keep working until
+the setting is turned off.
+
+A signed ticket can also be written as a compact code: the two ids packed
+as 32-bit integers plus a shorter MAC, in RFC 4648 base32. Every character
+is in the QR alphanumeric set, so the code fits a much smaller QR symbol
+(see TICKET_QR_ENCODING). Compact codes are accepted wherever tokens are,
+and offline scanner bundles list their digests too.
+"""
+import base64
+import re
+import struct
+from django.conf import settings
+from django.db.models import Q
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+KEY_SALT = 'events.tickets'
+MAC_BYTES = 16
+COMPACT_MAC_BYTES = 10
+COMPACT_STRUCT = struct.Struct('>II')
+COMPACT_CODE_RE = re.compile(r'^[A-Z2-7]{29}$')
+LEGACY_TOKEN_RE = re.compile(r'^[A-Za-z0-9_-]{43}$')
+VERIFY_BASE_URL = "https://astraietm.in/verify"
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def _b36(number):
+    out = ''
+    while True:
+        number, rem = divmod(number, 36)
+        out = DIGITS[rem] + out
+        if not number:
+            return out
+
+
+def _digest(body):
+    return salted_hmac(KEY_SALT, body, secret=settings.TICKET_SIGNING_KEY, algorithm='sha256').digest()
+
+
+def _mac(body):
+    return base64.urlsafe_b64encode(_digest(body)[:MAC_BYTES]).rstrip(b'=').decode()
+
+
+def make_ticket_token(registration_id, event_id):
+    body = f"{_b36(registration_id)}.{_b36(event_id)}"
+    return f"{body}.{_mac(body)}"
+
+
+def parse_ticket_token(token):
+    """Return (registration_id, event_id) for an authentic signed token, else None."""
+    parts = token.split('.')
+    if len(parts) != 3:
+        return None
+    body = f"{parts[0]}.{parts[1]}"
+    if not constant_time_compare(_mac(body), parts[2]):
+        return None
+    try:
+        return int(parts[0], 36), int(parts[1], 36)
+    except ValueError:
+        return None
+
+
+def make_compact_code(registration_id, event_id):
+    body = f"{_b36(registration_id)}.{_b36(event_id)}"
+    raw = COMPACT_STRUCT.pack(registration_id, event_id) + _digest(body)[:COMPACT_MAC_BYTES]
+    return base64.b32encode(raw).decode().rstrip('=')
+
+
+def parse_compact_code(code):
+    """Return (registration_id, event_id) for an authentic compact code, else None."""
+    if not COMPACT_CODE_RE.match(code):
+        return None
+    raw = base64.b32decode(code + '===')
+    registration_id, event_id = COMPACT_STRUCT.unpack(raw[:COMPACT_STRUCT.size])
+    body = f"{_b36(registration_id)}.{_b36(event_id)}"
+    if not constant_time_compare(_digest(body)[:COMPACT_MAC_BYTES], raw[COMPACT_STRUCT.size:]):
+        return None
+    return registration_id, event_id
+
+
+def canonical_token(token):
+    """Map a compact code to the signed token it stands for; anything else is returned as is."""
+    ids = parse_compact_code(token)
+    return make_ticket_token(*ids) if ids else token
+
+
+def ticket_qr_payload(token, encoding=None):
+    """
+    Text encoded in a ticket's QR code: the verify URL (default) or, with
+    TICKET_QR_ENCODING = 'compact', the bare compact code. Legacy tokens
+    always use the URL.
+    """
+    encoding = encoding or settings.TICKET_QR_ENCODING
+    if encoding == 'compact':
+        code = compact_code(token)
+        if code is not None:
+            return code
+    return f"{VERIFY_BASE_URL}/{token}"
+
+
+def compact_code(token):
+    """The compact code standing for a signed token, or None (legacy tokens, ids over 32 bits)."""
+    ids = parse_ticket_token(token)
+    if ids is None or max(ids) >= 2 ** 32:
+        return None
+    return make_compact_code(*ids)
+
+
+def is_legacy_token(token):
+    return settings.ACCEPT_LEGACY_TICKET_TOKENS and bool(LEGACY_TOKEN_RE.match(token))
+
+
+def ticket_filter(token):
+    """
+    Q() matching the registration for a ticket token, or None when the token
+    can't be genuine (so callers can answer without a query).
+    """
+    ids = parse_ticket_token(token) or parse_compact_code(token)
+    if ids is not None:
+        return Q(pk=ids[0], event_id=ids[1])
+    if is_legacy_token(token):
+        return Q(token=token) | Q(legacy_token=token)
+    return None
+
+
+def plausible_tokens(tokens):
+    """Drop tokens that fail the signature/format check."""
+    return [token for token in tokens if parse_ticket_token(token) is not None or is_legacy_token(token)]
+
+
+def reissued_tokens(tokens):
+    """
+    {legacy token: current token} for the reissued tickets among `tokens`.
+    Costs one query, and none when no token has the legacy format.
+    """
+    legacy = {token for token in tokens if is_legacy_token(token)}
+    if not legacy:
+        return {}
+    from .models import Registration
+    return dict(Registration.objects.filter(legacy_token__in=legacy).values_list('legacy_token', 'token'))
+
+
+def assign_ticket_tokens(registrations):
+    """Set signed tokens on freshly inserted registrations (e.g. after bulk_create)."""
+    from .models import Registration
+    for registration in registrations:
+        registration.token = make_ticket_token(registration.pk, registration.event_id)
+    Registration.objects.bulk_update(registrations, ['token'])
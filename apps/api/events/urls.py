@@ -1,12 +1,20 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, re_path
 from rest_framework.routers import DefaultRouter
 from .views import (
     EventListView, 
     EventDetailView,
     RegistrationCreateView, 
     MyRegistrationsView, 
+    RegistrationCancelView,
+    RegistrationQRView,
+    ticket_image,
+    WaitlistView,
     VerifyTokenView,
+    VerifyTokenBatchView,
     AdminRegistrationsView,
+    RegistrationExportView,
+    RegistrationImportView,
     AdminEventViewSet,
     CreatePaymentOrderView,
     VerifyPaymentView,
@@ -20,10 +28,20 @@ router.register(r'operations/events', AdminEventViewSet, basename='admin-events'
 urlpatterns = [
     path('events/', EventListView.as_view(), name='event-list'),
     path('events/<int:pk>/', EventDetailView.as_view(), name='event-detail'),
+    path('events/<int:pk>/waitlist/', WaitlistView.as_view(), name='event-waitlist'),
     path('register/', RegistrationCreateView.as_view(), name='register'),
     path('my-registrations/', MyRegistrationsView.as_view(), name='my-registrations'),
+    re_path(r'^registrations/(?P<token>[\w.-]+)/qr\.(?P<fmt>png|svg)$', RegistrationQRView.as_view(), name='registration-qr'),
+    re_path(
+        rf'^{settings.TICKET_MEDIA_URL.strip("/")}/(?P<shard>[0-9a-f]{{2}})/(?P<digest>[0-9a-f]{{64}})\.(?P<fmt>png|svg)$',
+        ticket_image, name='ticket-image',
+    ),
+    path('registrations/<int:pk>/cancel/', RegistrationCancelView.as_view(), name='registration-cancel'),
+    path('verify/batch/', VerifyTokenBatchView.as_view(), name='verify-batch'),
     path('verify/<str:token>/', VerifyTokenView.as_view(), name='verify'),
     path('admin-registrations/', AdminRegistrationsView.as_view(), name='admin-registrations'),
+    path('admin-registrations/export/', RegistrationExportView.as_view(), name='registration-export'),
+    path('admin-registrations/import/', RegistrationImportView.as_view(), name='registration-import'),
     path('payment/create-order/', CreatePaymentOrderView.as_view(), name='create-payment-order'),
     path('payment/verify/', VerifyPaymentView.as_view(), name='verify-payment'),
     path('admin-registrations/clear/', ClearRegistrationsView.as_view(), name='clear-registrations'),
@@ -1,220 +1,191 @@
 import qrcode
+import qrcode.image.svg
 import io
 import base64
+import hashlib
+import os
+import threading
+from pathlib import Path
+from cachetools import LRUCache
+from PIL import Image, ImageColor
+from django.conf import settings
+from .tickets import ticket_qr_payload
 
-def generate_qr_code(token, color="#000000"):
-    """
-    Generate an ultra-premium, professional QR code.
-    Encodes the full verification URL and supports branding colors.
-    """
-    # Professional verification URL
-    base_url = "https://astraietm.in/verify"
-    data = f"{base_url}/{token}"
-
+def build_qr(token, encoding=None):
+    """The ticket's QR code, encoded but not yet drawn (see rasterize_qr and svg_qr)."""
+    # Professional verification URL, or the compact alphanumeric ticket code
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_M, # M is cleaner for branding
         box_size=12, # Slightly larger for crispness
         border=4,
     )
-    qr.add_data(data)
+    qr.add_data(ticket_qr_payload(token, encoding))
     qr.make(fit=True)
+    return qr
 
-    # Use RGB for coloring
+def rasterize_qr(qr, color="#000000"):
+    """
+    PNG bytes of a built QR code: the module matrix becomes a two-colour
+    palette image, one pixel per module, scaled up to box_size in C and
+    saved with one bit per pixel.
+    """
+    matrix = qr.get_matrix()  # includes the quiet-zone border
+    size = len(matrix)
     try:
-        # Convert hex to RGB tuples
-        fill_color = color
-        back_color = "white"
-        
-        img = qr.make_image(fill_color=fill_color, back_color=back_color).convert('RGB')
-        
-        # Buffer it for response
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        return f"data:image/png;base64,{img_str}"
-    except Exception as e:
-        print(f"QR Gen Error: {e}")
-        # Robust fallback to standard black/white
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        return f"data:image/png;base64,{img_str}"
+        dark = ImageColor.getrgb(color)[:3]
+    except ValueError:
+        print(f"QR Gen Error: unknown colour {color!r}")
+        dark = (0, 0, 0)
+    img = Image.frombytes('P', (size, size), b''.join(bytes(row) for row in matrix))
+    img.putpalette((255, 255, 255) + dark)
+    img = img.resize((size * qr.box_size, size * qr.box_size), Image.Resampling.NEAREST)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", bits=1)
+    return buffer.getvalue()
+
+def render_qr_png(token, color="#000000", encoding=None):
+    """Render the ticket QR code as PNG bytes."""
+    return rasterize_qr(build_qr(token, encoding), color)
+
+def svg_qr(qr):
+    """SVG bytes of a built QR code."""
+    return qr.make_image(image_factory=qrcode.image.svg.SvgPathFillImage).to_string()
+
+def render_qr_svg(token):
+    """Render the ticket QR code as SVG bytes."""
+    return svg_qr(build_qr(token))
+
+def qr_png_bytes(token, color="#000000"):
+    """PNG bytes of a ticket's QR code; black ones come from the QR cache."""
+    if color == "#000000":
+        return get_qr_image(token, 'png')
+    return render_qr_png(token, color)
+
+def generate_qr_code(token, color="#000000"):
+    """
+    Generate an ultra-premium, professional QR code.
+    Encodes the full verification URL and supports branding colors.
+    Returns a data URI for JSON responses; use qr_png_bytes() for the raw PNG.
+    """
+    img_str = base64.b64encode(qr_png_bytes(token, color)).decode('utf-8')
+    return f"data:image/png;base64,{img_str}"
+
+# Ticket images are rendered once, when a seat is confirmed, and stored under
+# QR_CACHE_DIR named by a hash of what they encode, so TICKET_MEDIA_URL can
+# serve them as immutable files. A bounded in-memory LRU sits in front.
+QR_RENDERERS = {
+    'png': rasterize_qr,
+    'svg': svg_qr,
+}
+_qr_memory = LRUCache(maxsize=settings.QR_MEMORY_CACHE_SIZE)
+_qr_lock = threading.Lock()
+
+def _qr_cache_path(token, fmt):
+    # The payload encoding is part of the key so switching it never serves stale images
+    digest = hashlib.sha256(f"{settings.TICKET_QR_ENCODING}:{token}".encode()).hexdigest()
+    return Path(settings.QR_CACHE_DIR) / digest[:2] / f"{digest}.{fmt}"
+
+def _write_image(path, data):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"QR cache write failed: {e}")
+
+def peek_qr_image(token, fmt='png'):
+    """Return the cached QR image bytes, or None if it hasn't been rendered yet."""
+    with _qr_lock:
+        data = _qr_memory.get((settings.TICKET_QR_ENCODING, token, fmt))
+    if data is not None:
+        return data
+    try:
+        data = _qr_cache_path(token, fmt).read_bytes()
+    except OSError:
+        return None
+    with _qr_lock:
+        _qr_memory[(settings.TICKET_QR_ENCODING, token, fmt)] = data
+    return data
+
+def get_qr_image(token, fmt='png'):
+    """Return the QR image bytes for a ticket token, rendering it on first use."""
+    data = peek_qr_image(token, fmt)
+    if data is not None:
+        return data
+
+    data = QR_RENDERERS[fmt](build_qr(token))
+    _write_image(_qr_cache_path(token, fmt), data)
+    with _qr_lock:
+        _qr_memory[(settings.TICKET_QR_ENCODING, token, fmt)] = data
+    return data
+
+def store_ticket_images(token):
+    """
+    Render every missing format of a ticket's image into the store, encoding
+    the QR code once. Returns how many files were written.
+    """
+    qr = None
+    written = 0
+    for fmt, render in QR_RENDERERS.items():
+        path = _qr_cache_path(token, fmt)
+        if path.exists():
+            continue
+        qr = qr or build_qr(token)
+        _write_image(path, render(qr))
+        written += 1
+    return written
+
+def ticket_images_stored(token):
+    return all(_qr_cache_path(token, fmt).exists() for fmt in QR_RENDERERS)
+
+def ticket_image_url(token, fmt='png'):
+    """Static path of a stored ticket image, or None if it isn't stored yet."""
+    path = _qr_cache_path(token, fmt)
+    if not path.exists():
+        return None
+    return f"{settings.TICKET_MEDIA_URL}{path.parent.name}/{path.name}"
+
+def delete_ticket_images(token):
+    """Remove a ticket's stored images, e.g. once its registration is deleted."""
+    with _qr_lock:
+        for fmt in QR_RENDERERS:
+            _qr_memory.pop((settings.TICKET_QR_ENCODING, token, fmt), None)
+    for fmt in QR_RENDERERS:
+        try:
+            _qr_cache_path(token, fmt).unlink(missing_ok=True)
+        except OSError as e:
+            print(f"QR cache delete failed: {e}")
 
 from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from django.conf import settings
+from django.db import transaction
 from email.mime.image import MIMEImage
 
-import threading
-import sys
+from ops.models import OutboxMessage
+from ops.outbox import PRIORITY_DEFAULT, PRIORITY_TRANSACTIONAL, enqueue, enqueue_many, register_builder
 
-def send_email_thread(email):
-    try:
-        print(f"Starting email send to {email.to}...", flush=True)
-        email.send()
-        print(f"Email sent successfully to {email.to}", flush=True)
-    except Exception as e:
-        import traceback
-        print(f"CRITICAL ERROR sending email: {str(e)}", file=sys.stderr, flush=True)
-        print(f"Full traceback: {traceback.format_exc()}", file=sys.stderr, flush=True)
+import sys
+import uuid
 
-def send_registration_email(registration):
+def build_registration_email(registration):
     """
-    Sends a confirmation email with QR code ticket to the registered user.
-    Uses existing QR code generation from serializer.
+    Builds the confirmation email with QR code ticket for a registration.
+    Returns None if the ticket could not be rendered.
     """
+    from .ticket_email import QR_CID, render_ticket_email
+    user = registration.user
+    event = registration.event
     try:
-        print(f"[EMAIL] Starting email generation for registration {registration.id}", flush=True)
-        user = registration.user
-        event = registration.event
-        print(f"[EMAIL] User: {user.email}, Event: {event.title}", flush=True)
-        
-        # 1. Generate QR Code using existing utility
-        print(f"[EMAIL] Generating QR code...", flush=True)
-        qr_code_base64 = generate_qr_code(registration.token, color="#000000")
-        print(f"[EMAIL] QR code generated successfully", flush=True)
-        
-        # Convert base64 data URL to bytes for email attachment
-        import base64
-        import re
-        # Extract base64 data from data URL (format: data:image/png;base64,...)
-        base64_data = re.sub('^data:image/.+;base64,', '', qr_code_base64)
-        qr_image_bytes = base64.b64decode(base64_data)
-        print(f"[EMAIL] QR code converted to bytes ({len(qr_image_bytes)} bytes)", flush=True)
+        qr_image_bytes = get_qr_image(registration.token, 'png')
     except Exception as e:
         import traceback
-        print(f"[EMAIL] ERROR in QR generation: {str(e)}", file=sys.stderr, flush=True)
+        print(f"[EMAIL] ERROR in QR generation for registration {registration.id}: {str(e)}", file=sys.stderr, flush=True)
         print(f"[EMAIL] Traceback: {traceback.format_exc()}", file=sys.stderr, flush=True)
-        return False
-
-    
-    # 2. Prepare Email Content
-    subject = f"🎟️ Your Ticket for {event.title} - ASTRA IETM"
-    
-    # Format date nicely
-    from django.utils.dateformat import format as date_format
-    event_date_formatted = date_format(event.event_date, 'l, F j, Y')
-    event_time_formatted = date_format(event.event_date, 'g:i A')
-    
-    # Team info if applicable
-    team_info = ""
-    if registration.team_name:
-        team_info = f"""
-        <div style="background-color: #EEF2FF; padding: 15px; border-radius: 8px; margin: 15px 0; border-left: 4px solid #6366F1;">
-            <p style="margin: 0; color: #4F46E5;"><strong>🏆 Team Name:</strong> {registration.team_name}</p>
-        </div>
-        """
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; background-color: #f5f5f5; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;">
-        <div style="max-width: 600px; margin: 40px auto; background-color: #ffffff; border-radius: 16px; overflow: hidden; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-            
-            <!-- Header -->
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 40px 30px; text-align: center;">
-                <h1 style="color: #ffffff; margin: 0; font-size: 28px; font-weight: 700; letter-spacing: -0.5px;">
-                    ✨ Registration Confirmed!
-                </h1>
-                <p style="color: rgba(255, 255, 255, 0.9); margin: 10px 0 0 0; font-size: 16px;">
-                    Your ticket is ready
-                </p>
-            </div>
-            
-            <!-- Content -->
-            <div style="padding: 40px 30px;">
-                <p style="color: #1f2937; font-size: 16px; line-height: 1.6; margin: 0 0 20px 0;">
-                    Hi <strong>{user.full_name or user.email}</strong>,
-                </p>
-                
-                <p style="color: #4b5563; font-size: 15px; line-height: 1.6; margin: 0 0 30px 0;">
-                    You're all set! Your registration for <strong style="color: #6366F1;">{event.title}</strong> has been confirmed.
-                </p>
-                
-                {team_info}
-                
-                <!-- Event Details Card -->
-                <div style="background-color: #f9fafb; border: 2px solid #e5e7eb; border-radius: 12px; padding: 25px; margin: 25px 0;">
-                    <h3 style="color: #111827; margin: 0 0 20px 0; font-size: 18px; font-weight: 600;">
-                        📅 Event Details
-                    </h3>
-                    
-                    <table style="width: 100%; border-collapse: collapse;">
-                        <tr>
-                            <td style="padding: 8px 0; color: #6b7280; font-size: 14px; width: 30%;">Date</td>
-                            <td style="padding: 8px 0; color: #111827; font-size: 14px; font-weight: 600;">{event_date_formatted}</td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 8px 0; color: #6b7280; font-size: 14px;">Time</td>
-                            <td style="padding: 8px 0; color: #111827; font-size: 14px; font-weight: 600;">{event_time_formatted}</td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 8px 0; color: #6b7280; font-size: 14px;">Venue</td>
-                            <td style="padding: 8px 0; color: #111827; font-size: 14px; font-weight: 600;">{event.venue}</td>
-                        </tr>
-                    </table>
-                </div>
-                
-                <!-- QR Code Ticket Section -->
-                <div style="background: linear-gradient(135deg, #f0f9ff 0%, #e0f2fe 100%); border-radius: 12px; padding: 30px; text-align: center; margin: 30px 0;">
-                    <h3 style="color: #0c4a6e; margin: 0 0 15px 0; font-size: 18px; font-weight: 600;">
-                        🎫 Your Entry Pass
-                    </h3>
-                    <p style="color: #075985; font-size: 14px; margin: 0 0 20px 0;">
-                        Show this QR code at the entrance (also attached as image)
-                    </p>
-                    <div style="background-color: #ffffff; display: inline-block; padding: 20px; border-radius: 12px; box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1);">
-                        <img src="cid:qr_ticket" alt="Event QR Code Ticket" style="width: 220px; height: 220px; display: block;" />
-                    </div>
-                    <p style="color: #64748b; font-size: 12px; margin: 15px 0 0 0; font-family: 'Courier New', monospace;">
-                        Token: {registration.token[:16]}...
-                    </p>
-                </div>
-                
-                <!-- Important Notice -->
-                <div style="background-color: #fef3c7; border-left: 4px solid #f59e0b; padding: 15px; border-radius: 6px; margin: 25px 0;">
-                    <p style="color: #92400e; font-size: 13px; margin: 0; line-height: 1.5;">
-                        <strong>⚠️ Important:</strong> Please arrive 15 minutes early and bring a valid ID. Download the attached QR code or take a screenshot for entry.
-                    </p>
-                </div>
-                
-                <!-- CTA Button -->
-                <div style="text-align: center; margin: 30px 0;">
-                    <a href="https://astraietm.in/events/{event.id}" style="display: inline-block; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: #ffffff; text-decoration: none; padding: 14px 32px; border-radius: 8px; font-weight: 600; font-size: 15px; box-shadow: 0 4px 6px rgba(102, 126, 234, 0.3);">
-                        View Event Details
-                    </a>
-                </div>
-                
-                <p style="color: #6b7280; font-size: 14px; line-height: 1.6; margin: 30px 0 0 0;">
-                    Questions? Contact us at <a href="mailto:support@astraietm.in" style="color: #6366F1; text-decoration: none;">support@astraietm.in</a>
-                </p>
-            </div>
-            
-            <!-- Footer -->
-            <div style="background-color: #f9fafb; padding: 25px 30px; text-align: center; border-top: 1px solid #e5e7eb;">
-                <p style="color: #9ca3af; font-size: 13px; margin: 0 0 8px 0;">
-                    ASTRA - Indian Institute of Engineering Science and Technology
-                </p>
-                <p style="color: #9ca3af; font-size: 12px; margin: 0;">
-                    © 2026 ASTRA IETM. All rights reserved.
-                </p>
-            </div>
-            
-        </div>
-    </body>
-    </html>
-    """
-    text_content = strip_tags(html_content)
-    
-    # 3. Create Email Message
-    print(f"[EMAIL] Creating email message...", flush=True)
+        return None
+
+    subject, text_content, html_content = render_ticket_email(registration)
     email = EmailMultiAlternatives(
         subject,
         text_content,
@@ -222,34 +193,97 @@ def send_registration_email(registration):
         [user.email],
     )
     email.attach_alternative(html_content, "text/html")
-    print(f"[EMAIL] Email message created with HTML content", flush=True)
-    
-    # 4. Attach QR Code (both inline for email body and as downloadable attachment)
-    try:
-        # Inline for email body display
-        print(f"[EMAIL] Attaching QR code inline...", flush=True)
-        qr_inline = MIMEImage(qr_image_bytes)
-        qr_inline.add_header('Content-ID', '<qr_ticket>')
-        qr_inline.add_header('Content-Disposition', 'inline', filename='qr_code.png')
-        email.attach(qr_inline)
-        
-        # Also attach as separate downloadable file
-        print(f"[EMAIL] Attaching QR code as file...", flush=True)
-        email.attach(
-            f'ASTRA_Ticket_{event.title.replace(" ", "_")}_{registration.token[:8]}.png',
-            qr_image_bytes,
-            'image/png'
+
+    # QR code both inline for the HTML body and as a downloadable file
+    qr_inline = MIMEImage(qr_image_bytes)
+    qr_inline.add_header('Content-ID', f'<{QR_CID}>')
+    qr_inline.add_header('Content-Disposition', 'inline', filename='qr_code.png')
+    email.attach(qr_inline)
+    email.attach(
+        f'ASTRA_Ticket_{event.title.replace(" ", "_")}_{registration.token[:8]}.png',
+        qr_image_bytes,
+        'image/png'
+    )
+    return email
+
+
+TICKET_EMAIL_KIND = 'events.ticket'
+
+
+def send_registration_email(registration):
+    """
+    Queues the confirmation email with QR code ticket in the outbox, in the
+    caller's transaction. The ticket is rendered when the worker sends it.
+    """
+    enqueue(
+        to=[registration.user.email],
+        subject=f"Ticket for {registration.event.title}",
+        kind=TICKET_EMAIL_KIND,
+        object_id=registration.pk,
+        priority=PRIORITY_TRANSACTIONAL,
+    )
+    return True
+
+
+def send_registration_emails(registrations, priority=PRIORITY_TRANSACTIONAL, batch=''):
+    """Queue ticket emails for many registrations with one insert."""
+    enqueue_many([
+        OutboxMessage(
+            to=[registration.user.email],
+            subject=f"Ticket for {registration.event.title}",
+            kind=TICKET_EMAIL_KIND,
+            object_id=registration.pk,
+            priority=priority,
+            batch=batch,
         )
-        print(f"[EMAIL] Attachments added successfully", flush=True)
-    except Exception as e:
-        import traceback
-        print(f"[EMAIL] ERROR attaching files: {str(e)}", file=sys.stderr, flush=True)
-        print(f"[EMAIL] Traceback: {traceback.format_exc()}", file=sys.stderr, flush=True)
-        return False
-    
-    # 5. Send in Background Thread
-    print(f"[EMAIL] Spawning background thread for sending...", flush=True)
-    EmailThread = threading.Thread(target=send_email_thread, args=(email,))
-    EmailThread.start()
-    
+        for registration in registrations
+    ])
+
+
+def resend_registration_emails(registrations):
+    """
+    Queue ticket emails again for many registrations as one outbox batch and
+    return its id. After commit the QR images are rendered ahead of the
+    outbox in the rendering pool, so sending does not wait on them.
+    """
+    from .rendering import prerender_on_commit
+    registrations = list(registrations)
+    batch = uuid.uuid4().hex
+    with transaction.atomic():
+        send_registration_emails(registrations, priority=PRIORITY_DEFAULT, batch=batch)
+        prerender_on_commit(registration.token for registration in registrations)
+    return batch, len(registrations)
+
+
+def build_ticket_email(message):
+    """Outbox builder for a queued ticket email; None if the registration is gone."""
+    from .models import Registration
+    registration = Registration.objects.select_related('user', 'event').filter(pk=message.object_id).first()
+    if registration is None:
+        return None  # registration deleted since; nothing to send
+    email = build_registration_email(registration)
+    if email is None:
+        raise RuntimeError(f"Could not render ticket for registration {registration.pk}")
+    return email
+
+
+register_builder(TICKET_EMAIL_KIND, build_ticket_email)
+
+
+def send_waitlist_promotion_email(registration):
+    """
+    Tells a waitlisted user of a paid event that a seat is being held for
+    them and that they need to complete payment to keep it.
+    """
+    user = registration.user
+    event = registration.event
+    subject = f"A seat opened up for {event.title} - ASTRA IETM"
+    body = (
+        f"Hi {user.full_name or user.email},\n\n"
+        f"A seat for {event.title} has been released and is now held for you "
+        f"for {settings.SEAT_HOLD_MINUTES} minutes.\n"
+        f"Complete your payment to confirm it: https://astraietm.in/events/{event.id}\n\n"
+        f"ASTRA IETM"
+    )
+    enqueue(to=[user.email], subject=subject, body=body, priority=PRIORITY_TRANSACTIONAL)
     return True
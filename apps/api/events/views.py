@@ -1,20 +1,38 @@
 from rest_framework import status, generics, permissions, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+import csv
+from pathlib import Path
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.views.decorators.http import require_safe
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from .models import Registration, Event
-from .serializers import RegistrationSerializer, EventSerializer
-from .utils import send_registration_email
+from django.utils.dateparse import parse_datetime
+from .models import Registration, Event, WaitlistEntry
+from .serializers import RegistrationSerializer, EventSerializer, WaitlistEntrySerializer, ScanBatchSerializer
+from .utils import send_registration_email, peek_qr_image, get_qr_image
+from .cache import CachedCatalogMixin
+from .importer import import_registrations, parse_csv, MAX_ROWS as IMPORT_MAX_ROWS
+from .export import export_queryset, export_response, FORMATS as EXPORT_FORMATS
+from core.pagination import cursor_pagination
+from .seats import reserve_seat, confirm_seat, release_seat, release_expired_holds
+from .scanner import build_bundle, apply_scans, public_key_info
+from .rendering import prerender_on_commit
+from .tickets import ticket_filter, plausible_tokens, canonical_token, reissued_tokens
+from .waitlist import join_waitlist, leave_waitlist, DETAIL_FIELDS as WAITLIST_DETAIL_FIELDS
+from django.db import transaction
 from django.db.models import Q
 
-class EventListView(generics.ListAPIView):
-    queryset = Event.objects.all()
+class EventListView(CachedCatalogMixin, generics.ListAPIView):
+    queryset = Event.objects.with_registration_count()
     serializer_class = EventSerializer
     permission_classes = [permissions.AllowAny] # Public
+    pagination_class = cursor_pagination('id')
 
-class EventDetailView(generics.RetrieveAPIView):
-    queryset = Event.objects.all()
+class EventDetailView(CachedCatalogMixin, generics.RetrieveAPIView):
+    queryset = Event.objects.with_registration_count()
     serializer_class = EventSerializer
     permission_classes = [permissions.AllowAny] # Public details
 
@@ -46,10 +64,11 @@ class RegistrationCreateView(generics.CreateAPIView):
         if updated:
             self.request.user.save()
         
-        # Automatically set user from JWT
-        instance = serializer.save(user=self.request.user)
-        # Send registration email with ticket
+        # Automatically set user from JWT; the seat was reserved in create()
+        instance = serializer.save(user=self.request.user, seat_state='CONFIRMED')
+        # Queue the ticket email in the same transaction as the seat
         send_registration_email(instance)
+        prerender_on_commit([instance.token])
 
     def create(self, request, *args, **kwargs):
         event_id = request.data.get('event')
@@ -69,17 +88,24 @@ class RegistrationCreateView(generics.CreateAPIView):
         if now > event.registration_end:
              return Response({"error": "Registration deadline has passed."}, status=status.HTTP_400_BAD_REQUEST)
 
-        current_count = event.registrations.count()
-        if current_count >= event.registration_limit:
-             return Response({"error": "Event is fully booked."}, status=status.HTTP_400_BAD_REQUEST)
-
         # Check if already registered
         if Registration.objects.filter(user=request.user, event_id=event_id).exists():
              return Response(
                  {"error": "You are already registered for this event."},
                  status=status.HTTP_400_BAD_REQUEST
              )
-        return super().create(request, *args, **kwargs)
+
+        # Claim the seat and insert in one transaction so a failed insert frees it
+        with transaction.atomic():
+            if reserve_seat(event):
+                return super().create(request, *args, **kwargs)
+
+        # Abandoned checkouts go back to the waitlist, not to whoever asks next
+        release_expired_holds(event_ids=[event.pk])
+        return Response(
+            {"error": "Event is fully booked.", "waitlist_available": True},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
 class MyRegistrationsView(generics.ListAPIView):
     serializer_class = RegistrationSerializer
@@ -90,7 +116,132 @@ class MyRegistrationsView(generics.ListAPIView):
         return Registration.objects.filter(user=self.request.user).filter(
             Q(event__requires_payment=False) | 
             Q(payment__status='SUCCESS')
-        ).order_by('-timestamp')
+        ).select_related('user', 'event', 'payment').order_by('-timestamp')
+
+class RegistrationCancelView(APIView):
+    """Cancel your own registration and hand the seat to the waitlist"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        registration = get_object_or_404(Registration, pk=pk, user=request.user)
+
+        if registration.status == 'ATTENDED':
+            return Response({"error": "Attended registrations cannot be cancelled."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if registration.status != 'CANCELLED':
+            registration.status = 'CANCELLED'
+            registration.save(update_fields=['status', 'updated_at'])
+            release_seat(registration)
+
+        return Response({"message": "Registration cancelled."}, status=status.HTTP_200_OK)
+
+class WaitlistView(APIView):
+    """Join, inspect or leave an event's waitlist"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        entry = get_object_or_404(WaitlistEntry.objects.select_related('event'), event_id=pk, user=request.user)
+        return Response(WaitlistEntrySerializer(entry).data)
+
+    def post(self, request, pk):
+        event = get_object_or_404(Event, pk=pk)
+
+        if Registration.objects.filter(user=request.user, event=event).exclude(seat_state='NONE').exists():
+            return Response({"error": "You are already registered for this event."}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = WaitlistEntry.objects.select_related('event')
+        entry = entries.filter(event=event, user=request.user, status='WAITING').first()
+        if entry is not None:
+            # Rejoining would lose the user's place in line
+            return Response(WaitlistEntrySerializer(entry).data, status=status.HTTP_200_OK)
+
+        details = {name: request.data.get(name, '') for name in WAITLIST_DETAIL_FIELDS}
+        entry = entries.get(pk=join_waitlist(event, request.user, **details).pk)
+        return Response(WaitlistEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, pk):
+        leave_waitlist(pk, request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class RegistrationQRView(APIView):
+    """Ticket QR image for a token, served from the memory/disk QR cache"""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+    def get(self, request, token, fmt):
+        data = peek_qr_image(token, fmt)
+        if data is None:
+            # Only render for real tickets so junk tokens can't fill the cache
+            lookup = ticket_filter(token)
+            if lookup is None or not Registration.objects.filter(lookup).exists():
+                raise Http404
+            data = get_qr_image(token, fmt)
+
+        response = HttpResponse(data, content_type=self.CONTENT_TYPES[fmt])
+        # The image is a pure function of the token
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+@require_safe
+def ticket_image(request, shard, digest, fmt):
+    """
+    A stored ticket image (see ticket_image_url), served like a static file:
+    no database query, and cached for good since the name is a content hash.
+    """
+    if digest[:2] != shard:
+        raise Http404
+    try:
+        response = FileResponse(open(Path(settings.QR_CACHE_DIR) / shard / f"{digest}.{fmt}", 'rb'),
+                                content_type=RegistrationQRView.CONTENT_TYPES[fmt])
+    except FileNotFoundError:
+        raise Http404
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# Columns needed to answer a scan, fetched in one joined query
+REGISTRANT_FIELDS = (
+    'id', 'token', 'status', 'is_used', 'seat_state', 'timestamp', 'team_name', 'team_members', 'phone_number',
+    'user__email', 'user__full_name', 'user__phone_number',
+    'event_id', 'event__title', 'event__venue', 'event__event_date',
+)
+
+INADMISSIBLE_MESSAGE = "Ticket is cancelled or its seat is not confirmed."
+
+def admissible(row):
+    """Whether a REGISTRANT_FIELDS row may be checked in, as in scanner.apply_scans"""
+    return row['seat_state'] == 'CONFIRMED' and row['status'] != 'CANCELLED'
+
+def admissible_tickets():
+    """Tickets a scan may still flip to ATTENDED"""
+    return Registration.objects.filter(seat_state='CONFIRMED', is_used=False).exclude(status__in=['ATTENDED', 'CANCELLED'])
+
+def registrant_payload(row, status=None):
+    """Scanner view of a registration, built from a REGISTRANT_FIELDS row"""
+    return {
+        'id': row['id'],
+        'token': row['token'],
+        'status': status or row['status'],
+        'timestamp': row['timestamp'],
+        'team_name': row['team_name'],
+        'team_members': row['team_members'],
+        'phone_number': row['phone_number'],
+        'user_email': row['user__email'],
+        'user_name': row['user__full_name'],
+        'user_details': {
+            'email': row['user__email'],
+            'full_name': row['user__full_name'],
+            'phone_number': row['user__phone_number'],
+        },
+        'event': row['event_id'],
+        'event_details': {
+            'id': row['event_id'],
+            'title': row['event__title'],
+            'venue': row['event__venue'],
+            'event_date': row['event__event_date'],
+        },
+    }
 
 class VerifyTokenView(APIView):
     # Depending on requirements, this might need Admin permission
@@ -98,39 +249,196 @@ class VerifyTokenView(APIView):
     # But for simplicity or if the scanner app just has the link, we can keep it open or require Admin.
     # Let's keep it AllowAny for now for easy testing, but in production, we'd use IsAdminUser.
     permission_classes = [permissions.AllowAny] 
+    authentication_classes = [] # No user lookup on the door-scan path
 
     def get(self, request, token):
-        registration = get_object_or_404(Registration, token=token)
-        
+        # Forged tokens fail the signature check before any query
+        lookup = ticket_filter(token)
+        if lookup is None:
+            raise Http404
+        row = Registration.objects.filter(lookup).values(*REGISTRANT_FIELDS).first()
+        if row is None:
+            raise Http404
+
+        # Cancelled tickets, and tickets whose seat isn't confirmed, never get in
+        if not admissible(row):
+            return Response({
+                "valid": False,
+                "message": INADMISSIBLE_MESSAGE,
+                "registrant": registrant_payload(row)
+            }, status=status.HTTP_200_OK)
+
         # Check status or is_used
-        if registration.status == 'ATTENDED' or registration.is_used:
+        already_used = row['status'] == 'ATTENDED' or row['is_used']
+        if not already_used:
+            # Compare-and-set: only one concurrent scan can flip the row
+            won = admissible_tickets().filter(pk=row['id']).update(
+                status='ATTENDED', is_used=True, updated_at=timezone.now()
+            )
+            already_used = not won
+
+        if already_used:
             return Response({
                 "valid": False,
                 "message": "QR Code has already been used.",
-                "registrant": RegistrationSerializer(registration).data
+                "registrant": registrant_payload(row, status='ATTENDED')
             }, status=status.HTTP_200_OK) # Return 200 so frontend scanner handles it gracefully
-        
-        # Mark as attended
-        registration.status = 'ATTENDED'
-        registration.is_used = True
-        registration.save()
-        
+
         return Response({
             "valid": True,
             "message": "Verification successful! Access Granted.",
-            "registrant": RegistrationSerializer(registration).data
+            "registrant": registrant_payload(row, status='ATTENDED')
+        }, status=status.HTTP_200_OK)
+
+class VerifyTokenBatchView(APIView):
+    """Verify a whole team's tickets in one request, with VerifyTokenView semantics"""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    MAX_TOKENS = 500
+
+    def post(self, request):
+        tokens = request.data.get('tokens')
+        if not isinstance(tokens, list) or not tokens or not all(isinstance(t, str) for t in tokens):
+            return Response({"error": "'tokens' must be a non-empty list of strings."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(tokens) > self.MAX_TOKENS:
+            return Response({"error": f"At most {self.MAX_TOKENS} tokens per batch."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Compact QR codes stand for their signed token, reissued tickets for their new one
+        canonical = {token: canonical_token(token) for token in tokens}
+        reissued = reissued_tokens(canonical.values())
+        canonical = {token: reissued.get(current, current) for token, current in canonical.items()}
+
+        with transaction.atomic():
+            # Lock the tickets so a concurrent scan waits for this batch
+            rows = {
+                row['token']: row
+                for row in Registration.objects.select_for_update(of=('self',))
+                .filter(token__in=set(plausible_tokens(canonical.values())))
+                .values(*REGISTRANT_FIELDS)
+            }
+            fresh = {
+                row['id'] for row in rows.values()
+                if admissible(row) and row['status'] != 'ATTENDED' and not row['is_used']
+            }
+            if fresh:
+                admissible_tickets().filter(pk__in=fresh).update(
+                    status='ATTENDED', is_used=True, updated_at=timezone.now()
+                )
+
+        results = []
+        seen = set()
+        for token in tokens:
+            row = rows.get(canonical[token])
+            if row is None:
+                results.append({"token": token, "valid": False, "message": "Invalid QR Code.", "registrant": None})
+                continue
+            if not admissible(row):
+                results.append({"token": token, "valid": False, "message": INADMISSIBLE_MESSAGE, "registrant": registrant_payload(row)})
+                continue
+            # A repeated token in the batch counts as a second scan
+            valid = row['id'] in fresh and row['id'] not in seen
+            seen.add(row['id'])
+            results.append({
+                "token": token,
+                "valid": valid,
+                "message": "Verification successful! Access Granted." if valid else "QR Code has already been used.",
+                "registrant": registrant_payload(row, status='ATTENDED'),
+            })
+
+        return Response({
+            "results": results,
+            "admitted": sum(1 for r in results if r['valid']),
         }, status=status.HTTP_200_OK)
 
 class AdminRegistrationsView(generics.ListAPIView):
-    queryset = Registration.objects.all().order_by('-timestamp')
+    queryset = Registration.objects.select_related('user', 'event', 'payment').order_by('-timestamp')
     serializer_class = RegistrationSerializer
+    pagination_class = cursor_pagination('-timestamp', '-id')
     permission_classes = [permissions.IsAdminUser] # Restrict to staff/admins
 
+class RegistrationExportView(APIView):
+    """Stream registrations as CSV, NDJSON or a ZIP of ticket images (?fmt=), filterable by ?event= and ?status="""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        fmt = request.query_params.get('fmt', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return Response({"error": f"fmt must be one of: {', '.join(EXPORT_FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        reg_status = request.query_params.get('status')
+        if reg_status is not None and reg_status not in dict(Registration.STATUS_CHOICES):
+            return Response({"error": "Unknown registration status."}, status=status.HTTP_400_BAD_REQUEST)
+        event_id = request.query_params.get('event')
+        if event_id is not None and not event_id.isdigit():
+            return Response({"error": "event must be an event ID."}, status=status.HTTP_400_BAD_REQUEST)
+
+        filename = f"registrations-event-{event_id}" if event_id else "registrations"
+        return export_response(export_queryset(event_id=event_id, status=reg_status), fmt, filename)
+
+class RegistrationImportView(APIView):
+    """
+    Bulk-register walk-ins from a CSV upload ('file') or JSON ('rows').
+    Columns: email, event (or a default 'event' field), full_name,
+    phone_number, college, department, year_of_study, team_name, team_members.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        try:
+            rows = parse_csv(upload) if upload else request.data.get('rows')
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({"error": f"Could not read CSV: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+            return Response({"error": "Provide a CSV 'file' or a non-empty 'rows' list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > IMPORT_MAX_ROWS:
+            return Response({"error": f"At most {IMPORT_MAX_ROWS} rows per import."}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = import_registrations(
+            rows,
+            event_id=request.data.get('event'),
+            send_emails=str(request.data.get('send_emails', 'true')).lower() not in ('false', '0'),
+            dry_run=str(request.data.get('dry_run', 'false')).lower() in ('true', '1'),
+        )
+        return Response(report, status=status.HTTP_200_OK)
+
 class AdminEventViewSet(viewsets.ModelViewSet):
-    queryset = Event.objects.all().order_by('-created_at')
+    queryset = Event.objects.with_registration_count().order_by('-created_at')
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAdminUser]
 
+    @action(detail=False, methods=['get'], url_path='scanner-key')
+    def scanner_key(self, request):
+        """Public key offline scanners use to check bundle signatures"""
+        info = public_key_info()
+        if info is None:
+            return Response({"error": "Scanner bundles are not signed on this server."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(info)
+
+    @action(detail=True, methods=['get'], url_path='scanner-bundle')
+    def scanner_bundle(self, request, pk=None):
+        """Ticket manifest (signed, if a key is set) for offline scanners; ?since=<cursor> for a delta"""
+        event = get_object_or_404(Event, pk=pk)
+        since = request.query_params.get('since')
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                return Response({"error": "Invalid 'since' cursor."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(build_bundle(event, since=since or None))
+
+    @action(detail=True, methods=['post'], url_path='scanner-sync')
+    def scanner_sync(self, request, pk=None):
+        """Apply scans queued by an offline scanner and report conflicts"""
+        event = get_object_or_404(Event, pk=pk)
+        serializer = ScanBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_scans(event, serializer.validated_data['device_id'], serializer.validated_data['scans'])
+        return Response({
+            "results": results,
+            "accepted": sum(1 for r in results if r['result'] == 'ACCEPTED' and not r['replayed']),
+            "conflicts": [r for r in results if r['result'] == 'CONFLICT'],
+        }, status=status.HTTP_200_OK)
+
 # Payment Views
 import razorpay
 from django.conf import settings
@@ -164,6 +472,7 @@ class CreatePaymentOrderView(APIView):
             return Response({"error": "This event does not require payment."}, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if already registered
+        registration = None
         existing_reg = Registration.objects.filter(user=request.user, event=event).first()
         if existing_reg:
             # If payment exists and is SUCCESS, then it's a real duplicate
@@ -175,8 +484,13 @@ class CreatePaymentOrderView(APIView):
                 return Response({"error": "You are already registered for this event."}, status=status.HTTP_400_BAD_REQUEST)
 
             # Otherwise, it's a failed/abandoned payment attempt.
-            # Clean it up so we can create a fresh order.
-            existing_reg.delete()
+            if existing_reg.seat_state == 'HELD':
+                # Seat still held (earlier attempt or waitlist promotion): retry payment on it
+                registration = existing_reg
+                Payment.objects.filter(registration=registration).delete()
+            else:
+                # Clean it up so we can create a fresh order.
+                existing_reg.delete()
         
         # Validate registration rules (same as RegistrationCreateView)
         if not event.is_registration_open:
@@ -189,27 +503,40 @@ class CreatePaymentOrderView(APIView):
         if now > event.registration_end:
             return Response({"error": "Registration deadline has passed."}, status=status.HTTP_400_BAD_REQUEST)
         
-        current_count = event.registrations.count()
-        if current_count >= event.registration_limit:
-            return Response({"error": "Event is fully booked."}, status=status.HTTP_400_BAD_REQUEST)
-        
         # Create registration (pending payment)
         phone_number = request.data.get('phone_number', '')
         college = request.data.get('college', '')
         department = request.data.get('department', '')
         year_of_study = request.data.get('year_of_study', '')
         
-        registration = Registration.objects.create(
-            user=request.user,
-            event=event,
-            team_name=team_name,
-            team_members=team_members,
-            phone_number=phone_number,
-            college=college,
-            department=department,
-            year_of_study=year_of_study,
-            status='PENDING'  # Will be confirmed after payment
-        )
+        if registration is not None:
+            # Refresh the details; saving also restarts the hold timer
+            registration.team_name = team_name
+            registration.team_members = team_members
+            registration.phone_number = phone_number
+            registration.college = college
+            registration.department = department
+            registration.year_of_study = year_of_study
+            registration.save(update_fields=['team_name', 'team_members', 'phone_number', 'college', 'department', 'year_of_study', 'updated_at'])
+        else:
+            # Hold a seat for the duration of the payment
+            with transaction.atomic():
+                if reserve_seat(event, hold=True):
+                    registration = Registration.objects.create(
+                        user=request.user,
+                        event=event,
+                        team_name=team_name,
+                        team_members=team_members,
+                        phone_number=phone_number,
+                        college=college,
+                        department=department,
+                        year_of_study=year_of_study,
+                        status='PENDING',  # Will be confirmed after payment
+                        seat_state='HELD'
+                    )
+            if registration is None:
+                release_expired_holds(event_ids=[event.pk])
+                return Response({"error": "Event is fully booked.", "waitlist_available": True}, status=status.HTTP_400_BAD_REQUEST)
         
         # Create Razorpay order
         try:
@@ -251,7 +578,7 @@ class CreatePaymentOrderView(APIView):
             }, status=status.HTTP_201_CREATED)
             
         except Exception as e:
-            # Delete registration if order creation fails
+            # Delete registration if order creation fails (releases the hold)
             registration.delete()
             return Response({"error": f"Failed to create payment order: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -278,22 +605,25 @@ class VerifyPaymentView(APIView):
             ).hexdigest()
             
             if generated_signature == razorpay_signature:
-                # Payment successful
-                payment.razorpay_payment_id = razorpay_payment_id
-                payment.razorpay_signature = razorpay_signature
-                payment.status = 'SUCCESS'
-                payment.save()
-                
-                # Update registration status
-                registration = payment.registration
-                registration.status = 'REGISTERED'
-                registration.save()
-                
-                # Send registration email with ticket
-                send_registration_email(registration)
+                # Payment, seat and ticket email commit together
+                with transaction.atomic():
+                    # Payment successful
+                    payment.razorpay_payment_id = razorpay_payment_id
+                    payment.razorpay_signature = razorpay_signature
+                    payment.status = 'SUCCESS'
+                    payment.save()
+                    
+                    # Update registration status
+                    registration = payment.registration
+                    registration.status = 'REGISTERED'
+                    registration.save(update_fields=['status', 'updated_at'])
+                    confirm_seat(registration)
+                    
+                    # Queue registration email with ticket
+                    send_registration_email(registration)
                 
                 # Return registration data with QR code
-                serializer = RegistrationSerializer(registration)
+                serializer = RegistrationSerializer(registration, context={'request': request})
                 return Response({
                     'success': True,
                     'message': 'Payment verified successfully!',
@@ -302,6 +632,7 @@ class VerifyPaymentView(APIView):
             else:
                 payment.status = 'FAILED'
                 payment.save()
+                release_seat(payment.registration)
                 return Response({"error": "Payment verification failed. Invalid signature."}, status=status.HTTP_400_BAD_REQUEST)
                 
         except Payment.DoesNotExist:
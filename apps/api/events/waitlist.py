@@ -0,0 +1,127 @@
+"""
+Event waitlist.
+
+Joining hands out the next ticket number from Event.waitlist_tail. Promotion
+moves Event.waitlist_head forward, so a user's place in line is a simple
+subtraction rather than a COUNT over the queue.
+"""
+import secrets
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .cache import bump_catalog_version_on_commit
+from .models import Event, Registration, WaitlistEntry
+from .rendering import prerender_on_commit
+from .tickets import assign_ticket_tokens
+from .utils import send_registration_email, send_waitlist_promotion_email
+
+DETAIL_FIELDS = ('team_name', 'team_members', 'phone_number', 'college', 'department', 'year_of_study')
+
+
+def join_waitlist(event, user, **details):
+    """Put the user at the back of the event's waitlist and return the entry."""
+    details = {k: v for k, v in details.items() if k in DETAIL_FIELDS}
+    with transaction.atomic():
+        Event.objects.filter(pk=event.pk).update(waitlist_tail=F('waitlist_tail') + 1)
+        sequence = Event.objects.values_list('waitlist_tail', flat=True).get(pk=event.pk)
+        entry, _ = WaitlistEntry.objects.update_or_create(
+            user=user,
+            event=event,
+            defaults={'sequence': sequence, 'status': 'WAITING', 'promoted_at': None, **details},
+        )
+        # A seat may have freed up between the "fully booked" answer and now
+        transaction.on_commit(lambda: promote_waitlist(event.pk))
+    return entry
+
+
+def leave_waitlist(event, user):
+    return WaitlistEntry.objects.filter(event=event, user=user, status='WAITING').update(status='LEFT')
+
+
+def promote_waitlist(event_id):
+    """
+    Fill every free seat of the event from the front of the waitlist in one
+    transaction: one bulk insert of registrations (plus one bulk update for
+    users re-admitted after cancelling), one update of the entries and one
+    update of the event counters. Returns the promoted registrations.
+    """
+    with transaction.atomic():
+        event = Event.objects.select_for_update().filter(pk=event_id).first()
+        if event is None:
+            return []
+        free = event.registration_limit - event.seats_confirmed - event.seats_held
+        if free <= 0:
+            return []
+
+        # Same rule as joining: only a registration that holds a seat keeps a
+        # user off the waitlist
+        seated = Registration.objects.filter(event=event).exclude(seat_state='NONE').values('user')
+        entries = list(
+            event.waitlist_entries.filter(status='WAITING')
+            .exclude(user__in=seated)
+            .select_related('user')
+            .order_by('sequence')[:free]
+        )
+        if not entries:
+            return []
+
+        # Paid events get a payment hold; free events get the seat outright
+        seat_state = 'HELD' if event.requires_payment else 'CONFIRMED'
+        field = 'seats_held' if event.requires_payment else 'seats_confirmed'
+
+        # Users who cancelled or let a hold lapse get their old registration back
+        stale = {
+            registration.user_id: registration
+            for registration in Registration.objects.filter(event=event, user__in=[entry.user_id for entry in entries])
+        }
+        now = timezone.now()
+        reused = []
+        for entry in entries:
+            registration = stale.get(entry.user_id)
+            if registration is None:
+                continue
+            registration.status = 'PENDING'
+            registration.seat_state = seat_state
+            registration.updated_at = now  # bulk_update skips auto_now
+            for name in DETAIL_FIELDS:
+                setattr(registration, name, getattr(entry, name))
+            reused.append(registration)
+        Registration.objects.bulk_update(reused, ['status', 'seat_state', 'updated_at', *DETAIL_FIELDS])
+
+        created = Registration.objects.bulk_create([
+            Registration(
+                user=entry.user,
+                event=event,
+                token=secrets.token_urlsafe(32),  # placeholder until the pk is known
+                status='PENDING',
+                seat_state=seat_state,
+                **{name: getattr(entry, name) for name in DETAIL_FIELDS},
+            )
+            for entry in entries
+            if entry.user_id not in stale
+        ])
+        assign_ticket_tokens(created)
+        registrations = reused + created
+        Event.objects.filter(pk=event.pk).update(
+            **{field: F(field) + len(registrations)},
+            waitlist_head=entries[-1].sequence,
+        )
+        WaitlistEntry.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+            status='PROMOTED',
+            promoted_at=timezone.now(),
+        )
+
+        _notify_promoted(event, registrations)
+        bump_catalog_version_on_commit()
+    return registrations
+
+
+def _notify_promoted(event, registrations):
+    # Queued in the outbox inside the promotion transaction
+    for registration in registrations:
+        if event.requires_payment:
+            send_waitlist_promotion_email(registration)
+        else:
+            send_registration_email(registration)
+    if not event.requires_payment:
+        prerender_on_commit(registration.token for registration in registrations)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='galleryitem',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -13,7 +13,7 @@ class GalleryItem(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='other')
     image_url = models.URLField(max_length=500)
     public_id = models.CharField(max_length=200, blank=True, null=True) # For Cloudinary management
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return self.title
@@ -1,10 +1,12 @@
 from rest_framework import generics, permissions
 from .models import GalleryItem
 from .serializers import GalleryItemSerializer
+from core.pagination import cursor_pagination
 
 class GalleryItemListCreateView(generics.ListCreateAPIView):
     queryset = GalleryItem.objects.all()
     serializer_class = GalleryItemSerializer
+    pagination_class = cursor_pagination('-created_at', '-id')
     
     def get_permissions(self):
         if self.request.method == 'POST':
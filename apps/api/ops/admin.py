@@ -1,3 +1,19 @@
 from django.contrib import admin
+from django.utils import timezone
+from .models import OutboxMessage
 
-# Register your models here.
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    # Status counts double as progress for a batch (?batch=<id>)
+    show_facets = admin.ShowFacets.ALWAYS
+    search_fields = ('subject', 'to', 'last_error', 'batch')
+    readonly_fields = ('batch', 'claim', 'lease_expires_at', 'created_at', 'sent_at')
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status='SENT').update(status='PENDING', next_attempt_at=timezone.now(), lease_expires_at=None)
+        self.message_user(request, f"Re-queued {count} messages.")
+    retry_now.short_description = "Retry selected messages now"
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class OpsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ops'
+
+    def ready(self):
+        from . import notifications  # noqa: F401  registers the blast outbox builder
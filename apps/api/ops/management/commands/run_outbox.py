@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+from ops.notifications import resume_blasts
+from ops.outbox import drain
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails in batches over reused SMTP connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain what is due now and exit')
+        parser.add_argument('--batch-size', type=int, default=None, help='Messages per batch (default OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait when the outbox is empty')
+
+    def handle(self, *args, **options):
+        total = 0
+        self.stdout.write("Outbox worker started.")
+        try:
+            while True:
+                try:
+                    resume_blasts()
+                    claimed, sent = drain(options['batch_size'])
+                except DatabaseError as e:
+                    self.stderr.write(f"Database error, retrying: {e}")
+                    close_old_connections()
+                    claimed, sent = 0, 0
+                total += sent
+                if not claimed:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Sent {total} emails."))
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0002_alter_auditlog_timestamp_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(default='mail', max_length=50)),
+                ('object_id', models.BigIntegerField(blank=True, null=True)),
+                ('to', models.JSONField(blank=True, default=list)),
+                ('bcc', models.JSONField(blank=True, default=list)),
+                ('subject', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('html_body', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SENDING', 'Sending'), ('SENT', 'Sent'), ('FAILED', 'Failed'), ('CANCELLED', 'Cancelled')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claim', models.CharField(blank=True, max_length=32)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='ops_outboxm_status_918107_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+def mark_existing_done(apps, schema_editor):
+    # Blasts from before progress tracking were already sent synchronously
+    apps.get_model('ops', 'Notification').objects.update(status='DONE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0003_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='failed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='fanout_cursor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='fanout_lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='last_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='sent_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='status',
+            field=models.CharField(choices=[('QUEUED', 'Queued'), ('SENDING', 'Sending'), ('DONE', 'Done')], default='QUEUED', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='total_recipients',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_existing_done, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0004_notification_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailRateBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('tokens', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('day', models.DateField(default=django.utils.timezone.localdate)),
+                ('sent_today', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='outboxmessage',
+            name='ops_outboxm_status_918107_idx',
+        ),
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=5),
+        ),
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['status', 'priority', 'next_attempt_at'], name='ops_outboxm_status_21d811_idx'),
+        ),
+    ]
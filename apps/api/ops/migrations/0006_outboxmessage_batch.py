@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0005_mail_rate_limit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='batch',
+            field=models.CharField(blank=True, db_index=True, help_text='Groups messages queued together, e.g. an admin resend', max_length=32),
+        ),
+    ]
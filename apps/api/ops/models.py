@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class AuditLog(models.Model):
     LEVEL_CHOICES = [
@@ -14,7 +15,7 @@ class AuditLog(models.Model):
     details = models.TextField(blank=True, null=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     level = models.CharField(max_length=10, choices=LEVEL_CHOICES, default='INFO')
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"{self.timestamp} - {self.action}"
@@ -38,9 +39,84 @@ class Notification(models.Model):
     subject = models.CharField(max_length=255)
     message = models.TextField()
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='NORMAL')
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),     # recipients still being fanned out
+        ('SENDING', 'Sending'),   # every message is in the outbox
+        ('DONE', 'Done'),
+    ]
+
     recipients_criteria = models.CharField(max_length=50) # e.g. "All Users", "Admins"
     sent_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    # Delivery progress, kept up to date by the outbox worker
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    total_recipients = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    last_sent_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    fanout_cursor = models.BigIntegerField(default=0)  # last user id queued
+    fanout_lease_expires_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.subject
+
+    @property
+    def throughput(self):
+        """Messages sent per second so far."""
+        if not (self.sent_count and self.started_at and self.last_sent_at):
+            return 0.0
+        elapsed = (self.last_sent_at - self.started_at).total_seconds()
+        return round(self.sent_count / elapsed, 2) if elapsed > 0 else float(self.sent_count)
+
+class OutboxMessage(models.Model):
+    """
+    An email waiting to be sent by the outbox worker. Plain messages carry
+    their content; other kinds (e.g. tickets) are built when sent by the
+    builder registered for `kind`, from `object_id`.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    kind = models.CharField(max_length=50, default='mail')
+    priority = models.PositiveSmallIntegerField(default=5)  # lower is sent first
+    object_id = models.BigIntegerField(null=True, blank=True)
+    batch = models.CharField(max_length=32, blank=True, db_index=True, help_text="Groups messages queued together, e.g. an admin resend")
+    to = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim = models.CharField(max_length=32, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'priority', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.kind} -> {', '.join(self.to) or 'bcc'} ({self.status})"
+
+
+class MailRateBucket(models.Model):
+    """Token bucket and daily budget shared by every process that sends mail."""
+    name = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    day = models.DateField(default=timezone.localdate)
+    sent_today = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.tokens:.1f} tokens, {self.sent_today} sent on {self.day}"
@@ -0,0 +1,143 @@
+"""
+Notification blasts.
+
+A blast is fanned out into one outbox message per recipient, so nobody sees
+anyone else's address and the worker sends them in batches over one SMTP
+connection. Recipients are streamed with .iterator() and queued in chunks;
+each chunk commits together with the blast's fan-out cursor, so an
+interrupted fan-out resumes where it stopped instead of starting again.
+Delivery progress is counted on the Notification row as the worker reports it.
+"""
+import sys
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection as db_connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from authentication.models import User
+from .models import Notification, OutboxMessage
+from .outbox import PRIORITY_BULK, enqueue_many, plain_email, register_builder
+
+NOTIFICATION_KIND = 'ops.notification'
+FANOUT_CHUNK_SIZE = 500
+FANOUT_LEASE_SECONDS = 120
+
+# Audience names used by the admin UI and by older API clients
+AUDIENCES = {
+    'All Registered Users': Q(),
+    'ALL_NODES': Q(),
+    'Admins Only': Q(is_staff=True),
+    'ADMIN_ROOT': Q(is_staff=True),
+}
+
+
+def recipients(criteria):
+    """Users a blast goes to, or None for an unknown audience."""
+    audience = AUDIENCES.get(criteria)
+    if audience is None:
+        return None
+    return User.objects.filter(audience, is_active=True).exclude(email='')
+
+
+def start_blast(notification):
+    """Fan the blast out after commit, off the request thread."""
+    if not settings.OUTBOX_DRAIN_IN_PROCESS:
+        return  # run_outbox picks queued blasts up
+    transaction.on_commit(lambda: threading.Thread(target=_fan_out_in_background, args=(notification.pk,), daemon=True).start())
+
+
+def _fan_out_in_background(notification_id):
+    try:
+        fan_out(notification_id)
+    except Exception as e:
+        print(f"[NOTIFY] Fan-out of notification {notification_id} stopped: {e}", file=sys.stderr, flush=True)
+    finally:
+        db_connection.close()
+
+
+def fan_out(notification_id, chunk_size=FANOUT_CHUNK_SIZE):
+    """
+    Queue one outbox message per recipient. Returns the number queued, or
+    None if another process holds this blast.
+    """
+    now = timezone.now()
+    claimed = Notification.objects.filter(
+        Q(fanout_lease_expires_at__isnull=True) | Q(fanout_lease_expires_at__lt=now),
+        pk=notification_id,
+        status='QUEUED',
+    ).update(fanout_lease_expires_at=now + timedelta(seconds=FANOUT_LEASE_SECONDS))
+    if not claimed:
+        return None
+    Notification.objects.filter(pk=notification_id, started_at__isnull=True).update(started_at=now)
+
+    notification = Notification.objects.get(pk=notification_id)
+    users = recipients(notification.recipients_criteria)
+    queued = 0
+    if users is not None:
+        chunk = []
+        rows = users.filter(pk__gt=notification.fanout_cursor).order_by('pk').values_list('pk', 'email')
+        for user_id, email in rows.iterator(chunk_size=chunk_size):
+            chunk.append((user_id, email))
+            if len(chunk) == chunk_size:
+                queued += _queue_chunk(notification, chunk)
+                chunk = []
+        if chunk:
+            queued += _queue_chunk(notification, chunk)
+
+    Notification.objects.filter(pk=notification_id).update(status='SENDING', fanout_lease_expires_at=None)
+    _finish_if_done(notification_id)
+    print(f"[NOTIFY] Queued {queued} messages for notification {notification_id}", flush=True)
+    return queued
+
+
+def _queue_chunk(notification, chunk):
+    with transaction.atomic():
+        enqueue_many([
+            OutboxMessage(
+                kind=NOTIFICATION_KIND,
+                priority=PRIORITY_BULK,
+                object_id=notification.pk,
+                to=[email],
+                subject=notification.subject,
+                body=notification.message,
+            )
+            for _, email in chunk
+        ])
+        Notification.objects.filter(pk=notification.pk).update(
+            fanout_cursor=chunk[-1][0],
+            total_recipients=F('total_recipients') + len(chunk),
+            fanout_lease_expires_at=timezone.now() + timedelta(seconds=FANOUT_LEASE_SECONDS),
+        )
+    return len(chunk)
+
+
+def resume_blasts():
+    """Fan out queued blasts nobody is working on (e.g. after a restart)."""
+    pending = Notification.objects.filter(status='QUEUED').filter(
+        Q(fanout_lease_expires_at__isnull=True) | Q(fanout_lease_expires_at__lt=timezone.now())
+    ).values_list('pk', flat=True)
+    for notification_id in list(pending):
+        fan_out(notification_id)
+
+
+def _record_progress(counts):
+    now = timezone.now()
+    for notification_id, (sent, failed) in counts.items():
+        Notification.objects.filter(pk=notification_id).update(
+            sent_count=F('sent_count') + sent,
+            failed_count=F('failed_count') + failed,
+            last_sent_at=now,
+        )
+        _finish_if_done(notification_id)
+
+
+def _finish_if_done(notification_id):
+    Notification.objects.filter(
+        pk=notification_id,
+        status='SENDING',
+        total_recipients__lte=F('sent_count') + F('failed_count'),
+    ).update(status='DONE', finished_at=timezone.now())
+
+
+register_builder(NOTIFICATION_KIND, plain_email, on_progress=_record_progress)
@@ -0,0 +1,303 @@
+"""
+Durable email outbox.
+
+enqueue() writes a row in the caller's transaction, so a message exists
+exactly when the registration or payment that caused it was committed.
+drain() claims due rows in batches, sends them over a few reused SMTP
+connections and records a status per message. Failures are retried with
+exponential backoff until OUTBOX_MAX_ATTEMPTS.
+
+Every send spends a token from the shared budget in ops/ratelimit.py, and
+claims go by priority, so ticket mail goes ahead of bulk notifications
+when the budget is tight.
+
+`manage.py run_outbox` drains in a loop. Web processes also drain after
+their own commits (OUTBOX_DRAIN_IN_PROCESS) so mail still goes out where no
+worker runs (as on the Render web service): the background drainer stays up
+until the outbox is empty, sleeping until the next retry or lease is due
+(or the send budget refills), and wakes early on the next commit. Rows claimed by a process that dies are
+picked up again when their lease expires.
+"""
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection as db_connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from .models import OutboxMessage
+from .ratelimit import give_back, next_token_in, take
+
+# Lower is sent first
+PRIORITY_TRANSACTIONAL = 0  # tickets, payment and waitlist mail
+PRIORITY_DEFAULT = 5
+PRIORITY_BULK = 9           # notification blasts
+
+# Longest pause waiting for send tokens before a drain gives up for now
+MAX_THROTTLE_WAIT = 2.0
+# Shortest sleep of the background drainer while mail is still queued
+IDLE_SECONDS = 5.0
+
+_builders = {}
+_progress = {}
+_drain_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def register_builder(kind, build, on_progress=None):
+    """
+    Register build(message) -> EmailMessage for messages of `kind`. Return
+    None when there is nothing to send any more (the message is cancelled).
+    After each batch, on_progress({object_id: (sent, failed)}) is called with
+    the messages of this kind that were sent or finally gave up.
+    """
+    _builders[kind] = build
+    if on_progress is not None:
+        _progress[kind] = on_progress
+
+
+def enqueue(to=None, subject='', body='', html_body='', bcc=None, kind='mail', object_id=None, priority=PRIORITY_DEFAULT):
+    """Queue one message in the current transaction."""
+    message = OutboxMessage.objects.create(
+        kind=kind,
+        priority=priority,
+        object_id=object_id,
+        to=list(to or []),
+        bcc=list(bcc or []),
+        subject=subject[:255],
+        body=body,
+        html_body=html_body,
+    )
+    transaction.on_commit(kick)
+    return message
+
+
+def enqueue_many(messages):
+    """Queue unsaved OutboxMessage instances with one insert."""
+    created = OutboxMessage.objects.bulk_create(messages, batch_size=500)
+    transaction.on_commit(kick)
+    return created
+
+
+def kick():
+    """Drain in a background thread of this process, or wake the one that is."""
+    if not settings.OUTBOX_DRAIN_IN_PROCESS:
+        return
+    _wake.set()
+    if not _drain_lock.acquire(blocking=False):
+        return
+    threading.Thread(target=_drain_in_background, daemon=True).start()
+
+
+def next_due_in():
+    """Seconds until a queued message is due (0 if one is now), or None when nothing is queued."""
+    times = OutboxMessage.objects.aggregate(
+        pending=Min('next_attempt_at', filter=Q(status='PENDING')),
+        leased=Min('lease_expires_at', filter=Q(status='SENDING')),
+    )
+    times = [at for at in times.values() if at is not None]
+    if not times:
+        return None
+    return max((min(times) - timezone.now()).total_seconds(), 0)
+
+
+def _drain_in_background():
+    try:
+        while True:
+            _wake.clear()
+            while drain()[0]:
+                pass
+            # Retries back off and throttled mail waits for tokens: sleep
+            # until the next one is due instead of waiting for a new enqueue,
+            # and until the budget refills (midnight, once the day's is spent)
+            wait = next_due_in()
+            if wait is None:
+                break
+            wait = max(wait, next_token_in(), IDLE_SECONDS)
+            db_connection.close()
+            _wake.wait(wait)
+    except Exception as e:
+        print(f"[OUTBOX] Background drain stopped: {e}", file=sys.stderr, flush=True)
+        _wake.clear()
+    finally:
+        _drain_lock.release()
+        db_connection.close()
+    # A commit that landed after the last check has kicked a drainer that was leaving
+    if _wake.is_set():
+        kick()
+
+
+def _due(now):
+    return Q(status='PENDING', next_attempt_at__lte=now) | Q(status='SENDING', lease_expires_at__lt=now)
+
+
+def claim_batch(size):
+    """
+    Claim up to `size` due messages for this drain, most urgent first and
+    no more than the send budget allows. The claiming UPDATE re-checks that
+    each row is still due, so concurrent drains never share a message.
+    """
+    now = timezone.now()
+    ids = list(
+        OutboxMessage.objects.filter(_due(now))
+        .order_by('priority', 'next_attempt_at', 'id')
+        .values_list('id', flat=True)[:size]
+    )
+    if not ids:
+        return []
+
+    granted, retry_after = take(len(ids))
+    while not granted:
+        if retry_after is None or retry_after > MAX_THROTTLE_WAIT:
+            return []  # budget spent for now; the messages stay queued
+        time.sleep(retry_after)
+        granted, retry_after = take(len(ids))
+    ids = ids[:granted]
+
+    claim = uuid.uuid4().hex
+    claimed = OutboxMessage.objects.filter(_due(now), id__in=ids).update(
+        status='SENDING',
+        claim=claim,
+        lease_expires_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+    )
+    give_back(len(ids) - claimed)
+    return list(OutboxMessage.objects.filter(claim=claim, status='SENDING').order_by('priority', 'id'))
+
+
+def plain_email(message):
+    """The message as stored: subject, text body and optional HTML body."""
+    email = EmailMultiAlternatives(message.subject, message.body, settings.DEFAULT_FROM_EMAIL, message.to, bcc=message.bcc)
+    if message.html_body:
+        email.attach_alternative(message.html_body, 'text/html')
+    return email
+
+
+def build_email(message):
+    if message.kind == 'mail':
+        return plain_email(message)
+    build = _builders.get(message.kind)
+    if build is None:
+        raise LookupError(f"No outbox builder registered for {message.kind!r}")
+    return build(message)
+
+
+def drain(batch_size=None):
+    """
+    Send one batch of due messages over up to OUTBOX_SMTP_CONNECTIONS
+    reused SMTP connections. Returns (claimed, sent).
+    """
+    messages = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not messages:
+        return 0, 0
+
+    sent, cancelled, failed = [], [], []
+    try:
+        outgoing = []
+        for message in messages:
+            try:
+                email = build_email(message)
+            except Exception as e:
+                if _retry(message, e):
+                    failed.append(message.pk)
+                continue
+            if email is None:
+                cancelled.append(message.pk)
+            else:
+                outgoing.append((message, email))
+
+        for message, error in _send_all(outgoing):
+            if error is None:
+                sent.append(message.pk)
+            elif _retry(message, error):
+                failed.append(message.pk)
+    finally:
+        now = timezone.now()
+        if sent:
+            OutboxMessage.objects.filter(pk__in=sent).update(status='SENT', sent_at=now, last_error='', lease_expires_at=None)
+        if cancelled:
+            OutboxMessage.objects.filter(pk__in=cancelled).update(status='CANCELLED', lease_expires_at=None)
+        _report_progress(messages, set(sent), set(cancelled) | set(failed))
+
+    print(f"[OUTBOX] Sent {len(sent)}/{len(messages)} messages", flush=True)
+    return len(messages), len(sent)
+
+
+def _send_all(outgoing):
+    """
+    Send [(message, email)] split across a few SMTP connections, one thread
+    each. Returns [(message, error or None)]; the threads never touch the
+    database.
+    """
+    lanes = max(1, min(settings.OUTBOX_SMTP_CONNECTIONS, len(outgoing)))
+    if lanes == 1:
+        return _send_lane(outgoing)
+    with ThreadPoolExecutor(max_workers=lanes, thread_name_prefix='outbox-smtp') as pool:
+        results = pool.map(_send_lane, [outgoing[i::lanes] for i in range(lanes)])
+        return [result for lane in results for result in lane]
+
+
+def _send_lane(outgoing):
+    results = []
+    connection = None
+    try:
+        for message, email in outgoing:
+            try:
+                if connection is None:
+                    connection = get_connection()
+                    connection.open()
+                connection.send_messages([email])
+                results.append((message, None))
+            except Exception as e:
+                results.append((message, e))
+                if connection is not None:
+                    # Start the next message on a fresh connection
+                    connection.close()
+                    connection = None
+    finally:
+        if connection is not None:
+            connection.close()
+    return results
+
+
+def batch_progress(batch):
+    """Message counts by status for one batch, e.g. an admin resend."""
+    counts = dict(
+        OutboxMessage.objects.filter(batch=batch)
+        .values_list('status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    return {'batch': batch, 'total': sum(counts.values()), **{status.lower(): counts.get(status, 0) for status, _ in OutboxMessage.STATUS_CHOICES}}
+
+
+def _report_progress(messages, sent, failed):
+    by_kind = {}
+    for message in messages:
+        if message.kind in _progress and message.object_id is not None and (message.pk in sent or message.pk in failed):
+            counts = by_kind.setdefault(message.kind, {}).setdefault(message.object_id, [0, 0])
+            counts[0 if message.pk in sent else 1] += 1
+    for kind, counts in by_kind.items():
+        try:
+            _progress[kind]({object_id: tuple(pair) for object_id, pair in counts.items()})
+        except Exception as e:
+            print(f"[OUTBOX] ERROR reporting progress for {kind}: {e}", file=sys.stderr, flush=True)
+
+
+def _retry(message, error):
+    """Schedule another attempt; returns True when the message has given up."""
+    attempts = message.attempts + 1
+    failed = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+    delay = min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_SECONDS)
+    OutboxMessage.objects.filter(pk=message.pk, claim=message.claim).update(
+        status='FAILED' if failed else 'PENDING',
+        attempts=attempts,
+        last_error=str(error)[:2000],
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        lease_expires_at=None,
+    )
+    print(f"[OUTBOX] ERROR sending message {message.pk} (attempt {attempts}): {error}", file=sys.stderr, flush=True)
+    return failed
@@ -0,0 +1,124 @@
+"""
+Outgoing mail budget.
+
+A token bucket refilled at MAIL_RATE_PER_SECOND (holding at most MAIL_BURST
+tokens) plus a MAIL_DAILY_BUDGET counter. Both live in one MailRateBucket row
+that is locked while tokens are taken, so the worker and every web process
+draining the outbox share a single budget. The outbox asks for tokens before
+claiming a batch, and claims the most urgent messages first.
+"""
+import math
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from .models import MailRateBucket, OutboxMessage
+
+BUCKET_NAME = 'smtp'
+
+
+def _burst():
+    return settings.MAIL_BURST or max(1, math.ceil(settings.MAIL_RATE_PER_SECOND))
+
+
+def _bucket(now):
+    bucket, _ = MailRateBucket.objects.select_for_update().get_or_create(
+        name=BUCKET_NAME,
+        defaults={'tokens': _burst(), 'updated_at': now, 'day': timezone.localdate(now)},
+    )
+    return bucket
+
+
+def take(wanted):
+    """
+    Take up to `wanted` send tokens. Returns (granted, retry_after): when
+    nothing is granted, retry_after is the seconds until the next token, or
+    None once today's budget is spent.
+    """
+    rate, daily = settings.MAIL_RATE_PER_SECOND, settings.MAIL_DAILY_BUDGET
+    if rate <= 0 and daily <= 0:
+        return wanted, 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        bucket = _bucket(now)
+        if bucket.day != timezone.localdate(now):
+            bucket.day, bucket.sent_today = timezone.localdate(now), 0
+        if rate > 0:
+            elapsed = max((now - bucket.updated_at).total_seconds(), 0)
+            bucket.tokens = min(_burst(), bucket.tokens + elapsed * rate)
+            allowed = int(bucket.tokens)
+        else:
+            allowed = wanted
+        if daily > 0:
+            allowed = min(allowed, daily - bucket.sent_today)
+
+        granted = max(0, min(wanted, allowed))
+        if rate > 0:
+            bucket.tokens -= granted
+        bucket.sent_today += granted
+        bucket.updated_at = now
+        bucket.save()
+
+    if granted:
+        return granted, 0
+    if daily > 0 and bucket.sent_today >= daily:
+        return 0, None
+    return 0, (1 - bucket.tokens) / rate
+
+
+def next_token_in():
+    """
+    Seconds until a send token is free (0 if one is now), without taking it.
+    Once today's budget is spent that is the time left until local midnight.
+    """
+    rate, daily = settings.MAIL_RATE_PER_SECOND, settings.MAIL_DAILY_BUDGET
+    bucket = MailRateBucket.objects.filter(name=BUCKET_NAME).first()
+    if bucket is None or (rate <= 0 and daily <= 0):
+        return 0
+
+    now = timezone.now()
+    today = timezone.localdate(now)
+    if daily > 0 and bucket.day == today and bucket.sent_today >= daily:
+        midnight = timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min))
+        return max((midnight - now).total_seconds(), 0)
+    if rate > 0:
+        elapsed = max((now - bucket.updated_at).total_seconds(), 0)
+        tokens = min(_burst(), bucket.tokens + elapsed * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+    return 0
+
+
+def give_back(count):
+    """Return tokens taken for messages that were not claimed after all."""
+    if count <= 0 or (settings.MAIL_RATE_PER_SECOND <= 0 and settings.MAIL_DAILY_BUDGET <= 0):
+        return
+    MailRateBucket.objects.filter(name=BUCKET_NAME, sent_today__gte=count).update(
+        tokens=F('tokens') + count,
+        sent_today=F('sent_today') - count,
+    )
+
+
+def mail_stats():
+    """Queue depth by priority, recent send rate and the remaining budget."""
+    now = timezone.now()
+    queued = dict(
+        OutboxMessage.objects.filter(status__in=['PENDING', 'SENDING'])
+        .values_list('priority')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    sent_last_minute = OutboxMessage.objects.filter(sent_at__gte=now - timedelta(minutes=1)).count()
+    bucket = MailRateBucket.objects.filter(name=BUCKET_NAME).first()
+    sent_today = bucket.sent_today if bucket and bucket.day == timezone.localdate(now) else 0
+    return {
+        'queue_depth': sum(queued.values()),
+        'queue_by_priority': {str(priority): count for priority, count in sorted(queued.items())},
+        'sent_last_minute': sent_last_minute,
+        'send_rate_per_second': round(sent_last_minute / 60, 2),
+        'rate_limit_per_second': settings.MAIL_RATE_PER_SECOND,
+        'daily_budget': settings.MAIL_DAILY_BUDGET,
+        'sent_today': sent_today,
+    }
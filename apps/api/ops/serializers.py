@@ -20,5 +20,11 @@ class SystemSettingSerializer(serializers.ModelSerializer):
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id', 'subject', 'message', 'priority', 'recipients_criteria', 'sent_by', 'created_at']
-        read_only_fields = ['sent_by', 'created_at']
+        fields = [
+            'id', 'subject', 'message', 'priority', 'recipients_criteria', 'sent_by', 'created_at',
+            'status', 'total_recipients', 'sent_count', 'failed_count', 'throughput', 'started_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'sent_by', 'created_at',
+            'status', 'total_recipients', 'sent_count', 'failed_count', 'throughput', 'started_at', 'finished_at',
+        ]
@@ -1,3 +1,223 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest.mock import patch
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from authentication.models import User
+from events.models import Event, Registration
+from .models import Notification, OutboxMessage
+from .outbox import claim_batch, drain, enqueue
 
-# Create your tests here.
+OUTBOX_SETTINGS = dict(
+    SECURE_SSL_REDIRECT=False,
+    OUTBOX_DRAIN_IN_PROCESS=False,
+    OUTBOX_MAX_ATTEMPTS=3,
+    OUTBOX_RETRY_BASE_SECONDS=10,
+)
+
+
+@override_settings(**OUTBOX_SETTINGS)
+class OutboxTests(TestCase):
+    @override_settings(OUTBOX_SMTP_CONNECTIONS=1)
+    def test_drain_sends_batch_over_one_connection(self):
+        for i in range(3):
+            enqueue(to=[f"to{i}@example.com"], subject=f"Hello {i}", body="Hi")
+        with patch('ops.outbox.get_connection', wraps=mail.get_connection) as get_connection:
+            self.assertEqual(drain(), (3, 3))
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxMessage.objects.exclude(status='SENT').exists())
+        self.assertEqual(drain(), (0, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        message = enqueue(to=["flaky@example.com"], subject="Retry", body="Hi")
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError("SMTP down")):
+            drain()
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), ('PENDING', 1))
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=9))
+            self.assertEqual(drain(), (0, 0))  # not due yet
+
+            for attempt in (2, 3):
+                OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+                drain()
+            message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.last_error), ('FAILED', 3, "SMTP down"))
+
+    def test_background_drainer_waits_for_retries(self):
+        from . import outbox
+        message = enqueue(to=["later@example.com"], subject="Retry", body="Hi")
+        waits = []
+
+        def time_passes(timeout):
+            # Instead of sleeping, make the retry due
+            waits.append(timeout)
+            OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+
+        outbox._drain_lock.acquire()
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=[OSError("SMTP down"), 1]), \
+                patch.object(outbox._wake, 'wait', side_effect=time_passes), patch('ops.outbox.db_connection'):
+            outbox._drain_in_background()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('SENT', 1))  # one failed attempt, then sent
+        self.assertEqual(len(waits), 1)
+        self.assertGreater(waits[0], 9)  # slept until the backoff was over
+        self.assertIsNone(outbox.next_due_in())
+        self.assertFalse(outbox._drain_lock.locked())
+
+    def test_claims_are_exclusive_and_expired_leases_return(self):
+        enqueue(to=["once@example.com"], subject="Once", body="Hi")
+        self.assertEqual(len(claim_batch(10)), 1)
+        self.assertEqual(claim_batch(10), [])
+        OutboxMessage.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(claim_batch(10)), 1)
+
+    def test_ticket_email_is_built_when_sent(self):
+        now = timezone.now()
+        event = Event.objects.create(
+            title="Outbox Event", venue="Lab", category="CTF", registration_limit=10,
+            registration_start=now - timedelta(days=1), registration_end=now + timedelta(days=1),
+            event_date=now + timedelta(days=2),
+        )
+        registration = Registration.objects.create(user=User.objects.create_user(email="ticket@example.com"), event=event)
+        from events.utils import send_registration_email
+        send_registration_email(registration)
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('run_outbox', '--once', stdout=io.StringIO())
+        self.assertEqual(mail.outbox[0].to, ["ticket@example.com"])
+        self.assertIn("Outbox Event", mail.outbox[0].subject)
+        self.assertTrue(any(part.get_content_type() == 'image/png' for part in mail.outbox[0].message().walk()))
+
+    def test_contact_form_is_queued(self):
+        response = self.client.post(reverse('contact-us'), {'name': 'A', 'email': 'a@example.com', 'message': 'Hi'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(OutboxMessage.objects.get().status, 'PENDING')
+
+
+@override_settings(**OUTBOX_SETTINGS)
+class NotificationBlastTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="pw")
+        for i in range(5):
+            User.objects.create_user(email=f"member{i}@example.com")
+
+    def create_blast(self, audience='ALL_NODES'):
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post(reverse('notifications'), {
+            'subject': "Venue change", 'message': "Room 101", 'recipients_criteria': audience,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Notification.objects.get(pk=response.data['id'])
+
+    def test_blast_fans_out_to_individual_messages(self):
+        from .notifications import fan_out
+        notification = self.create_blast()
+        self.assertEqual(OutboxMessage.objects.count(), 0)  # nothing on the request thread
+
+        self.assertEqual(fan_out(notification.pk, chunk_size=2), 6)
+        self.assertEqual(drain(), (6, 6))
+        self.assertEqual(sorted(len(m.to) + len(m.bcc) for m in mail.outbox), [1] * 6)
+
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.total_recipients, notification.sent_count), ('DONE', 6, 6))
+        self.assertIsNotNone(notification.finished_at)
+        self.assertGreater(notification.throughput, 0)
+
+    def test_interrupted_fan_out_resumes_from_cursor(self):
+        from .notifications import resume_blasts
+        notification = self.create_blast('Admins Only')
+        User.objects.create_user(email="staff@example.com", is_staff=True)
+        Notification.objects.filter(pk=notification.pk).update(fanout_cursor=self.admin.pk, total_recipients=1)
+
+        resume_blasts()
+        self.assertEqual(list(OutboxMessage.objects.values_list('to', flat=True)), [["staff@example.com"]])
+        self.assertIsNone(resume_blasts())
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+
+@override_settings(**OUTBOX_SETTINGS)
+class MailRateLimitTests(TestCase):
+    @override_settings(MAIL_RATE_PER_SECOND=2, MAIL_DAILY_BUDGET=0)
+    def test_bucket_limits_batches_and_prefers_tickets(self):
+        from .outbox import PRIORITY_BULK, PRIORITY_TRANSACTIONAL
+        for i in range(4):
+            enqueue(to=[f"bulk{i}@example.com"], subject="Blast", body="Hi", priority=PRIORITY_BULK)
+        enqueue(to=["ticket@example.com"], subject="Ticket", body="Hi", priority=PRIORITY_TRANSACTIONAL)
+
+        with patch('ops.outbox.MAX_THROTTLE_WAIT', 0):
+            self.assertEqual(drain(), (2, 2))
+            self.assertEqual(drain(), (0, 0))  # bucket empty; nothing claimed
+        self.assertEqual(mail.outbox[0].to, ["ticket@example.com"])
+        self.assertEqual(OutboxMessage.objects.filter(status='PENDING').count(), 3)
+
+    @override_settings(MAIL_RATE_PER_SECOND=0, MAIL_DAILY_BUDGET=3)
+    def test_daily_budget(self):
+        from .ratelimit import take
+        for i in range(5):
+            enqueue(to=[f"day{i}@example.com"], subject="Hi", body="Hi")
+        self.assertEqual(drain(), (3, 3))
+        self.assertEqual(drain(), (0, 0))
+        self.assertEqual(take(1), (0, None))
+
+    @override_settings(MAIL_RATE_PER_SECOND=0, MAIL_DAILY_BUDGET=1)
+    def test_background_drainer_sleeps_until_budget_refills(self):
+        from . import outbox
+        from .models import MailRateBucket
+        from .ratelimit import next_token_in
+        enqueue(to=["today@example.com"], subject="Hi", body="Hi")
+        tomorrow = enqueue(to=["tomorrow@example.com"], subject="Hi", body="Hi")
+        waits = []
+
+        def day_passes(timeout):
+            waits.append((timeout, next_token_in()))
+            MailRateBucket.objects.update(day=timezone.localdate() - timedelta(days=1))
+
+        outbox._drain_lock.acquire()
+        with patch.object(outbox._wake, 'wait', side_effect=day_passes), patch('ops.outbox.db_connection'):
+            outbox._drain_in_background()
+        tomorrow.refresh_from_db()
+        self.assertEqual(tomorrow.status, 'SENT')
+        self.assertEqual(len(waits), 1)  # one sleep, not a poll every few seconds
+        timeout, budget_wait = waits[0]
+        self.assertGreater(budget_wait, 0)
+        self.assertAlmostEqual(timeout, max(budget_wait, outbox.IDLE_SECONDS), delta=2)
+        self.assertFalse(outbox._drain_lock.locked())
+
+    def test_stats_endpoint(self):
+        from rest_framework.test import APIClient
+        enqueue(to=["queued@example.com"], subject="Hi", body="Hi")
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser(email="admin@example.com", password="pw"))
+        stats = client.get(reverse('outbox-stats')).data
+        self.assertEqual((stats['queue_depth'], stats['queue_by_priority']), (1, {'5': 1}))
+
+
+@override_settings(**OUTBOX_SETTINGS)
+class OutboxConnectionPoolTests(TestCase):
+    @override_settings(OUTBOX_SMTP_CONNECTIONS=2)
+    def test_batch_is_split_across_connections(self):
+        for i in range(5):
+            enqueue(to=[f"pool{i}@example.com"], subject="Hi", body="Hi")
+        with patch('ops.outbox.get_connection', wraps=mail.get_connection) as get_connection:
+            self.assertEqual(drain(), (5, 5))
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f"pool{i}@example.com" for i in range(5)])
+
+    def test_batch_progress_in_stats(self):
+        from rest_framework.test import APIClient
+        from .models import OutboxMessage as Message
+        from .outbox import enqueue_many
+        enqueue_many([Message(to=[f"b{i}@example.com"], subject="Hi", body="Hi", batch="resend1") for i in range(3)])
+        enqueue(to=["other@example.com"], subject="Hi", body="Hi")
+        drain(batch_size=2)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser(email="admin@example.com", password="pw"))
+        progress = client.get(reverse('outbox-stats'), {'batch': 'resend1'}).data['batch']
+        self.assertEqual((progress['total'], progress['sent'], progress['pending']), (3, 2, 1))
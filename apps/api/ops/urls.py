@@ -3,6 +3,7 @@ from .views import (
     AuditLogListView, 
     SystemSettingListCreateView, 
     NotificationListCreateView, 
+    OutboxStatsView,
     PublicConfigView,
     PublicContactView,
     AllowedEmailListCreateView,
@@ -13,6 +14,7 @@ urlpatterns = [
     path('logs/', AuditLogListView.as_view(), name='audit-logs'),
     path('settings/', SystemSettingListCreateView.as_view(), name='system-settings'),
     path('notifications/', NotificationListCreateView.as_view(), name='notifications'),
+    path('outbox/', OutboxStatsView.as_view(), name='outbox-stats'),
     path('public-config/', PublicConfigView.as_view(), name='public-config'),
     path('contact-us/', PublicContactView.as_view(), name='contact-us'),
     path('team/', AllowedEmailListCreateView.as_view(), name='team-list'),
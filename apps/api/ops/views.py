@@ -1,12 +1,15 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.core.mail import send_mail
 from django.conf import settings
-import threading
+from django.db import transaction
 from .models import AuditLog, SystemSetting, Notification
+from .outbox import batch_progress, enqueue
+from .notifications import start_blast
+from .ratelimit import mail_stats
 from .serializers import AuditLogSerializer, SystemSettingSerializer, NotificationSerializer
-from authentication.models import User, AllowedEmail
+from authentication.models import AllowedEmail
+from core.pagination import cursor_pagination
 
 class IsAdminUser(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -16,6 +19,7 @@ class AuditLogListView(generics.ListAPIView):
     queryset = AuditLog.objects.all().order_by('-timestamp')
     serializer_class = AuditLogSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    pagination_class = cursor_pagination('-timestamp', '-id')
 
 class SystemSettingListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
@@ -59,6 +63,7 @@ class AllowedEmailListCreateView(generics.ListCreateAPIView):
     queryset = AllowedEmail.objects.all().order_by('-added_at')
     serializer_class = AllowedEmailSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    pagination_class = cursor_pagination('-added_at', '-id')
 
     def perform_create(self, serializer):
         instance = serializer.save()
@@ -89,37 +94,31 @@ class NotificationListCreateView(generics.ListCreateAPIView):
     queryset = Notification.objects.all().order_by('-created_at')
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    pagination_class = cursor_pagination('-created_at', '-id')
 
     def perform_create(self, serializer):
-        notification = serializer.save(sent_by=self.request.user)
-        subject = notification.subject
-        message = notification.message
-        recipients_criteria = notification.recipients_criteria
-        
-        recipient_list = []
-        if recipients_criteria == 'All Registered Users':
-            recipient_list = list(User.objects.values_list('email', flat=True))
-        elif recipients_criteria == 'Admins Only':
-            recipient_list = list(User.objects.filter(is_staff=True).values_list('email', flat=True))
-        
-        if recipient_list:
-            try:
-                send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, recipient_list, fail_silently=False)
-                AuditLog.objects.create(
-                    user=self.request.user,
-                    action=f"Sent Notification Blast: {subject}",
-                    details=f"Recipients: {len(recipient_list)}",
-                    level="SUCCESS",
-                    ip_address=self.request.META.get('REMOTE_ADDR')
-                )
-            except Exception as e:
-                AuditLog.objects.create(
-                    user=self.request.user,
-                    action=f"Failed to Send Notification: {subject}",
-                    details=str(e),
-                    level="ERROR",
-                    ip_address=self.request.META.get('REMOTE_ADDR')
-                )
+        with transaction.atomic():
+            notification = serializer.save(sent_by=self.request.user)
+            # Fanned out to one message per recipient off the request thread;
+            # progress shows up on the notification as the worker sends
+            start_blast(notification)
+            AuditLog.objects.create(
+                user=self.request.user,
+                action=f"Queued Notification Blast: {notification.subject}",
+                details=f"Audience: {notification.recipients_criteria}",
+                level="SUCCESS",
+                ip_address=self.request.META.get('REMOTE_ADDR')
+            )
+
+class OutboxStatsView(APIView):
+    """Mail queue depth, recent send rate and remaining send budget; ?batch= adds one batch's progress"""
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        stats = mail_stats()
+        if request.query_params.get('batch'):
+            stats['batch'] = batch_progress(request.query_params['batch'])
+        return Response(stats)
 
 class PublicConfigView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -143,55 +142,23 @@ class PublicContactView(APIView):
             message = data.get('message', 'N/A')
             remote_addr = request.META.get('REMOTE_ADDR')
 
-            def process_background():
-                log_entry = None
-                try:
-                    # 1. Create Initial Audit Log
-                    log_entry = AuditLog.objects.create(
-                        action="Contact Form Submission",
-                        details=f"From: {email} ({name})\nMessage: {message}\nStatus: BUFFERED",
-                        level="INFO",
-                        ip_address=remote_addr
-                    )
-                    
-                    # 2. Prepare Email
-                    subject = f"Astra Secure Uplink: Message from {name}"
-                    body = f"Astra Contact Form Submission\n\nUser: {name}\nEmail: {email}\n\nMessage:\n{message}"
-                    
-                    host_user = getattr(settings, 'EMAIL_HOST_USER', None)
-                    recipients = ['contact@astraietm.in']
-                    if host_user:
-                        recipients.append(host_user)
-                    
-                    # Log attempt to console for Render logs visibility
-                    print(f"DEBUG: Attempting to send email via {settings.EMAIL_HOST}:{settings.EMAIL_PORT} (User: {host_user})")
-                    
-                    send_mail(
-                        subject,
-                        body,
-                        settings.DEFAULT_FROM_EMAIL,
-                        recipients,
-                        fail_silently=False
-                    )
-                    
-                    # 3. Update Log on Success
-                    log_entry.details += "\nStatus: EMAIL_SENT"
-                    log_entry.level = "SUCCESS"
-                    log_entry.save()
-                    print(f"DEBUG: Email sent successfully to {recipients}")
-                    
-                except Exception as b_err:
-                    error_msg = f"Transmission Error: {str(b_err)}"
-                    print(f"DEBUG: {error_msg}")
-                    if log_entry:
-                        log_entry.details += f"\nStatus: FAILED\nError: {str(b_err)}"
-                        log_entry.level = "ERROR"
-                        log_entry.save()
-
-            # Start background thread
-            t = threading.Thread(target=process_background)
-            t.daemon = True
-            t.start()
+            subject = f"Astra Secure Uplink: Message from {name}"
+            body = f"Astra Contact Form Submission\n\nUser: {name}\nEmail: {email}\n\nMessage:\n{message}"
+
+            host_user = getattr(settings, 'EMAIL_HOST_USER', None)
+            recipients = ['contact@astraietm.in']
+            if host_user:
+                recipients.append(host_user)
+
+            # Logged and queued together; the outbox worker sends it
+            with transaction.atomic():
+                AuditLog.objects.create(
+                    action="Contact Form Submission",
+                    details=f"From: {email} ({name})\nMessage: {message}\nStatus: QUEUED",
+                    level="INFO",
+                    ip_address=remote_addr
+                )
+                enqueue(to=recipients, subject=subject, body=body)
 
             return Response({
                 "status": "success", 